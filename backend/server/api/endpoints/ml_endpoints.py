@@ -1,25 +1,43 @@
 """
 Endpoints de FastAPI para Nebula
 """
-from fastapi import APIRouter, File, UploadFile, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile, HTTPException, status
 from fastapi.responses import StreamingResponse, JSONResponse
 from typing import List, Optional
 import io   
+import os
+import tempfile
+import zlib
 import logging
+import polars as pl
 
 from core.ml_functions import (
-    load_csv,
+    load_dataset,
+    scan_dataset,
     get_data_summary,
+    get_column_details,
     analyze_correlations,
-    detect_iqr_bounds,
+    expand_correlations,
+    correlation_page,
     clean_and_impute,
     handle_categorical_features,
     check_classification_or_regression,
-    prepare_data_for_ml,
     train_model,
     create_download_response
 )
+from core.associations import categorical_columns
+from core.imputation import ImputationCancelled, imputation_strategy, clean_out_of_core
+from core.preprocessing import build_preprocessing_plan, training_split
+from core.encoding import ORDINAL_MAX_CATEGORIES, is_categorical
+from core.outliers import DETECTORS, detect_outliers, compare_detectors, outlier_summary
+from core.ingestion import detect_format, detect_compression, spool_upload, remove_spooled_file, UploadTooLargeError
+from config.settings import settings
 from services.state_manager import state_manager
+from services.dataset_cache import DatasetCache, dataset_cache
+from services.column_details import column_details
+from services.correlation_cache import correlation_cache
+from services.imputation_jobs import ImputationJobStore, imputation_jobs
+from services.preprocessing_cache import preprocessing_cache
 from models.schemas import (
     UploadResponse,
     SummaryResponse,
@@ -45,43 +63,213 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _store_in_dataset_cache(cache_key: str, frame, summary: dict, spooled: dict, file_format: str):
+    """Guarda el frame parseado y su resumen en la caché de datasets (tarea en segundo plano)"""
+    meta = {
+        "format": file_format,
+        "encoding": spooled["encoding"],
+        "separator": spooled["separator"],
+        "rows": summary["shape"]["rows"],
+        "columns": summary["shape"]["columns"],
+    }
+    if dataset_cache.store_frame(cache_key, frame, meta):
+        dataset_cache.store_result(cache_key, "summary", summary)
+
+
+def _detail_options() -> dict:
+    """Parámetros comunes de los bloques pesados del resumen por columna"""
+    return {
+        "top_n_categorical": 10,
+        "normality_sample_size": settings.NORMALITY_SAMPLE_SIZE,
+        "normality_time_budget_s": settings.NORMALITY_TIME_BUDGET_S,
+        "seed": settings.NORMALITY_SEED,
+    }
+
+
+def _summarize(frame, include_details: bool) -> dict:
+    """Resumen estadístico del upload con la configuración de la aplicación"""
+    return get_data_summary(
+        frame,
+        preview_rows=10,
+        approx_threshold_rows=settings.APPROX_PROFILING_THRESHOLD_ROWS,
+        include_details=include_details,
+        **_detail_options(),
+    )
+
+
+def _summary_histograms() -> dict:
+    """
+    Histogramas que ya trae el resumen del upload (los de los sketches en modo
+    aproximado). Solo valen mientras el dataset no se haya modificado.
+    """
+    if not state_manager.is_pristine() or not state_manager.summary:
+        return {}
+    return {
+        col_summary["column"]: col_summary["histogram_data"]
+        for col_summary in state_manager.summary.get("columns_summary", [])
+        if col_summary.get("histogram_data") is not None
+    }
+
+
+def _compute_column_details(token: str, cache_key: str):
+    """Calcula el detalle pesado de todas las columnas (tarea en segundo plano)"""
+    frame = state_manager.get_lazyframe()
+    if frame is None or state_manager.dataset_token() != token:
+        return
+
+    result = get_column_details(frame, histograms=_summary_histograms(), **_detail_options())
+    if "error" in result:
+        logger.warning(result["error"])
+        column_details.fail(token)
+        return
+
+    column_details.complete(token, result["columns"], result["normality_sampling"])
+    if state_manager.dataset_token() == token and state_manager.is_pristine():
+        dataset_cache.store_result(cache_key, "column_details", result)
+
+
 @router.post("/upload")
-async def loading_csv(file: UploadFile = File(...)):
+async def loading_csv(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
-    Endpoint para cargar un archivo CSV y generar su resumen estadístico.
-    Detecta automáticamente encoding y separador, carga los datos y retorna
-    un análisis completo con estadísticas descriptivas, detección de outliers,
-    tests de normalidad y análisis de variables categóricas.
+    Endpoint para cargar un archivo (CSV, Parquet, Arrow IPC o NDJSON) y generar
+    su resumen estadístico. El archivo se vuelca a disco por bloques (respetando MAX_FILE_SIZE_MB),
+    en CSV se detectan encoding y separador con el prefijo y Polars lo lee desde disco.
+    Retorna shape, tipos, nulos, preview, estadísticas descriptivas y detección de
+    outliers. Con PROGRESSIVE_SUMMARY, los tests de normalidad, histogramas y top
+    de categorías se calculan en segundo plano y se consultan en /column-summary/{columna}.
     """
     try:
         logger.info(f"Recibiendo archivo: {file.filename}")
 
         # Validar tipo de archivo
-        if not file.filename.endswith('.csv'):
+        file_format = detect_format(file.filename)
+        if file_format is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El archivo debe ser un CSV"
+                detail="El archivo debe ser CSV, Parquet, Arrow IPC (.arrow/.ipc/.feather) o NDJSON (.ndjson/.jsonl), opcionalmente comprimido (.gz/.bz2/.zst) si es CSV o NDJSON"
             )
+        compression = detect_compression(file.filename)
 
-        # Leer contenido del archivo
-        contents = await file.read()
-        file_obj = io.BytesIO(contents)
+        max_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+        if file.size is not None and file.size > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El archivo supera el tamaño máximo de {settings.MAX_FILE_SIZE_MB} MB"
+            )
 
-        # Cargar CSV usando la función del core
-        df = load_csv(file_obj)
+        # Volcar el archivo a disco por bloques, descomprimiendo al vuelo si corresponde
+        # (en CSV detecta encoding y separador con el primer bloque)
+        try:
+            spooled = await spool_upload(
+                file,
+                max_bytes=max_bytes,
+                suffix=f".{file_format}",
+                sniff=file_format == "csv",
+                compression=compression,
+                max_decompressed_bytes=settings.MAX_DECOMPRESSED_SIZE_MB * 1024 * 1024
+            )
+        except UploadTooLargeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
+            )
+        except (ValueError, zlib.error, OSError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No se pudo descomprimir el archivo: {str(e)}"
+            )
 
-        # Guardar en el state manager
-        state_manager.set_dataframe(
-            df=df,
-            filename=file.filename,
-            encoding="utf-8",  # load_csv maneja esto internamente
-            separator=","  # load_csv maneja esto internamente
-        )
+        lazy_threshold = settings.LAZY_INGESTION_THRESHOLD_MB * 1024 * 1024
+        use_lazy = spooled["decompressed_bytes"] > lazy_threshold
+
+        # Caché por hash del contenido: un re-upload evita parseo y resumen
+        cache_key = DatasetCache.make_key(spooled["sha256"], file_format)
+        cached = dataset_cache.lookup(cache_key)
+        cached_summary = dataset_cache.get_result(cache_key, "summary") if cached else None
+        from_cache = cached is not None and cached_summary is not None
+
+        if from_cache:
+            remove_spooled_file(spooled["path"])
+            spooled["encoding"] = cached.get("encoding")
+            spooled["separator"] = cached.get("separator")
+            summary = cached_summary
+
+            cached_path = dataset_cache.checkout_frame(cache_key) if use_lazy else None
+            if cached_path is not None:
+                state_manager.set_lazy_source(
+                    lf=scan_dataset(cached_path, "ipc"),
+                    source_path=cached_path,
+                    filename=file.filename,
+                    encoding=spooled["encoding"],
+                    separator=spooled["separator"],
+                    dataset_key=cache_key
+                )
+                state_manager.row_count = summary["shape"]["rows"]
+            else:
+                state_manager.set_dataframe(
+                    df=load_dataset(cached["frame_path"], "ipc"),
+                    filename=file.filename,
+                    encoding=spooled["encoding"],
+                    separator=spooled["separator"],
+                    dataset_key=cache_key
+                )
+            logger.info(f"Dataset recuperado de la caché: {cache_key}")
+
+        elif use_lazy:
+            # Modo LazyFrame: el archivo queda en disco y cada etapa lee solo lo que necesita
+            try:
+                if file_format == "csv":
+                    lf = scan_dataset(spooled["path"], "csv", separator=spooled["separator"], encoding="utf-8")
+                else:
+                    lf = scan_dataset(spooled["path"], file_format)
+            except Exception:
+                remove_spooled_file(spooled["path"])
+                raise
+
+            state_manager.set_lazy_source(
+                lf=lf,
+                source_path=spooled["path"],
+                filename=file.filename,
+                encoding=spooled["encoding"],
+                separator=spooled["separator"],
+                dataset_key=cache_key
+            )
+            logger.info(f"Archivo registrado en modo lazy: {spooled['path']}")
 
-        logger.info(f"Archivo cargado exitosamente: {df.shape[0]} filas x {df.shape[1]} columnas")
+            summary = _summarize(lf, include_details=not settings.PROGRESSIVE_SUMMARY)
+            if "error" not in summary:
+                state_manager.row_count = summary["shape"]["rows"]
+                background_tasks.add_task(_store_in_dataset_cache, cache_key, lf, summary, spooled, file_format)
+        else:
+            # Cargar el archivo desde disco usando la función del core
+            try:
+                if file_format == "csv":
+                    df = load_dataset(
+                        spooled["path"],
+                        "csv",
+                        encoding="utf-8",  # spool_upload deja el archivo en UTF-8
+                        separator=spooled["separator"]
+                    )
+                else:
+                    df = load_dataset(spooled["path"], file_format)
+            finally:
+                remove_spooled_file(spooled["path"])
+
+            # Guardar en el state manager
+            state_manager.set_dataframe(
+                df=df,
+                filename=file.filename,
+                encoding=spooled["encoding"],
+                separator=spooled["separator"],
+                dataset_key=cache_key
+            )
+
+            logger.info(f"Archivo cargado exitosamente: {df.shape[0]} filas x {df.shape[1]} columnas")
 
-        # Generar resumen estadístico completo
-        summary = get_data_summary(df, preview_rows=10, top_n_categorical=10)
+            # Generar resumen estadístico completo
+            summary = _summarize(df, include_details=not settings.PROGRESSIVE_SUMMARY)
+            if "error" not in summary:
+                background_tasks.add_task(_store_in_dataset_cache, cache_key, df, summary, spooled, file_format)
 
         if "error" in summary:
             raise HTTPException(
@@ -92,14 +280,31 @@ async def loading_csv(file: UploadFile = File(...)):
         state_manager.set_summary(summary)
         logger.info("Resumen estadístico generado exitosamente")
 
+        # Resumen progresivo: el detalle pesado por columna se calcula después
+        token = state_manager.dataset_token()
+        column_details.start(token)
+        if summary.get("details_status") == "pending":
+            cached_details = dataset_cache.get_result(cache_key, "column_details") if from_cache else None
+            if cached_details is not None:
+                column_details.complete(token, cached_details["columns"], cached_details["normality_sampling"])
+            else:
+                background_tasks.add_task(_compute_column_details, token, cache_key)
+        else:
+            column_details.complete(token, {})
+
         # Construir respuesta unificada
         response = {
             "success": True,
             "message": "Archivo cargado y analizado exitosamente",
             "file_info": {
                 "filename": file.filename,
-                "encoding": "utf-8",
-                "separator": ",",
+                "format": file_format,
+                "compression": compression,
+                "encoding": spooled["encoding"],
+                "separator": spooled["separator"],
+                "size_mb": round(spooled["size_bytes"] / (1024 * 1024), 3),
+                "decompressed_size_mb": round(spooled["decompressed_bytes"] / (1024 * 1024), 3),
+                "from_cache": from_cache,
                 "uploaded_at": state_manager.created_at.isoformat() if state_manager.created_at else None
             },
             "data_summary": summary
@@ -117,15 +322,84 @@ async def loading_csv(file: UploadFile = File(...)):
         )
 
 
+@router.get("/column-summary/{column:path}")
+async def get_column_summary(column: str):
+    """
+    Endpoint para obtener el detalle pesado de una columna del resumen
+    (normality_test e histogram_data, o top_categories). Se sirve del cálculo en
+    segundo plano iniciado en el upload; si aún no está, se calcula solo para
+    esta columna y se guarda.
+    """
+    try:
+        if not state_manager.has_dataframe():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No hay ningún archivo cargado"
+            )
+
+        if column not in state_manager.get_columns():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Columna no encontrada: {column}"
+            )
+
+        token = state_manager.dataset_token()
+        details = column_details.get(token, column)
+        from_cache = details is not None
+
+        if details is None:
+            result = get_column_details(
+                state_manager.get_lazyframe(), columns=[column], histograms=_summary_histograms(), **_detail_options()
+            )
+            if "error" in result:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=result["error"]
+                )
+            details = result["columns"][column]
+            column_details.put(token, {column: details})
+
+        return JSONResponse(content={
+            "success": True,
+            "column": column,
+            "details_status": column_details.status(token),
+            "from_cache": from_cache,
+            "details": details
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener detalle de columna: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener detalle de columna: {str(e)}"
+        )
+
+
 @router.get("/correlations")
-async def get_correlations(top_n: int = 5):
+async def get_correlations(
+    top_n: int = 5,
+    format: Optional[str] = None,
+    min_abs_corr: float = 0.0,
+    cursor: int = 0,
+    limit: int = 500,
+    include_matrices: bool = True,
+):
     """
     Endpoint para obtener análisis de correlaciones entre variables numéricas.
     Calcula correlaciones Pearson, Spearman y Kendall con sus p-valores.
-    Retorna el top N de correlaciones más fuertes por defecto.
+    Retorna el top N de correlaciones más fuertes por defecto. Las variables
+    categóricas se incluyen en "associations" (V de Cramér, eta e información mutua).
 
     Args:
         top_n: Número de correlaciones top a retornar (por defecto 5)
+        format: "compact" (matrices densas + índice de variables, pares paginados)
+            o "legacy" (todos los pares y matrices anidadas); por defecto el de la configuración
+        min_abs_corr: Formato compacto: correlación absoluta promedio mínima de los pares listados
+        cursor: Formato compacto: posición del ranking donde empieza la página (ver next_cursor)
+        limit: Formato compacto: pares por página
+        include_matrices: Formato compacto: si False, se omiten las matrices (páginas siguientes)
     """
     try:
         if not state_manager.has_dataframe():
@@ -134,10 +408,96 @@ async def get_correlations(top_n: int = 5):
                 detail="No hay ningún archivo cargado. Por favor, carga un archivo CSV primero."
             )
 
-        df = state_manager.get_dataframe()
+        response_format = format or settings.CORRELATION_RESPONSE_FORMAT
+        if response_format not in ("compact", "legacy"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Formato no soportado: {response_format}. Usa 'compact' o 'legacy'"
+            )
+        if cursor < 0 or limit < 1 or top_n < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="cursor y top_n deben ser >= 0 y limit >= 1"
+            )
+
+        # Solo se materializan las columnas numéricas y categóricas
+        schema = state_manager.get_schema()
+        numeric_columns = [
+            col for col, dtype in schema.items()
+            if col and col.strip() != "" and str(dtype).startswith(("Int", "UInt", "Float"))
+        ]
+        categorical = categorical_columns(schema)
+        null_handling = "pairwise" if settings.CORRELATION_PAIRWISE_COMPLETE else "listwise"
+        options = {
+            "null_handling": null_handling,
+            "kendall_sample_threshold": settings.KENDALL_SAMPLE_THRESHOLD_ROWS,
+            "kendall_sample_size": settings.KENDALL_SAMPLE_SIZE,
+            "association_max_categories": settings.ASSOCIATION_MAX_CATEGORIES,
+        }
+        cache_key = correlation_cache.make_key(state_manager.dataset_identity(), numeric_columns + categorical, options)
+        column_versions = {col: state_manager.column_version(col) for col in numeric_columns + categorical}
+
+        # 1) Caché en memoria: mismo upload, mismas columnas y ninguna modificada
+        correlation_results = None
+        cache_status = "computed"
+        cached = correlation_cache.get(cache_key)
+        if cached is not None and cached["column_versions"] == column_versions:
+            correlation_results = cached["result"]
+            cache_status = "hit"
+
+        # 2) Si el dataset no cambió desde el upload, reutilizar el resultado en disco
+        if correlation_results is None and state_manager.is_pristine():
+            correlation_results = dataset_cache.get_result(state_manager.dataset_key, "correlations")
+            # Un resultado de una versión anterior (formato original o sin
+            # asociaciones) o calculado con otras opciones no sirve
+            if correlation_results is not None and (
+                correlation_results.get("format") != "compact"
+                or correlation_results.get("null_handling") != null_handling
+                or "associations" not in correlation_results
+                or (correlation_results["associations"] or {}).get(
+                    "max_categories", settings.ASSOCIATION_MAX_CATEGORIES
+                ) != settings.ASSOCIATION_MAX_CATEGORIES
+            ):
+                correlation_results = None
+            if correlation_results is not None:
+                cache_status = "hit"
+                correlation_cache.put(cache_key, correlation_results, column_versions)
+
+        if correlation_results is None:
+            df = state_manager.get_dataframe(columns=numeric_columns + categorical)
+
+            # 3) Si cambiaron solo algunas columnas (p.ej. tras /outliers-analysis),
+            # se recalculan únicamente sus filas y columnas de la matriz (las
+            # asociaciones categóricas siempre se recalculan completas)
+            previous, changed_columns = None, None
+            if cached is not None:
+                changed_columns = [
+                    col for col in numeric_columns
+                    if cached["column_versions"].get(col) != column_versions[col]
+                ]
+                if 0 < len(changed_columns) < len(numeric_columns):
+                    previous = cached["result"]
+                else:
+                    changed_columns = None
+
+            # Analizar correlaciones (se guarda el formato compacto; el original se deriva de él)
+            correlation_results = analyze_correlations(
+                df,
+                kendall_sample_threshold=settings.KENDALL_SAMPLE_THRESHOLD_ROWS,
+                kendall_sample_size=settings.KENDALL_SAMPLE_SIZE,
+                pairwise_complete=settings.CORRELATION_PAIRWISE_COMPLETE,
+                output_format="compact",
+                previous=previous,
+                changed_columns=changed_columns,
+                association_max_categories=settings.ASSOCIATION_MAX_CATEGORIES,
+            )
 
-        # Analizar correlaciones
-        correlation_results = analyze_correlations(df)
+            if "error" not in correlation_results:
+                if correlation_results.get("recomputed_columns") is not None:
+                    cache_status = "incremental"
+                correlation_cache.put(cache_key, correlation_results, column_versions)
+                if state_manager.is_pristine():
+                    dataset_cache.store_result(state_manager.dataset_key, "correlations", correlation_results)
 
         if "error" in correlation_results:
             raise HTTPException(
@@ -147,6 +507,25 @@ async def get_correlations(top_n: int = 5):
 
         logger.info(f"Análisis de correlaciones completado: {correlation_results['total_correlations']} correlaciones encontradas")
 
+        if response_format == "compact":
+            page = correlation_page(
+                correlation_results,
+                top_n=top_n,
+                min_abs_corr=min_abs_corr,
+                cursor=cursor,
+                limit=limit,
+                include_matrices=include_matrices,
+            )
+            response = {
+                "success": True,
+                "message": f"Análisis de correlaciones completado exitosamente",
+                "cache_status": cache_status,
+                **page,
+            }
+            return JSONResponse(content=response)
+
+        correlation_results = expand_correlations(correlation_results)
+
         # Construir respuesta con top N correlaciones
         response = {
             "success": True,
@@ -156,9 +535,14 @@ async def get_correlations(top_n: int = 5):
             "variables": correlation_results["variables"],
             "total_correlations": correlation_results["total_correlations"],
             "samples_used": correlation_results["samples_used"],
+            "null_handling": correlation_results["null_handling"],
+            "kendall_sample_size": correlation_results["kendall_sample_size"],
+            "kendall_sampled": correlation_results["kendall_sampled"],
+            "cache_status": cache_status,
             "top_correlations": correlation_results["correlations_list"][:top_n],
             "all_correlations": correlation_results["correlations_list"],
-            "correlation_matrices": correlation_results["correlation_matrices"]
+            "correlation_matrices": correlation_results["correlation_matrices"],
+            "associations": correlation_results["associations"]
         }
 
         return JSONResponse(content=response)
@@ -173,22 +557,145 @@ async def get_correlations(top_n: int = 5):
         )
 
 
+def _run_cleaning_job(job_id: str, token: str, df: pl.DataFrame, columns: list, strategy: dict,
+                      detection: dict, options: dict):
+    """Limpia e imputa las columnas (tarea en segundo plano) y guarda el resultado en el job"""
+    if not imputation_jobs.start(job_id):
+        return
+    try:
+        df_cleaned = clean_and_impute(
+            df=df,
+            cols=columns,
+            iqr_k=options["iqr_k"],
+            n_neighbors=options["n_neighbors"],
+            detection=detection,
+            knn_max_rows=settings.KNN_IMPUTATION_MAX_ROWS,
+            mice_tol=settings.MICE_TOLERANCE,
+            progress=lambda iteration, max_iter, change: imputation_jobs.progress(job_id, iteration, max_iter, change),
+            should_stop=lambda: imputation_jobs.is_cancelled(job_id)
+        )
+        if imputation_jobs.is_cancelled(job_id):
+            raise ImputationCancelled()
+        if state_manager.dataset_token() != token:
+            imputation_jobs.fail(job_id, "El dataset cambió mientras se limpiaba; el resultado se descartó")
+            return
+
+        # Detectar outliers después de limpiar (mismo detector sobre los datos limpios)
+        total_outliers_before = sum(detection["counts"].values())
+        total_outliers_after = sum(
+            detect_outliers(df_cleaned, columns, method=options["method"], threshold=options["threshold"])["counts"].values()
+        )
+        rows_initial, rows_final = df.shape[0], df_cleaned.shape[0]
+
+        state_manager.set_cleaned_dataframe(df_cleaned)
+        logger.info(f"Datos limpiados: {total_outliers_before} outliers iniciales → {total_outliers_after} outliers finales")
+
+        imputation_jobs.complete(job_id, {
+            "method": strategy["method"],
+            "method_description": strategy["description"],
+            "n_neighbors": options["n_neighbors"] if strategy["key"] in ("knn", "knn_tree") else None,
+            "columns_cleaned": columns,
+            "total_outliers_before": int(total_outliers_before),
+            "total_outliers_after": int(total_outliers_after),
+            "outliers_cleaned": int(total_outliers_before - total_outliers_after),
+            "rows_before": rows_initial,
+            "rows_after": rows_final,
+            "rows_removed": rows_initial - rows_final
+        })
+
+    except ImputationCancelled:
+        logger.info(f"Limpieza cancelada (job {job_id})")
+        imputation_jobs.cancelled(job_id)
+    except Exception as e:
+        logger.error(f"Error en la limpieza en segundo plano: {str(e)}")
+        imputation_jobs.fail(job_id, str(e))
+
+
+def _run_out_of_core_cleaning_job(job_id: str, token: str, lf: pl.LazyFrame, columns: list, strategy: dict,
+                                  detection: dict, options: dict):
+    """
+    Limpieza por mediana de un dataset perezoso (tarea en segundo plano): el
+    resultado se escribe en un Parquet temporal que pasa a ser la fuente del dataset
+    """
+    if not imputation_jobs.start(job_id):
+        return
+    fd, path = tempfile.mkstemp(prefix="nebula_cleaned_", suffix=".parquet")
+    os.close(fd)
+    try:
+        if state_manager.dataset_token() != token:
+            raise RuntimeError("El dataset cambió antes de empezar la limpieza")
+        cleaning = clean_out_of_core(lf, columns, detection["bounds"], path)
+        if imputation_jobs.is_cancelled(job_id):
+            raise ImputationCancelled()
+        if state_manager.dataset_token() != token:
+            imputation_jobs.fail(job_id, "El dataset cambió mientras se limpiaba; el resultado se descartó")
+            os.remove(path)
+            return
+
+        state_manager.set_cleaned_source(path, columns)
+        total_outliers_before = sum(detection["counts"].values())
+        total_outliers_after = sum(
+            detect_outliers(state_manager.get_lazyframe().select(columns), columns,
+                            method=options["method"], threshold=options["threshold"])["counts"].values()
+        )
+        rows = state_manager.get_shape()[0]
+        logger.info(f"Datos limpiados fuera de memoria: {total_outliers_before} outliers iniciales → {total_outliers_after} outliers finales")
+
+        imputation_jobs.complete(job_id, {
+            "method": strategy["method"],
+            "method_description": strategy["description"],
+            "n_neighbors": None,
+            "out_of_core": True,
+            "medians": cleaning["medians"],
+            "columns_cleaned": columns,
+            "total_outliers_before": int(total_outliers_before),
+            "total_outliers_after": int(total_outliers_after),
+            "outliers_cleaned": int(total_outliers_before - total_outliers_after),
+            "rows_before": rows,
+            "rows_after": rows,
+            "rows_removed": 0
+        })
+
+    except ImputationCancelled:
+        logger.info(f"Limpieza cancelada (job {job_id})")
+        imputation_jobs.cancelled(job_id)
+        os.remove(path)
+    except Exception as e:
+        logger.error(f"Error en la limpieza fuera de memoria: {str(e)}")
+        imputation_jobs.fail(job_id, str(e))
+        if os.path.exists(path) and state_manager.source_path != path:
+            os.remove(path)
+
+
 @router.post("/outliers-analysis")
 async def outliers_analysis(
+    background_tasks: BackgroundTasks,
     iqr_k: float = 1.5,
     clean_data: bool = False,
-    n_neighbors: int = 5
+    n_neighbors: int = 5,
+    method: str = "iqr",
+    threshold: Optional[float] = None,
+    compare_methods: bool = False
 ):
     """
     Endpoint unificado para análisis y limpieza de outliers.
 
-    Este endpoint detecta outliers usando el método IQR y opcionalmente
-    limpia los datos reemplazándolos mediante KNN imputation.
+    Este endpoint detecta outliers usando el método IQR (u otro detector) y
+    opcionalmente limpia los datos reemplazándolos mediante KNN imputation.
+    La limpieza se ejecuta en segundo plano: la respuesta trae "cleaning_job"
+    y el avance se consulta en /imputation-jobs/{job_id}. Un dataset perezoso
+    del nivel de mediana se limpia sin materializarse (escaneo en streaming y
+    `sink_parquet`) si el detector es univariado.
 
     Args:
         iqr_k: Factor K para método IQR (por defecto 1.5)
         clean_data: Si es True, limpia los outliers detectados (por defecto False)
         n_neighbors: Número de vecinos para KNN imputation si clean_data=True (por defecto 5)
+        method: Detector: "iqr", "mad", "zscore", "robust_zscore" o "isolation_forest"
+        threshold: Umbral del detector (por defecto el del detector; para "iqr" se usa iqr_k;
+            para "isolation_forest" es la contaminación, en (0, 0.5] o 0 = auto)
+        compare_methods: Si es True, ejecuta además todos los detectores con un
+            solo pase de estadísticas y devuelve sus conteos y tiempos
 
     Returns:
         Análisis de outliers y resultados de limpieza si se solicitó
@@ -200,6 +707,22 @@ async def outliers_analysis(
                 detail="No hay ningún archivo cargado"
             )
 
+        if method not in DETECTORS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Método de outliers no soportado: {method}. Opciones: {list(DETECTORS)}"
+            )
+        if method == "iqr" and threshold is None:
+            threshold = iqr_k
+        if threshold is not None:
+            try:
+                DETECTORS[method].check_threshold(threshold)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+
         # Verificar que se hayan seleccionado features y label
         if not state_manager.has_features_and_label():
             raise HTTPException(
@@ -207,9 +730,8 @@ async def outliers_analysis(
                 detail="Debe seleccionar features y label primero usando el endpoint /select-features"
             )
 
-        df = state_manager.get_dataframe()
         features, label = state_manager.get_features_and_label()
-        rows_initial = df.shape[0]
+        schema = state_manager.get_schema()
 
         # Usar las columnas seleccionadas (features + label)
         all_selected_columns = features + [label]
@@ -220,7 +742,7 @@ async def outliers_analysis(
             # Filtrar columnas con nombres vacíos o solo espacios
             if not col or col.strip() == "":
                 continue
-            dtype = str(df[col].dtype)
+            dtype = str(schema[col])
             if dtype.startswith(("Int", "UInt", "Float")):
                 columns.append(col)
 
@@ -230,22 +752,25 @@ async def outliers_analysis(
                 detail="No hay columnas numéricas para analizar"
             )
 
-        # Detectar outliers por columna
-        outliers_by_column = {}
-        total_outliers_before = 0
+        rows_initial = state_manager.get_shape()[0]
+        strategy = imputation_strategy(rows_initial, settings.KNN_IMPUTATION_MAX_ROWS)
+        out_of_core = (
+            clean_data and state_manager.is_lazy() and strategy["key"] == "median"
+            and not DETECTORS[method].multivariate
+        )
 
-        for col in columns:
-            lower, upper = detect_iqr_bounds(df, col, k=iqr_k)
-            outliers_mask = (df[col] < lower) | (df[col] > upper)
-            outliers_count = outliers_mask.sum()
-            total_outliers_before += outliers_count
+        # Solo se materializan las columnas numéricas seleccionadas (nada en la
+        # limpieza fuera de memoria: la detección corre sobre el LazyFrame)
+        if out_of_core:
+            df = state_manager.get_lazyframe().select(columns)
+        else:
+            df = state_manager.get_dataframe(columns=columns)
 
-            outliers_by_column[col] = {
-                "lower_bound": float(lower),
-                "upper_bound": float(upper),
-                "outliers_count": int(outliers_count),
-                "outliers_percentage": round((outliers_count / df.shape[0]) * 100, 2)
-            }
+        # Detectar outliers: estadísticas de todas las columnas en una consulta y
+        # conteos en otra (un lote de expresiones, no un bucle por columna)
+        detection = detect_outliers(df, columns, method=method, threshold=threshold)
+        outliers_by_column = outlier_summary(detection["bounds"], detection["counts"], rows_initial)
+        total_outliers_before = sum(detection["counts"].values())
 
         logger.info(f"Outliers detectados: {total_outliers_before} en total")
 
@@ -259,65 +784,58 @@ async def outliers_analysis(
                 "numeric_analyzed": len(columns)
             },
             "outliers_detection": {
-                "method": "IQR",
+                "method": DETECTORS[method].label,
+                "detector": method,
                 "iqr_k": iqr_k,
+                "threshold": detection["threshold"],
                 "columns_analyzed": columns,
                 "total_columns": len(columns),
                 "outliers_by_column": outliers_by_column,
                 "total_outliers_before": int(total_outliers_before),
-                "rows_analyzed": rows_initial
+                "outlier_rows": detection.get("outlier_rows"),
+                "rows_analyzed": rows_initial,
+                "timing": detection["timing"]
             }
         }
+        if compare_methods:
+            response["outliers_detection"]["comparison"] = compare_detectors(
+                state_manager.get_dataframe(columns=columns) if out_of_core else df, columns, thresholds={"iqr": iqr_k, method: detection["threshold"]}
+            )
 
         # Si se solicita limpieza, limpiar datos
         if clean_data:
-            # Determinar método de imputación basado en estrategia de 3 niveles
-            if rows_initial <= 5000:
-                imputation_method = "KNN Imputation"
-                method_description = "Máxima precisión usando K-Nearest Neighbors"
-            elif rows_initial <= 50000:
-                imputation_method = "MICE (IterativeImputer)"
-                method_description = "Multivariate Imputation by Chained Equations - captura relaciones entre variables"
+            # El método de imputación sale de la estrategia por niveles (arriba)
+            token = state_manager.dataset_token()
+            if imputation_jobs.active_job(token) is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Ya hay una limpieza en curso para este dataset. Cancélala o espera a que termine."
+                )
+
+            # La limpieza e imputación corre en segundo plano: se responde con el job
+            job_id = imputation_jobs.create(token, strategy["method"])
+            options = {"iqr_k": iqr_k, "n_neighbors": n_neighbors, "method": method, "threshold": threshold}
+            if out_of_core:
+                background_tasks.add_task(
+                    _run_out_of_core_cleaning_job, job_id, token, state_manager.get_lazyframe(),
+                    columns, strategy, detection, options
+                )
             else:
-                imputation_method = "Median Imputation"
-                method_description = "Imputación rápida por mediana para datasets masivos"
-
-            logger.info(f"Limpiando datos con {imputation_method} ({rows_initial:,} filas)...")
-
-            # Limpiar e imputar (reemplaza outliers con None y luego imputa)
-            df_cleaned = clean_and_impute(
-                df=df,
-                cols=columns,
-                iqr_k=iqr_k,
-                n_neighbors=n_neighbors
-            )
-
-            # Detectar outliers después de limpiar
-            total_outliers_after = 0
-            for col in columns:
-                lower, upper = detect_iqr_bounds(df_cleaned, col, k=iqr_k)
-                outliers_mask = (df_cleaned[col] < lower) | (df_cleaned[col] > upper)
-                total_outliers_after += outliers_mask.sum()
-
-            rows_final = df_cleaned.shape[0]
+                background_tasks.add_task(
+                    _run_cleaning_job, job_id, token, df, columns, strategy, detection, options
+                )
+            logger.info(f"Limpieza con {strategy['method']} en segundo plano ({rows_initial:,} filas), job {job_id}")
 
-            state_manager.set_cleaned_dataframe(df_cleaned)
-            logger.info(f"Datos limpiados: {total_outliers_before} outliers iniciales → {total_outliers_after} outliers finales")
-
-            response["cleaning_applied"] = True
-            response["cleaning_results"] = {
-                "method": imputation_method,
-                "method_description": method_description,
-                "n_neighbors": n_neighbors if imputation_method == "KNN Imputation" else None,
-                "columns_cleaned": columns,
-                "total_outliers_before": int(total_outliers_before),
-                "total_outliers_after": int(total_outliers_after),
-                "outliers_cleaned": int(total_outliers_before - total_outliers_after),
-                "rows_before": rows_initial,
-                "rows_after": rows_final,
-                "rows_removed": rows_initial - rows_final
+            response["cleaning_applied"] = False
+            response["cleaning_results"] = None
+            response["cleaning_job"] = {
+                "job_id": job_id,
+                "status": ImputationJobStore.PENDING,
+                "method": strategy["method"],
+                "out_of_core": out_of_core,
+                "status_url": f"/api/imputation-jobs/{job_id}",
             }
-            response["message"] = f"Outliers detectados y limpiados exitosamente. {total_outliers_before} outliers iniciales → {total_outliers_after} outliers finales mediante {imputation_method}."
+            response["message"] = f"Se detectaron {total_outliers_before} outliers en total. La limpieza mediante {strategy['method']} se ejecuta en segundo plano (job {job_id})."
         else:
             response["cleaning_applied"] = False
             response["cleaning_results"] = None
@@ -335,6 +853,38 @@ async def outliers_analysis(
         )
 
 
+@router.get("/imputation-jobs/{job_id}")
+async def get_imputation_job(job_id: str):
+    """
+    Estado de un trabajo de limpieza e imputación: pending, running, complete,
+    failed o cancelled. En "progress" van la iteración actual y la norma del cambio
+    de cada iteración (MICE); al terminar, "result" trae los resultados de la limpieza.
+    """
+    job = imputation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No existe el trabajo de imputación {job_id}"
+        )
+    return JSONResponse(content={"success": True, **job})
+
+
+@router.post("/imputation-jobs/{job_id}/cancel")
+async def cancel_imputation_job(job_id: str):
+    """Cancela un trabajo de limpieza pendiente o en curso (los datos no se modifican)"""
+    if imputation_jobs.get(job_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No existe el trabajo de imputación {job_id}"
+        )
+    if not imputation_jobs.cancel(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El trabajo ya terminó y no se puede cancelar"
+        )
+    return JSONResponse(content={"success": True, "message": "Cancelación solicitada", **imputation_jobs.get(job_id)})
+
+
 @router.post("/select-features")
 async def select_features(request: SelectFeaturesRequest):
     """
@@ -347,8 +897,7 @@ async def select_features(request: SelectFeaturesRequest):
                 detail="No hay ningún archivo cargado"
             )
 
-        df = state_manager.get_dataframe()
-        available_columns = df.columns
+        available_columns = state_manager.get_columns()
 
         # Validar que todas las columnas existen
         all_columns = request.features + [request.label]
@@ -412,17 +961,24 @@ async def encode_categorical():
         features, label = state_manager.get_features_and_label()
         all_columns = features + [label]
 
-        # Codificar variables categóricas
-        df_encoded, encoders = handle_categorical_features(df, all_columns)
+        # Codificar variables categóricas (las de alta cardinalidad se codifican al entrenar)
+        df_encoded, encoders = handle_categorical_features(
+            df, all_columns, ordinal_max_categories=ORDINAL_MAX_CATEGORIES
+        )
+        deferred = [col for col in all_columns if is_categorical(df[col].dtype) and col not in encoders]
 
-        state_manager.update_dataframe(df_encoded)
+        state_manager.update_dataframe(df_encoded, changed_columns=list(encoders))
         state_manager.set_categorical_encoders(encoders)
 
-        logger.info(f"Variables categóricas codificadas: {len(encoders)} columnas")
+        logger.info(f"Variables categóricas codificadas: {len(encoders)} columnas ({len(deferred)} de alta cardinalidad)")
+
+        message = f"Se codificaron {len(encoders)} variables categóricas"
+        if deferred:
+            message += f"; {len(deferred)} de alta cardinalidad se codificarán al entrenar ({', '.join(deferred)})"
 
         return EncodeCategoricalResponse(
             success=True,
-            message=f"Se codificaron {len(encoders)} variables categóricas",
+            message=message,
             columns_encoded=list(encoders.keys()),
             encoders=encoders
         )
@@ -455,8 +1011,8 @@ async def recommend_task():
                 detail="Debe seleccionar features y label primero"
             )
 
-        df = state_manager.get_dataframe()
         _, label = state_manager.get_features_and_label()
+        df = state_manager.get_dataframe(columns=[label])
 
         # Obtener recomendación
         recommendation = check_classification_or_regression(df, label)
@@ -482,10 +1038,37 @@ async def recommend_task():
         )
 
 
+def _preprocessing_plan(features: list, label: str) -> dict:
+    """
+    Plan de preprocesamiento (X, y y encoders) del dataset actual; se arma una
+    sola vez por versión del dataset, features y label.
+    """
+    key = preprocessing_cache.make_key(state_manager.dataset_token(), features, label)
+    plan = preprocessing_cache.get(key)
+    if plan is None:
+        df = state_manager.get_dataframe(
+            columns=features + [label],
+            predicate=pl.col(label).is_not_null()
+        )
+        try:
+            plan = build_preprocessing_plan(df, features, label)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        preprocessing_cache.put(key, plan)
+    else:
+        logger.info("Plan de preprocesamiento reutilizado desde caché")
+    return plan
+
+
 @router.post("/prepare-data")
 async def prepare_data():
     """
     Endpoint para preparar los datos para machine learning (split y scaling).
+    El resultado queda en la caché de preprocesamiento y /train lo reutiliza
+    mientras no cambien el dataset, las features ni el label.
     """
     try:
         if not state_manager.has_dataframe():
@@ -500,27 +1083,20 @@ async def prepare_data():
                 detail="Debe seleccionar features y label primero"
             )
 
-        df = state_manager.get_dataframe()
         features, label = state_manager.get_features_and_label()
 
-        # Preparar datos
-        X, y, clean_data = prepare_data_for_ml(df, features, label)
+        # Preparar datos (plan compartido con /train)
+        plan = _preprocessing_plan(features, label)
 
-        from sklearn.model_selection import train_test_split
-        from sklearn.preprocessing import StandardScaler
-
-        # Split train/test
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
-
-        # Scaling
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
+        # Split train/test y scaling: quedan en el plan cacheado y /train los
+        # reutiliza (estratificado si la tarea recomendada es clasificación)
+        recommendation = state_manager.task_recommendation or {}
+        split = training_split(plan, stratify=recommendation.get("problem_type") == "classification")
+        X_train, X_test = split["X_train"], split["X_test"]
+        y_train, y_test = split["y_train"], split["y_test"]
 
         # Guardar en state manager
-        state_manager.set_training_data(X_train_scaled, X_test_scaled, y_train, y_test, scaler)
+        state_manager.set_training_data(split["X_train_scaled"], split["X_test_scaled"], y_train, y_test, split["scaler"])
 
         logger.info(f"Datos preparados: {len(X_train)} train, {len(X_test)} test")
 
@@ -547,6 +1123,9 @@ async def prepare_data():
 async def train_ml_model(request: TrainModelRequest):
     """
     Endpoint para entrenar un modelo de machine learning.
+    Reutiliza el plan de preprocesamiento y la división train/test cacheados
+    (p.ej. por /prepare-data); solo se recalculan si cambian el dataset, las
+    features o el label.
     """
     try:
         if not state_manager.has_dataframe():
@@ -561,12 +1140,12 @@ async def train_ml_model(request: TrainModelRequest):
                 detail="Debe seleccionar features y label primero"
             )
 
-        df = state_manager.get_dataframe()
         features, label = state_manager.get_features_and_label()
+        plan = _preprocessing_plan(features, label)
 
         # Entrenar modelo usando la función del core
         logger.info(f"Entrenando modelo: {request.model_type}")
-        results = train_model(df, features, label, request.model_type)
+        results = train_model(None, features, label, request.model_type, plan=plan)
 
         if "error" in results:
             raise HTTPException(
@@ -666,6 +1245,9 @@ async def reset_state():
     """
     try:
         state_manager.reset()
+        correlation_cache.clear()
+        preprocessing_cache.clear()
+        imputation_jobs.clear()
         logger.info("Estado del sistema reiniciado")
         return JSONResponse(content={
             "success": True,
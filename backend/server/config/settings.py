@@ -19,6 +19,50 @@ class Settings(BaseSettings):
     # Límites
     MAX_FILE_SIZE_MB: int = 100
 
+    # Límite del contenido ya descomprimido (.gz/.bz2/.zst), protege contra bombas de compresión
+    MAX_DECOMPRESSED_SIZE_MB: int = 1024
+
+    # Archivos más grandes que este umbral se escanean de forma perezosa desde disco
+    LAZY_INGESTION_THRESHOLD_MB: int = 50
+
+    # Datasets con al menos estas filas se perfilan con sketches aproximados (0 = siempre exacto)
+    APPROX_PROFILING_THRESHOLD_ROWS: int = 2_000_000
+
+    # Test de normalidad del resumen: muestra máxima por columna, semilla y tiempo total por upload
+    NORMALITY_SAMPLE_SIZE: int = 5000
+    NORMALITY_SEED: int = 42
+    NORMALITY_TIME_BUDGET_S: float = 15.0
+
+    # Correlaciones pairwise-complete (cada par con sus filas válidas); False = descartar filas con nulos
+    CORRELATION_PAIRWISE_COMPLETE: bool = True
+
+    # Formato por defecto de /api/correlations: "legacy" (respuesta original) o "compact"
+    # (matrices densas, pares paginados; los clientes nuevos lo piden con format=compact)
+    CORRELATION_RESPONSE_FORMAT: str = "legacy"
+
+    # Kendall sobre una muestra reservoir cuando el dataset supera el umbral de filas (0 = siempre completo).
+    # Es lo que acota el costo de Kendall en datasets grandes
+    KENDALL_SAMPLE_THRESHOLD_ROWS: int = 100_000
+    KENDALL_SAMPLE_SIZE: int = 50_000
+
+    # Asociaciones categóricas (V de Cramér, eta, información mutua): columnas con más categorías se omiten
+    ASSOCIATION_MAX_CATEGORIES: int = 50
+
+    # Limpieza: hasta este número de filas se imputa con KNN por bloques (KD-tree/Ball-tree); con más, mediana
+    KNN_IMPUTATION_MAX_ROWS: int = 2_000_000
+
+    # MICE: parada temprana cuando el cambio máximo entre iteraciones es menor que tol * máximo absoluto observado
+    MICE_TOLERANCE: float = 1e-3
+
+    # Resumen progresivo: el upload responde sin normalidad/histogramas/top categorías,
+    # que se calculan en segundo plano y se sirven por columna
+    PROGRESSIVE_SUMMARY: bool = True
+
+    # Caché en disco de datasets ya procesados (clave: hash del contenido)
+    DATASET_CACHE_ENABLED: bool = True
+    DATASET_CACHE_DIR: str = ""  # vacío = directorio temporal del sistema
+    DATASET_CACHE_MAX_MB: int = 2048
+
     # Logging
     LOG_LEVEL: str = "INFO"
 
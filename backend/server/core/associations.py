@@ -0,0 +1,208 @@
+"""
+Medidas de asociación para variables categóricas: V de Cramér entre
+categóricas, razón de correlación (eta) entre categórica y numérica, e
+información mutua. Todas salen de tablas de contingencia sobre códigos
+enteros materializados una sola vez con Polars.
+"""
+import numpy as np
+import polars as pl
+from typing import Dict, List, Tuple
+
+CATEGORICAL_DTYPES = ["Utf8", "String", "Categorical", "Boolean"]
+
+# Columnas con más categorías se omiten (identificadores, texto libre)
+MAX_CATEGORIES = 50
+
+# Bins de igual frecuencia para la información mutua con variables numéricas
+NUMERIC_BINS = 10
+
+
+def categorical_columns(schema: Dict[str, pl.DataType]) -> List[str]:
+    """Columnas de texto, categóricas o booleanas de un esquema"""
+    return [
+        col for col, dtype in schema.items()
+        if col and str(col).strip() != "" and str(dtype) in CATEGORICAL_DTYPES
+    ]
+
+
+def _category_codes(lf: pl.LazyFrame, columns: List[str], max_categories: int) -> Tuple[Dict[str, list], Dict[str, np.ndarray], Dict[str, str]]:
+    """
+    Categorías (sin nulos, ordenadas) y códigos enteros 0..k-1 de cada columna
+    (-1 para nulos), en int64 para combinarlos en pares sin convertirlos de
+    nuevo; las columnas de alta cardinalidad se omiten.
+    """
+    as_key = lambda col: pl.col(col).cast(pl.Utf8) if str(lf.schema[col]) == "Categorical" else pl.col(col)
+    counts = lf.select([as_key(col).drop_nulls().n_unique().alias(col) for col in columns]).collect().row(0)
+    usable = [col for col, count in zip(columns, counts) if 2 <= count <= max_categories]
+    skipped = {}
+    for col, count in zip(columns, counts):
+        if count > max_categories:
+            skipped[col] = f"más de {max_categories} categorías ({count})"
+        elif count < 2:
+            skipped[col] = "menos de 2 categorías"
+    if not usable:
+        return {}, {}, skipped
+
+    frames = pl.collect_all(
+        [lf.select(as_key(col).drop_nulls().unique().sort()) for col in usable]
+        + [lf.select([(as_key(col).rank("dense").cast(pl.Int64) - 1).fill_null(-1) for col in usable])]
+    )
+    values = {col: frame.to_series().to_list() for col, frame in zip(usable, frames)}
+    codes = {col: frames[-1][col].to_numpy() for col in usable}
+    return values, codes, skipped
+
+
+def _table_measures(table: np.ndarray) -> Tuple[float, float, float, int]:
+    """
+    V de Cramér, información mutua (nats) e información mutua normalizada
+    (MI / sqrt(H(a) H(b))) de una tabla de contingencia.
+    """
+    n = table.sum()
+    rows = table.sum(axis=1)
+    cols = table.sum(axis=0)
+    table = table[rows > 0][:, cols > 0]
+    rows, cols = rows[rows > 0], cols[cols > 0]
+    if n == 0 or min(table.shape) < 2:
+        return np.nan, np.nan, np.nan, int(n)
+
+    expected = np.outer(rows, cols) / n
+    chi2 = float(((table - expected) ** 2 / expected).sum())
+    cramers_v = np.sqrt(chi2 / n / (min(table.shape) - 1))
+
+    observed = table > 0
+    mutual_information = float((table[observed] / n * np.log(table[observed] / expected[observed])).sum())
+    h_rows = -float((rows / n * np.log(rows / n)).sum())
+    h_cols = -float((cols / n * np.log(cols / n)).sum())
+    normalized = mutual_information / np.sqrt(h_rows * h_cols)
+    return float(min(cramers_v, 1.0)), max(mutual_information, 0.0), float(min(normalized, 1.0)), int(n)
+
+
+def _select(mask: np.ndarray):
+    """Índice de filas válidas; sin nulos se usa un slice y se evita copiar"""
+    return slice(None) if mask.all() else mask
+
+
+def association_matrices(
+    frame,
+    categorical: List[str],
+    numeric: List[str],
+    max_categories: int = MAX_CATEGORIES,
+    numeric_bins: int = NUMERIC_BINS,
+) -> Dict[str, object]:
+    """
+    Calcula las asociaciones de cada variable categórica con las demás
+    categóricas y con las numéricas. Cada par usa las filas donde ambas
+    variables son no nulas.
+
+    Polars materializa una sola vez códigos enteros: la categoría de cada
+    categórica y el bin de igual frecuencia de cada numérica, junto con sus
+    máscaras de no nulos, y se reutilizan en todos los pares. Cada tabla de
+    contingencia es entonces un `np.bincount` sobre el código combinado, y las
+    sumas por grupo para eta salen de `np.bincount` con pesos.
+
+    Args:
+        frame: DataFrame o LazyFrame de Polars
+        categorical: Columnas categóricas candidatas
+        numeric: Columnas numéricas
+        max_categories: Máximo de categorías para incluir una columna
+        numeric_bins: Bins de las numéricas para la información mutua
+
+    Returns:
+        dict: Matrices categórica x categórica y categórica x numérica (numpy),
+        y columnas omitidas con su motivo
+    """
+    lf = frame.lazy() if isinstance(frame, pl.DataFrame) else frame
+    values, codes, skipped = _category_codes(lf, categorical, max_categories) if categorical else ({}, {}, {})
+    usable = list(values)
+    n_cat, n_num = len(usable), len(numeric)
+
+    cramers_v = np.full((n_cat, n_cat), np.nan)
+    cat_mi = np.full((n_cat, n_cat), np.nan)
+    cat_nmi = np.full((n_cat, n_cat), np.nan)
+    cat_n = np.zeros((n_cat, n_cat), dtype=np.int64)
+    eta = np.full((n_cat, n_num), np.nan)
+    num_mi = np.full((n_cat, n_num), np.nan)
+    num_nmi = np.full((n_cat, n_num), np.nan)
+    num_n = np.zeros((n_cat, n_num), dtype=np.int64)
+
+    if n_cat > 0:
+        if n_num > 0:
+            # Bins por rango (los empates caen en el mismo bin); -1 para nulos.
+            # Centrar por la media global reduce la cancelación en las sumas de cuadrados
+            numeric_frame = lf.select(
+                [
+                    ((pl.col(col).rank("min") - 1) * numeric_bins // pl.col(col).is_not_null().sum())
+                    .cast(pl.Int64).fill_null(-1).alias(f"{k}|bin")
+                    for k, col in enumerate(numeric)
+                ]
+                + [
+                    (pl.col(col).cast(pl.Float64) - pl.col(col).cast(pl.Float64).mean()).alias(f"{k}|x")
+                    for k, col in enumerate(numeric)
+                ]
+            ).collect()
+            bins = [numeric_frame[f"{k}|bin"].to_numpy() for k in range(n_num)]
+            valid_bins = [bin_codes >= 0 for bin_codes in bins]
+            centered = [numeric_frame[f"{k}|x"].to_numpy() for k in range(n_num)]
+            del numeric_frame
+
+        valid = {col: codes[col] >= 0 for col in usable}
+        for i, a in enumerate(usable):
+            code_a, k_a, valid_a = codes[a], len(values[a]), valid[a]
+
+            # Diagonal: la variable consigo misma
+            rows = np.bincount(code_a[valid_a], minlength=k_a).astype(np.float64)
+            p = rows[rows > 0] / rows.sum()
+            cramers_v[i, i] = cat_nmi[i, i] = 1.0
+            cat_mi[i, i] = -float((p * np.log(p)).sum())
+            cat_n[i, i] = int(rows.sum())
+
+            # Categóricas: tabla a x b (simétrica)
+            for j in range(i + 1, n_cat):
+                code_b, k_b = codes[usable[j]], len(values[usable[j]])
+                both = _select(valid_a & valid[usable[j]])
+                table = np.bincount(
+                    code_a[both] * k_b + code_b[both], minlength=k_a * k_b
+                ).reshape(k_a, k_b).astype(np.float64)
+                measures = _table_measures(table)
+                cramers_v[i, j], cat_mi[i, j], cat_nmi[i, j], cat_n[i, j] = measures
+                cramers_v[j, i], cat_mi[j, i], cat_nmi[j, i], cat_n[j, i] = measures
+
+            # Numéricas: eta y tabla a x bin
+            for k in range(n_num):
+                both = _select(valid_a & valid_bins[k])
+                group = code_a[both]
+                x = centered[k][both]
+                counts = np.bincount(group, minlength=k_a).astype(np.float64)
+                total = counts.sum()
+                num_n[i, k] = int(total)
+                if total > 1:
+                    sums = np.bincount(group, weights=x, minlength=k_a)
+                    present = counts > 0
+                    ss_total = float(x @ x) - sums.sum() ** 2 / total
+                    ss_between = (sums[present] ** 2 / counts[present]).sum() - sums.sum() ** 2 / total
+                    if ss_total > 0:
+                        eta[i, k] = np.sqrt(np.clip(ss_between / ss_total, 0.0, 1.0))
+                table = np.bincount(
+                    group * numeric_bins + bins[k][both], minlength=k_a * numeric_bins
+                ).reshape(k_a, numeric_bins).astype(np.float64)
+                _, num_mi[i, k], num_nmi[i, k], _ = _table_measures(table)
+
+    return {
+        "categorical_variables": usable,
+        "numeric_variables": list(numeric),
+        "skipped": skipped,
+        "max_categories": max_categories,
+        "numeric_bins": numeric_bins,
+        "categorical": {
+            "cramers_v": cramers_v,
+            "mutual_information": cat_mi,
+            "normalized_mutual_information": cat_nmi,
+            "n": cat_n,
+        },
+        "categorical_numeric": {
+            "eta": eta,
+            "mutual_information": num_mi,
+            "normalized_mutual_information": num_nmi,
+            "n": num_n,
+        },
+    }
@@ -0,0 +1,685 @@
+"""
+Motor vectorizado de correlaciones: matrices completas con álgebra de NumPy
+en lugar de una llamada de scipy por cada par de variables
+"""
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy import stats
+from typing import Dict, Tuple, Optional
+
+CORRELATION_METHODS = ["pearson", "spearman", "kendall"]
+
+# Kendall: por encima de este número de filas se calcula sobre una muestra.
+# Es lo que acota su costo en tablas grandes: el merge sort de
+# `kendall_matrix_fast` no es más rápido que scipy par a par en un solo núcleo
+KENDALL_SAMPLE_THRESHOLD = 100_000
+KENDALL_SAMPLE_SIZE = 50_000
+
+# Con hasta 33 filas sin empates scipy usa la distribución exacta del estadístico
+KENDALL_EXACT_MAX_ROWS = 33
+
+# Tamaño de los bloques que se comparan directamente antes de empezar a mezclar,
+# y elementos (pares x filas) procesados por lote en el conteo de inversiones
+_INVERSION_BASE_BLOCK = 8
+_INVERSION_BATCH_ELEMENTS = 1 << 22
+
+
+def pearson_matrix(data: np.ndarray, dtype=np.float64) -> np.ndarray:
+    """
+    Correlación de Pearson entre todas las columnas con un solo producto matricial.
+    Las columnas constantes quedan en NaN (como en scipy); la diagonal es 1.
+
+    Args:
+        data: Matriz (filas x variables) sin nulos
+        dtype: np.float64, o np.float32 para bloques grandes
+
+    Returns:
+        np.ndarray: Matriz de correlaciones (variables x variables)
+    """
+    data = np.asarray(data, dtype=dtype)
+    centered = data - data.mean(axis=0)
+    norms = np.sqrt(np.einsum("ij,ij->j", centered, centered))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = (centered.T @ centered) / np.outer(norms, norms)
+    corr = np.clip(corr.astype(np.float64), -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def spearman_matrix(data: np.ndarray, dtype=np.float64) -> np.ndarray:
+    """Spearman como Pearson sobre los rangos (un ranking por columna, empates promediados)"""
+    ranks = stats.rankdata(np.asarray(data), axis=0)
+    return pearson_matrix(ranks, dtype=dtype)
+
+
+def t_test_p_values(corr: np.ndarray, n) -> np.ndarray:
+    """
+    P-valores bilaterales de coeficientes de correlación con la distribución t
+    de Student (n - 2 grados de libertad), vectorizado sobre un arreglo. `n`
+    puede ser un entero o un arreglo con las filas de cada coeficiente.
+    """
+    corr = np.asarray(corr, dtype=np.float64)
+    n = np.broadcast_to(np.asarray(n, dtype=np.float64), corr.shape)
+    dof = n - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = corr * np.sqrt(dof / ((1.0 - corr) * (1.0 + corr)))
+        p_values = 2 * stats.t.sf(np.abs(t), dof)
+    # Con menos de 3 filas el test no tiene grados de libertad
+    return np.where(dof > 0, p_values, np.where(np.isnan(corr), np.nan, 1.0))
+
+
+def _symmetric_p_values(corr: np.ndarray, n: int) -> np.ndarray:
+    """P-valores solo del triángulo superior, reflejados al inferior"""
+    n_vars = corr.shape[0]
+    upper = np.triu_indices(n_vars, k=1)
+    p_values = np.zeros((n_vars, n_vars))
+    p_values[upper] = t_test_p_values(corr[upper], n)
+    p_values.T[upper] = p_values[upper]
+    return p_values
+
+
+def _empty_matrices(n_vars: int, pairs: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Matrices iniciales: sin selección de pares, todas se calculan; con selección, NaN"""
+    if pairs is None:
+        return np.eye(n_vars), np.zeros((n_vars, n_vars))
+    corr = np.full((n_vars, n_vars), np.nan)
+    p_values = np.full((n_vars, n_vars), np.nan)
+    np.fill_diagonal(corr, 1.0)
+    np.fill_diagonal(p_values, 0.0)
+    return corr, p_values
+
+
+def _partners(n_vars: int, pairs: Optional[np.ndarray]) -> list:
+    """Columnas j > i a calcular para cada i (todas, o las marcadas en `pairs`)"""
+    if pairs is None:
+        return [np.arange(i + 1, n_vars) for i in range(n_vars)]
+    selected = np.triu(pairs | pairs.T, k=1)
+    return [np.flatnonzero(selected[i]) for i in range(n_vars)]
+
+
+def kendall_matrix(data: np.ndarray, pairs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Tau de Kendall y p-valores por par con scipy (triángulo superior)"""
+    n_vars = data.shape[1]
+    corr, p_values = _empty_matrices(n_vars, pairs)
+    for i, others in enumerate(_partners(n_vars, pairs)):
+        for j in others:
+            tau, p_val = stats.kendalltau(data[:, i], data[:, j])
+            corr[i, j] = corr[j, i] = tau
+            p_values[i, j] = p_values[j, i] = p_val
+    return corr, p_values
+
+
+def count_inversions(sequences: np.ndarray) -> np.ndarray:
+    """
+    Cuenta inversiones (pares i < j con s_i > s_j) de varias secuencias a la vez
+    con un merge sort por niveles, vectorizado sobre todas las filas.
+
+    - Las secuencias se rellenan hasta una potencia de 2 con un valor máximo al
+      final (no agrega inversiones).
+    - En bloques de 8 las inversiones se cuentan comparando todos los pares.
+    - En cada nivel los bloques de 2w tienen dos mitades ordenadas. Cada valor se
+      marca con un bit que indica su mitad (a igual valor, el izquierdo primero) y
+      un sort estable (timsort, lineal sobre dos tramos ordenados) los mezcla; las
+      inversiones entre mitades salen de las posiciones finales de la mitad derecha.
+
+    Args:
+        sequences: Matriz (secuencias x largo) de enteros no negativos
+
+    Returns:
+        np.ndarray: Inversiones por secuencia
+    """
+    n_seq, length = sequences.shape
+    base = _INVERSION_BASE_BLOCK
+    size = max(1 << max(int(length - 1).bit_length(), 0), base)
+    # Relleno con margen para el bit de la mitad
+    merged = np.full((n_seq, size), np.iinfo(np.int64).max >> 2, dtype=np.int64)
+    merged[:, :length] = sequences
+    inversions = np.zeros(n_seq, dtype=np.int64)
+
+    # Nivel base: comparación directa dentro de bloques pequeños
+    blocks = merged.reshape(-1, base)
+    upper = np.triu(np.ones((base, base), dtype=bool), k=1)
+    per_block = np.empty(len(blocks), dtype=np.int64)
+    step = max(1, _INVERSION_BATCH_ELEMENTS // (base * base))
+    for start in range(0, len(blocks), step):
+        chunk = blocks[start:start + step]
+        per_block[start:start + step] = ((chunk[:, :, None] > chunk[:, None, :]) & upper).sum(axis=(1, 2))
+    inversions += per_block.reshape(n_seq, -1).sum(axis=1)
+    merged = np.sort(blocks, axis=1).reshape(n_seq, size)
+
+    # Niveles de mezcla
+    width = base
+    while width < size:
+        half = np.zeros(2 * width, dtype=np.int64)
+        half[width:] = 1
+        tagged = (merged.reshape(-1, 2 * width) << 1) | half
+        tagged.sort(axis=1, kind="stable")
+        # Un elemento derecho en la posición p con índice r tiene (p - r) izquierdos
+        # menores o iguales, así que supera a w - (p - r)
+        right_positions = (tagged & 1).astype(np.float64) @ np.arange(2 * width, dtype=np.float64)
+        cross = width * width + width * (width - 1) // 2 - right_positions.astype(np.int64)
+        inversions += cross.reshape(n_seq, -1).sum(axis=1)
+        merged = (tagged >> 1).reshape(n_seq, size)
+        width *= 2
+
+    return inversions
+
+
+def _tie_terms(dense_ranks: np.ndarray) -> Tuple[int, float, float]:
+    """Términos de empates de una columna (mismas fórmulas que scipy.stats.kendalltau)"""
+    counts = np.bincount(dense_ranks)
+    counts = counts[counts > 1].astype(np.float64)
+    return (
+        int((counts * (counts - 1) // 2).sum()),
+        float((counts * (counts - 1) * (counts - 2)).sum()),
+        float((counts * (counts - 1) * (2 * counts + 5)).sum()),
+    )
+
+
+def _kendall_row(i: int, others: np.ndarray, ranks: np.ndarray, ties: list) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """Tau-b y p-valores de la columna i contra las columnas `others`"""
+    n = ranks.shape[0]
+    total = n * (n - 1) // 2
+    xtie, x0, x1 = ties[i]
+
+    # Orden por x (y por y en los empates de x: algoritmo de Knight)
+    shared_order = np.argsort(ranks[:, i], kind="stable") if xtie == 0 else None
+    taus = np.empty(len(others))
+    p_values = np.empty(len(others))
+    per_batch = max(1, _INVERSION_BATCH_ELEMENTS // max(n, 1))
+    for start in range(0, len(others), per_batch):
+        batch = others[start:start + per_batch]
+        sequences = np.empty((len(batch), n), dtype=np.int64)
+        both_tied = np.zeros(len(batch), dtype=np.int64)
+        for k, j in enumerate(batch):
+            order = shared_order if shared_order is not None else np.lexsort((ranks[:, j], ranks[:, i]))
+            sequences[k] = ranks[order, j]
+            if xtie and ties[j][0]:
+                # Pares empatados en x e y a la vez
+                xs, ys = ranks[order, i], ranks[order, j]
+                change = np.flatnonzero((xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1]))
+                runs = np.diff(np.concatenate(([0], change + 1, [n])))
+                both_tied[k] = int((runs * (runs - 1) // 2).sum())
+
+        discordant = count_inversions(sequences)
+        ytie = np.array([ties[j][0] for j in batch], dtype=np.float64)
+        y0 = np.array([ties[j][1] for j in batch])
+        y1 = np.array([ties[j][2] for j in batch])
+
+        con_minus_dis = total - xtie - ytie + both_tied - 2 * discordant
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tau = con_minus_dis / np.sqrt(total - xtie) / np.sqrt(total - ytie)
+            tau = np.clip(tau, -1.0, 1.0)
+            # Aproximación normal con corrección por empates
+            m = n * (n - 1.0)
+            var = (m * (2 * n + 5) - x1 - y1) / 18 + (2 * xtie * ytie) / m + x0 * y0 / (9 * m * (n - 2))
+            p = 2 * stats.norm.sf(np.abs(con_minus_dis / np.sqrt(var)))
+        p = np.where(np.isnan(tau), np.nan, p)
+
+        # Sin empates y casi monótona: scipy usa la distribución exacta
+        exact = (xtie == 0) & (ytie == 0) & (np.minimum(discordant, total - discordant) <= 1)
+        for k in np.flatnonzero(exact):
+            _, p[k] = stats.kendalltau(ranks[:, i], ranks[:, batch[k]])
+
+        taus[start:start + len(batch)] = tau
+        p_values[start:start + len(batch)] = p
+
+    return i, others, taus, p_values
+
+
+def kendall_matrix_fast(data: np.ndarray, max_workers: Optional[int] = None,
+                        pairs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tau-b de Kendall de todas las columnas con conteo de inversiones por merge
+    sort (O(n log n) por par). Cada columna se rankea una vez; los pares (i, j>i)
+    se procesan en lote y las columnas i se reparten en un pool de hilos.
+    Reproduce los resultados de scipy.stats.kendalltau (p-valor asintótico con
+    corrección por empates, o exacto en los mismos casos que scipy).
+
+    En un solo núcleo cuesta lo mismo que scipy par a par o algo más; la
+    ganancia viene del pool de hilos. En tablas grandes el costo lo acota la
+    muestra de `sampled_correlation_matrices`, que usan todas las rutas del API.
+
+    Args:
+        data: Matriz (filas x variables) sin nulos
+        max_workers: Hilos del pool (por defecto, uno por CPU; con 1 no se crea pool)
+        pairs: Matriz booleana con los pares a calcular (por defecto todos);
+            los pares no seleccionados quedan en NaN
+
+    Returns:
+        tuple: (correlaciones, p_valores)
+    """
+    n, n_vars = data.shape
+    if n <= KENDALL_EXACT_MAX_ROWS:
+        return kendall_matrix(data, pairs)
+
+    ranks = (stats.rankdata(data, method="dense", axis=0) - 1).astype(np.int64)
+    ties = [_tie_terms(ranks[:, j]) for j in range(n_vars)]
+
+    corr, p_values = _empty_matrices(n_vars, pairs)
+    rows = [(i, others) for i, others in enumerate(_partners(n_vars, pairs)) if len(others) > 0]
+    workers = max_workers or min(max(len(rows), 1), os.cpu_count() or 1)
+    if workers == 1:
+        results = [_kendall_row(i, others, ranks, ties) for i, others in rows]
+        return _fill_kendall(corr, p_values, results)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda row: _kendall_row(row[0], row[1], ranks, ties), rows)
+        return _fill_kendall(corr, p_values, results)
+
+
+def _fill_kendall(corr: np.ndarray, p_values: np.ndarray, results) -> Tuple[np.ndarray, np.ndarray]:
+    """Vuelca los resultados de `_kendall_row` en las matrices simétricas"""
+    for i, others, taus, p_row in results:
+        corr[i, others] = corr[others, i] = taus
+        p_values[i, others] = p_values[others, i] = p_row
+    return corr, p_values
+
+
+def reservoir_sample_indices(n_rows: int, sample_size: int, seed: Optional[int] = 0,
+                             chunk_size: int = 65_536) -> np.ndarray:
+    """
+    Índices (ordenados) de una muestra uniforme de `sample_size` filas con
+    muestreo de reservorio (algoritmo R), recorriendo las filas por bloques.
+
+    Args:
+        n_rows: Filas totales
+        sample_size: Tamaño de la muestra
+        seed: Semilla del generador
+        chunk_size: Filas por bloque
+
+    Returns:
+        np.ndarray: Índices de las filas muestreadas
+    """
+    if n_rows <= sample_size:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    reservoir = np.arange(sample_size)
+    for start in range(sample_size, n_rows, chunk_size):
+        items = np.arange(start, min(start + chunk_size, n_rows))
+        slots = rng.integers(0, items + 1)
+        hit = slots < sample_size
+        # Reemplazos en orden: si un hueco se elige varias veces gana el último
+        slots, items = slots[hit][::-1], items[hit][::-1]
+        _, last = np.unique(slots, return_index=True)
+        reservoir[slots[last]] = items[last]
+    return np.sort(reservoir)
+
+
+def correlation_matrices(data: np.ndarray, methods=CORRELATION_METHODS,
+                         kendall_data: Optional[np.ndarray] = None,
+                         kendall_pairs: Optional[np.ndarray] = None,
+                         kendall_workers: Optional[int] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calcula las matrices de correlación y p-valores de los métodos indicados.
+
+    Args:
+        data: Matriz (filas x variables) sin nulos
+        methods: Subconjunto de "pearson", "spearman", "kendall"
+        kendall_data: Filas a usar para Kendall (p.ej. una muestra); por defecto `data`
+        kendall_pairs: Pares a calcular con Kendall (ver `kendall_matrix_fast`)
+        kendall_workers: Hilos de Kendall (ver `kendall_matrix_fast`)
+
+    Returns:
+        dict: {método: (correlaciones, p_valores)}
+    """
+    n = data.shape[0]
+    results = {}
+    for method in methods:
+        if method == "pearson":
+            corr = pearson_matrix(data)
+            results[method] = (corr, _symmetric_p_values(corr, n))
+        elif method == "spearman":
+            corr = spearman_matrix(data)
+            results[method] = (corr, _symmetric_p_values(corr, n))
+        elif method == "kendall":
+            results[method] = kendall_matrix_fast(
+                data if kendall_data is None else kendall_data, max_workers=kendall_workers, pairs=kendall_pairs
+            )
+        else:
+            raise ValueError(f"Método de correlación no soportado: {method}")
+    return results
+
+
+def sampled_correlation_matrices(data: np.ndarray, methods=CORRELATION_METHODS,
+                                 kendall_sample_threshold: int = KENDALL_SAMPLE_THRESHOLD,
+                                 kendall_sample_size: int = KENDALL_SAMPLE_SIZE,
+                                 seed: Optional[int] = 0,
+                                 kendall_pairs: Optional[np.ndarray] = None,
+                                 kendall_workers: Optional[int] = None) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], int]:
+    """
+    Igual que `correlation_matrices`, pero Kendall (el método más caro) se estima
+    sobre una muestra reservoir de filas cuando `data` supera el umbral. Con los
+    valores por defecto (100k / 50k filas), Kendall de 4 columnas sobre 500k filas
+    pasa de ~1 s a ~0.1 s; el error estándar de tau con 50k filas es ~0.003.
+
+    Args:
+        data: Matriz (filas x variables) sin nulos
+        methods: Subconjunto de "pearson", "spearman", "kendall"
+        kendall_sample_threshold: Filas a partir de las cuales se muestrea (0 = nunca)
+        kendall_sample_size: Tamaño de la muestra
+        seed: Semilla de la muestra
+        kendall_pairs: Pares a calcular con Kendall (por defecto todos)
+        kendall_workers: Hilos de Kendall (ver `kendall_matrix_fast`)
+
+    Returns:
+        tuple: ({método: (correlaciones, p_valores)}, filas usadas por Kendall)
+    """
+    kendall_data = None
+    if "kendall" in methods and kendall_sample_threshold and len(data) > kendall_sample_threshold:
+        kendall_data = data[reservoir_sample_indices(len(data), kendall_sample_size, seed=seed)]
+    kendall_rows = len(kendall_data) if kendall_data is not None else len(data)
+    results = correlation_matrices(
+        data, methods, kendall_data=kendall_data, kendall_pairs=kendall_pairs, kendall_workers=kendall_workers
+    )
+    return results, kendall_rows
+
+
+def masked_pearson_matrix(data: np.ndarray, targets: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson pairwise-complete con sumas enmascaradas: con X los valores centrados
+    (0 en los nulos) y M la máscara de válidos, X'M, M'X, (X²)'M, M'X², X'X y M'M
+    dan por cada par las sumas y el número de filas donde ambas variables son válidas.
+
+    Args:
+        data: Matriz float (filas x variables); los nulos son NaN
+        targets: Índices de columnas; si se indican, solo se calculan sus filas
+            y columnas de la matriz (el resto queda en NaN y 0 filas)
+
+    Returns:
+        tuple: (correlaciones, filas por par)
+    """
+    n_vars = data.shape[1]
+    valid = ~np.isnan(data)
+    mask = valid.astype(np.float64)
+    # Centrar por columna reduce la cancelación numérica de las sumas
+    counts = mask.sum(axis=0)
+    means = np.divide(np.where(valid, data, 0.0).sum(axis=0), counts, out=np.zeros(n_vars), where=counts > 0)
+    centered = np.where(valid, data - means, 0.0)
+    squared = centered * centered
+
+    left = np.arange(n_vars) if targets is None else np.asarray(targets)
+    left_mask = mask[:, left]
+    left_centered = centered[:, left]
+    pair_rows = left_mask.T @ mask
+    left_sums = left_centered.T @ mask
+    right_sums = left_mask.T @ centered
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = left_centered.T @ centered - left_sums * right_sums / pair_rows
+        left_var = squared[:, left].T @ mask - left_sums * left_sums / pair_rows
+        right_var = left_mask.T @ squared - right_sums * right_sums / pair_rows
+        block = cov / np.sqrt(left_var * right_var)
+    # Varianza nula (constante en el par) o sin filas: NaN, como en scipy
+    block[~((left_var > 0) & (right_var > 0))] = np.nan
+    block = np.clip(block, -1.0, 1.0)
+
+    corr = np.full((n_vars, n_vars), np.nan)
+    rows = np.zeros((n_vars, n_vars), dtype=np.int64)
+    corr[left] = block
+    corr[:, left] = block.T
+    rows[left] = np.rint(pair_rows).astype(np.int64)
+    rows[:, left] = rows[left].T
+    np.fill_diagonal(corr, 1.0)
+    return corr, rows
+
+
+def _cross_pearson(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Pearson entre cada columna de `left` y cada columna de `right` (mismas filas)"""
+    left = left - left.mean(axis=0)
+    right = right - right.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = (left.T @ right) / np.outer(np.linalg.norm(left, axis=0), np.linalg.norm(right, axis=0))
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _null_pattern_groups(valid: np.ndarray) -> list:
+    """Agrupa las columnas que tienen exactamente las mismas filas válidas"""
+    groups = {}
+    for j in range(valid.shape[1]):
+        groups.setdefault(np.packbits(valid[:, j]).tobytes(), []).append(j)
+    return list(groups.values())
+
+
+def _rank_blocks(data: np.ndarray, valid: np.ndarray, groups: list, a: int, is_target: np.ndarray,
+                 all_targets: bool, methods: list, sampling: tuple) -> list:
+    """
+    Spearman y Kendall de los bloques del grupo `a` con él mismo y con los
+    grupos siguientes, cada uno sobre su máscara conjunta de filas válidas.
+
+    Returns:
+        list: (columnas, pares calculados, spearman, (kendall, p_valores), filas de Kendall)
+        por bloque; las matrices son del tamaño del bloque y valen solo en los pares
+    """
+    group_a = groups[a]
+    blocks = []
+    for group_b in groups[a:]:
+        same = group_b is group_a
+        columns = group_a if same else group_a + group_b
+        local_target = is_target[columns]
+        if not local_target.any():
+            continue
+        rows = valid[:, group_a[0]] & valid[:, group_b[0]]
+        if rows.sum() < 2:
+            continue
+        block = data[np.ix_(rows, columns)]
+
+        # Pares del bloque a calcular: los que involucran columnas objetivo
+        # y, con dos grupos, solo los cruzados (los internos de cada grupo
+        # se calculan con sus propias filas en su turno)
+        pairs = local_target[:, None] | local_target[None, :]
+        if not same:
+            in_a = np.arange(len(columns)) < len(group_a)
+            pairs &= in_a[:, None] != in_a[None, :]
+
+        block_spearman = None
+        if "spearman" in methods:
+            if same and all_targets:
+                block_spearman = spearman_matrix(block)
+            else:
+                # Pearson de rangos solo entre las columnas con pares a calcular
+                ranks = stats.rankdata(block, axis=0)
+                left = np.flatnonzero(pairs.any(axis=1))
+                block_spearman = np.full(pairs.shape, np.nan)
+                cross = _cross_pearson(ranks[:, left], ranks)
+                block_spearman[left] = cross
+                block_spearman[:, left] = cross.T
+
+        block_kendall, block_kendall_rows = None, 0
+        if "kendall" in methods:
+            kendall_results, block_kendall_rows = sampled_correlation_matrices(
+                block, ["kendall"], *sampling,
+                kendall_pairs=None if same and all_targets else pairs, kendall_workers=1,
+            )
+            block_kendall = kendall_results["kendall"]
+        blocks.append((columns, pairs, block_spearman, block_kendall, block_kendall_rows))
+    return blocks
+
+
+def pairwise_correlation_matrices(data: np.ndarray, methods=CORRELATION_METHODS,
+                                  kendall_sample_threshold: int = KENDALL_SAMPLE_THRESHOLD,
+                                  kendall_sample_size: int = KENDALL_SAMPLE_SIZE,
+                                  seed: Optional[int] = 0,
+                                  targets: Optional[list] = None):
+    """
+    Correlaciones pairwise-complete: cada par se calcula con las filas donde
+    ambas variables son válidas, en lugar de descartar toda fila con algún nulo.
+
+    - Pearson sale de sumas enmascaradas (ver `masked_pearson_matrix`).
+    - Spearman y Kendall necesitan rangos dentro de la máscara del par. Las
+      columnas con el mismo patrón de nulos comparten filas válidas, así que se
+      resuelve un bloque por cada par de grupos sobre su máscara conjunta. Sin
+      nulos hay un único grupo y el costo es el del cálculo denso. Los bloques
+      de cada grupo se calculan en lote en un único pool de hilos por llamada;
+      si cada columna tiene su propio patrón, el costo sigue siendo un bloque
+      por par (lo exige el pairwise-complete), pero sin crear un pool por bloque.
+
+    Con `targets` solo se calculan los pares que involucran esas columnas (para
+    actualizar una matriz previa cuando cambiaron unas pocas columnas).
+
+    Args:
+        data: Matriz float (filas x variables); los nulos son NaN
+        methods: Subconjunto de "pearson", "spearman", "kendall"
+        kendall_sample_threshold: Filas a partir de las cuales Kendall muestrea (0 = nunca)
+        kendall_sample_size: Tamaño de la muestra de Kendall
+        seed: Semilla de la muestra
+        targets: Índices de las columnas a recalcular (por defecto, todas)
+
+    Returns:
+        tuple: ({método: (correlaciones, p_valores)}, filas por par, filas de Kendall por par)
+    """
+    for method in methods:
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Método de correlación no soportado: {method}")
+
+    n_vars = data.shape[1]
+    valid = ~np.isnan(data)
+    groups = _null_pattern_groups(valid)
+    if len(groups) == 1 and targets is None:
+        # Todas las columnas comparten filas válidas: es el cálculo denso
+        block = data[valid[:, 0]] if n_vars else data
+        if len(block) < 2:
+            nan = np.full((n_vars, n_vars), np.nan)
+            np.fill_diagonal(nan, 1.0)
+            empty = (nan, np.where(np.eye(n_vars, dtype=bool), 0.0, np.nan))
+            rows = np.full((n_vars, n_vars), len(block), dtype=np.int64)
+            return {method: empty for method in methods}, rows, rows.copy()
+        results, block_kendall_rows = sampled_correlation_matrices(
+            block, methods, kendall_sample_threshold, kendall_sample_size, seed
+        )
+        pair_rows = np.full((n_vars, n_vars), len(block), dtype=np.int64)
+        return results, pair_rows, np.full((n_vars, n_vars), block_kendall_rows, dtype=np.int64)
+
+    is_target = np.ones(n_vars, dtype=bool)
+    if targets is not None:
+        is_target = np.zeros(n_vars, dtype=bool)
+        is_target[list(targets)] = True
+
+    pearson, pair_rows = masked_pearson_matrix(data, None if targets is None else np.flatnonzero(is_target))
+    kendall_rows = pair_rows.copy()
+    results = {}
+    if "pearson" in methods:
+        results["pearson"] = (pearson, _pairwise_p_values(pearson, pair_rows))
+
+    rank_methods = [method for method in methods if method != "pearson"]
+    if rank_methods:
+        spearman = np.full((n_vars, n_vars), np.nan)
+        kendall = (np.full((n_vars, n_vars), np.nan), np.full((n_vars, n_vars), np.nan))
+        sampling = (kendall_sample_threshold, kendall_sample_size, seed)
+        # Un solo pool para toda la llamada y una tarea por grupo (todos sus
+        # bloques en lote); Kendall corre sin pool propio dentro de cada tarea.
+        # Las matrices se escriben en este hilo a medida que llegan los bloques.
+        workers = min(len(groups), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batches = executor.map(
+                lambda a: _rank_blocks(data, valid, groups, a, is_target, targets is None, rank_methods, sampling),
+                range(len(groups)),
+            )
+            for blocks in batches:
+                for columns, pairs, block_spearman, block_kendall, block_kendall_rows in blocks:
+                    target = np.ix_(columns, columns)
+                    if block_spearman is not None:
+                        spearman[target] = np.where(pairs, block_spearman, spearman[target])
+                    if block_kendall is not None:
+                        for result, values in zip(kendall, block_kendall):
+                            result[target] = np.where(pairs, values, result[target])
+                        kendall_rows[target] = np.where(pairs, block_kendall_rows, kendall_rows[target])
+
+        if "spearman" in methods:
+            np.fill_diagonal(spearman, 1.0)
+            results["spearman"] = (spearman, _pairwise_p_values(spearman, pair_rows))
+        if "kendall" in methods:
+            np.fill_diagonal(kendall[0], 1.0)
+            np.fill_diagonal(kendall[1], 0.0)
+            results["kendall"] = kendall
+
+    return {method: results[method] for method in methods}, pair_rows, kendall_rows
+
+
+def merge_correlation_update(previous, update, targets: list):
+    """
+    Combina una matriz previa con un recálculo parcial: las filas y columnas
+    de `targets` se toman de `update` y el resto se conserva.
+
+    Args:
+        previous: Matriz (o tupla de matrices) calculada antes del cambio
+        update: Resultado con el mismo formato calculado con `targets`
+        targets: Índices de las columnas recalculadas
+
+    Returns:
+        Matriz (o tupla) combinada
+    """
+    if isinstance(previous, tuple):
+        return tuple(merge_correlation_update(p, u, targets) for p, u in zip(previous, update))
+    merged = np.array(previous, copy=True)
+    merged[targets] = update[targets]
+    merged[:, targets] = update[:, targets]
+    return merged
+
+
+def _pairwise_p_values(corr: np.ndarray, pair_rows: np.ndarray) -> np.ndarray:
+    """P-valores del triángulo superior con las filas de cada par, reflejados al inferior"""
+    n_vars = corr.shape[0]
+    upper = np.triu_indices(n_vars, k=1)
+    p_values = np.zeros((n_vars, n_vars))
+    p_values[upper] = t_test_p_values(corr[upper], pair_rows[upper])
+    p_values.T[upper] = p_values[upper]
+    return p_values
+
+
+def pair_scores(correlations: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pares del triángulo superior y su correlación absoluta promedio entre los
+    métodos disponibles (los NaN no cuentan; sin ningún valor el puntaje es 0).
+
+    Args:
+        correlations: {método: matriz de correlaciones}
+
+    Returns:
+        tuple: (índices i, índices j, puntajes) en el orden (i, j > i)
+    """
+    matrices = list(correlations.values())
+    rows, cols = np.triu_indices(matrices[0].shape[0], k=1)
+    total = np.zeros(len(rows))
+    count = np.zeros(len(rows))
+    # Suma en el orden de los métodos, igual que sumar los valores en Python
+    for corr in matrices:
+        values = corr[rows, cols]
+        valid = np.isfinite(values)
+        total += np.where(valid, np.abs(values), 0.0)
+        count += valid
+    scores = np.divide(total, count, out=np.zeros(len(rows)), where=count > 0)
+    return rows, cols, scores
+
+
+def rank_pairs(scores: np.ndarray, limit: int, offset: int = 0,
+               min_abs_corr: float = 0.0) -> Tuple[np.ndarray, int]:
+    """
+    Posiciones offset..offset+limit del ranking de pares por puntaje (de mayor
+    a menor; a igual puntaje, el orden original). Usa un ordenamiento parcial
+    (argpartition) y solo ordena los primeros offset + limit pares.
+
+    Args:
+        scores: Puntaje de cada par
+        limit: Pares a devolver
+        offset: Pares a saltar (cursor)
+        min_abs_corr: Puntaje mínimo para entrar al ranking
+
+    Returns:
+        tuple: (índices de los pares de la página, pares que superan el umbral)
+    """
+    eligible = np.flatnonzero(scores >= min_abs_corr) if min_abs_corr > 0 else np.arange(len(scores))
+    end = min(offset + limit, len(eligible))
+    if end <= offset:
+        return np.empty(0, dtype=np.int64), len(eligible)
+
+    values = scores[eligible]
+    if end < len(values):
+        # Los `end` mejores; en el límite los empates se resuelven por posición
+        threshold = values[np.argpartition(-values, end - 1)[:end]].min()
+        above = np.flatnonzero(values > threshold)
+        ties = np.flatnonzero(values == threshold)[:end - len(above)]
+        chosen = np.concatenate([above, ties])
+    else:
+        chosen = np.arange(len(values))
+    chosen = chosen[np.lexsort((chosen, -values[chosen]))]
+    return eligible[chosen[offset:end]], len(eligible)
@@ -0,0 +1,302 @@
+"""
+Codificación de variables categóricas con los códigos físicos de Polars.
+
+Cada columna se convierte a Categorical (el diccionario se arma en una sola
+pasada) y sus códigos físicos se traducen con una tabla del tamaño del
+diccionario, de modo que el código final es la posición de la categoría en el
+orden ordenado: el resultado no depende del orden de aparición de los valores.
+Las categorías ordenadas se guardan en el encoder para aplicar la misma
+codificación en inferencia.
+
+Las columnas de alta cardinalidad (identificadores) no se codifican como
+ordinales: según el label se usa target encoding fuera de fold o feature
+hashing (ver `choose_encoding`). Ambos trabajan sobre un hash estable de cada
+categoría reducido a un número fijo de buckets, así que la memoria del encoder
+no depende de la cardinalidad.
+"""
+import zlib
+import numpy as np
+import polars as pl
+from typing import Any, Dict, Optional, Tuple
+
+CATEGORICAL_DTYPES = ["Utf8", "String", "Categorical"]
+
+# Código de los valores que no están entre las categorías (y de los nulos sin relleno)
+UNKNOWN_CODE = -1
+
+# Más categorías que esto: target encoding o hashing en lugar de códigos ordinales
+ORDINAL_MAX_CATEGORIES = 50
+
+# Columnas (+1/-1/0) que genera el feature hashing de cada variable
+HASHING_BUCKETS = 16
+
+# Target encoding: buckets de la tabla guardada, folds y suavizado hacia la media global
+TARGET_ENCODING_BUCKETS = 1 << 16
+TARGET_ENCODING_FOLDS = 5
+TARGET_ENCODING_SMOOTHING = 20.0
+
+
+def is_categorical(dtype) -> bool:
+    """Indica si un tipo de Polars se codifica como categórico"""
+    return str(dtype) in CATEGORICAL_DTYPES
+
+
+def _as_text(series: pl.Series, normalize: bool) -> pl.Series:
+    """Valores como texto; con normalize se quitan espacios y se pasa a minúsculas"""
+    if str(series.dtype) == "Categorical":
+        series = series.cast(pl.Utf8)
+    if normalize:
+        series = series.str.strip_chars().str.to_lowercase()
+    return series
+
+
+def _filled_text(series: pl.Series, normalize: bool, fill_null: bool) -> Tuple[pl.Series, Optional[str]]:
+    """Texto normalizado y, con fill_null, nulos -> moda (la menor si hay empate)"""
+    text = _as_text(series, normalize)
+    fill_value = None
+    if fill_null:
+        modes = text.drop_nulls().mode()
+        if len(modes) > 0:
+            fill_value = modes.sort()[0]
+            text = text.fill_null(fill_value)
+    return text, fill_value
+
+
+def _physical_codes(series: pl.Series) -> Tuple[pl.Series, pl.Series]:
+    """Diccionario (categorías en orden de aparición) y códigos físicos de la serie"""
+    categorical = series.cast(pl.Categorical)
+    return categorical.cat.get_categories(), categorical.to_physical()
+
+
+def _translate(codes_by_category: np.ndarray, physical: pl.Series, name: str) -> pl.Series:
+    """Traduce los códigos físicos con una tabla por categoría (nulos -> UNKNOWN_CODE)"""
+    table = pl.Series(name, np.append(codes_by_category, UNKNOWN_CODE).astype(np.int64))
+    return table.gather(physical.fill_null(len(codes_by_category)))
+
+
+def fit_category_encoder(series: pl.Series, normalize: bool = True,
+                         fill_null: bool = True) -> Tuple[pl.Series, Dict[str, Any]]:
+    """
+    Ajusta el encoder de una columna categórica y la codifica.
+
+    Args:
+        series: Columna de texto o Categorical
+        normalize: Quitar espacios y pasar a minúsculas antes de codificar
+        fill_null: Completar los nulos con la moda (la menor si hay empate)
+
+    Returns:
+        tuple: (códigos Int64, encoder {"categories", "fill_value", "normalize"})
+    """
+    text, fill_value = _filled_text(series, normalize, fill_null)
+    dictionary, physical = _physical_codes(text)
+    return _fit_ordinal(dictionary, physical, series.name, fill_value, normalize)
+
+
+def _fit_ordinal(dictionary: pl.Series, physical: pl.Series, name: str,
+                 fill_value: Optional[str], normalize: bool) -> Tuple[pl.Series, Dict[str, Any]]:
+    order = dictionary.arg_sort()
+    ranks = np.empty(len(dictionary), dtype=np.int64)
+    ranks[order.to_numpy()] = np.arange(len(dictionary))
+
+    encoder = {
+        "strategy": "ordinal",
+        "categories": dictionary.gather(order).to_list(),
+        "fill_value": fill_value,
+        "normalize": normalize,
+    }
+    return _translate(ranks, physical, name), encoder
+
+
+def apply_category_encoder(series: pl.Series, encoder: Dict[str, Any]) -> pl.Series:
+    """
+    Codifica una columna con un encoder ya ajustado (p.ej. en inferencia). Los
+    valores que no están entre las categorías reciben UNKNOWN_CODE.
+    """
+    text = _as_text(series, encoder["normalize"])
+    if encoder["fill_value"] is not None:
+        text = text.fill_null(encoder["fill_value"])
+
+    dictionary, physical = _physical_codes(text)
+    categories = pl.Series(encoder["categories"], dtype=pl.Utf8)
+    if len(categories) == 0:
+        return _translate(np.full(len(dictionary), UNKNOWN_CODE), physical, series.name)
+
+    # Cada categoría del diccionario se busca entre las ordenadas (k búsquedas, no n)
+    position = np.minimum(categories.search_sorted(dictionary).to_numpy(), len(categories) - 1)
+    known = (categories.gather(position) == dictionary).to_numpy()
+    return _translate(np.where(known, position, UNKNOWN_CODE), physical, series.name)
+
+
+def choose_encoding(n_categories: int, target_encodable: bool) -> str:
+    """
+    Estrategia por cardinalidad: códigos ordinales hasta ORDINAL_MAX_CATEGORIES;
+    por encima, target encoding si el label lo permite (regresión o binario) y
+    feature hashing si no (multiclase).
+    """
+    if n_categories <= ORDINAL_MAX_CATEGORIES:
+        return "ordinal"
+    return "target" if target_encodable else "hashing"
+
+
+def _stable_hashes(dictionary: pl.Series, physical: pl.Series, name: str) -> pl.Series:
+    """
+    CRC32 de cada valor (estable entre procesos y versiones); se calcula una vez
+    por categoría y se reparte a las filas con los códigos físicos (nulos -> -1)
+    """
+    hashes = np.fromiter(
+        (zlib.crc32(value.encode("utf-8")) for value in dictionary),
+        dtype=np.int64, count=len(dictionary)
+    )
+    return _translate(hashes, physical, name)
+
+
+def _hashed_columns(hashes: np.ndarray, name: str, n_buckets: int) -> pl.DataFrame:
+    """Feature hashing con signo: cada fila suma +1/-1 en el bucket de su valor"""
+    valid = hashes >= 0
+    bucket = np.where(valid, hashes % n_buckets, -1)
+    sign = np.where((hashes >> 16) & 1, 1, -1).astype(np.int8)
+    return pl.DataFrame({
+        f"{name}__hash_{i}": np.where(bucket == i, sign, 0).astype(np.int8) for i in range(n_buckets)
+    })
+
+
+def _target_table(buckets: np.ndarray, target: np.ndarray, n_buckets: int, smoothing: float,
+                  folds: int, seed: int) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Target encoding fuera de fold con agregaciones `group_by`: cada fila recibe
+    la media suavizada del target en su bucket calculada sin su fold; la tabla
+    para inferencia usa todas las filas.
+    """
+    prior = float(target.mean())
+    frame = pl.DataFrame({
+        "bucket": buckets,
+        "fold": np.random.default_rng(seed).integers(0, folds, len(target)),
+        "y": target,
+    })
+    per_fold = frame.group_by(["bucket", "fold"]).agg([
+        pl.col("y").sum().alias("fold_sum"), pl.count().alias("fold_count")
+    ])
+    totals = per_fold.group_by("bucket").agg([
+        pl.col("fold_sum").sum().alias("sum"), pl.col("fold_count").sum().alias("count")
+    ])
+    out_of_fold = per_fold.join(totals, on="bucket").select([
+        "bucket", "fold",
+        ((pl.col("sum") - pl.col("fold_sum") + prior * smoothing)
+         / (pl.col("count") - pl.col("fold_count") + smoothing)).alias("value"),
+    ])
+    encoded = frame.join(out_of_fold, on=["bucket", "fold"], how="left").get_column("value").to_numpy()
+
+    table = np.full(n_buckets, prior, dtype=np.float32)
+    known = totals.filter(pl.col("bucket") >= 0)
+    table[known["bucket"].to_numpy()] = (
+        (known["sum"].to_numpy() + prior * smoothing) / (known["count"].to_numpy() + smoothing)
+    )
+    return encoded, table, prior
+
+
+def fit_feature_encoder(series: pl.Series, target_encodable: bool = False,
+                        normalize: bool = True) -> Tuple[pl.DataFrame, Dict[str, Any]]:
+    """
+    Ajusta el encoder de una feature categórica eligiendo la estrategia por
+    cardinalidad (`choose_encoding`) y la codifica.
+
+    El target encoding no se ajusta aquí: la columna queda con el bucket de
+    cada fila y el encoder sin tabla. `fit_target_encoder` lo ajusta después
+    solo con las filas de entrenamiento, para que las de test no vean su label.
+
+    Args:
+        series: Columna de texto o Categorical
+        target_encodable: El label admite target encoding (regresión o binario)
+        normalize: Quitar espacios y pasar a minúsculas antes de codificar
+
+    Returns:
+        tuple: (DataFrame con la columna codificada, los buckets del target
+        encoding o HASHING_BUCKETS columnas con hashing; encoder con "strategy")
+    """
+    name = series.name
+    text, fill_value = _filled_text(series, normalize, True)
+    dictionary, physical = _physical_codes(text)
+    strategy = choose_encoding(len(dictionary), target_encodable)
+    if strategy == "ordinal":
+        codes, encoder = _fit_ordinal(dictionary, physical, name, fill_value, normalize)
+        return codes.to_frame(), encoder
+
+    encoder = {"strategy": strategy, "fill_value": fill_value, "normalize": normalize,
+               "n_categories": len(dictionary)}
+    hashes = _stable_hashes(dictionary, physical, name).to_numpy()
+    if strategy == "hashing":
+        encoder["buckets"] = HASHING_BUCKETS
+        return _hashed_columns(hashes, name, HASHING_BUCKETS), encoder
+
+    encoder["buckets"] = TARGET_ENCODING_BUCKETS
+    return pl.DataFrame({name: np.where(hashes >= 0, hashes % TARGET_ENCODING_BUCKETS, -1)}), encoder
+
+
+def fit_target_encoder(buckets: np.ndarray, target: np.ndarray, encoder: Dict[str, Any],
+                       seed: int = 42) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Ajusta un target encoding (de `fit_feature_encoder`) con las filas dadas.
+
+    Args:
+        buckets: Bucket de cada fila (-1 para nulos)
+        target: Label numérico de esas filas
+        encoder: Encoder sin ajustar
+        seed: Semilla de la asignación de folds
+
+    Returns:
+        tuple: (valores fuera de fold de esas filas, encoder con la tabla de
+        todas ellas para codificar filas nuevas con `target_encode`)
+    """
+    values, table, prior = _target_table(
+        np.asarray(buckets, dtype=np.int64), np.asarray(target, dtype=np.float64), encoder["buckets"],
+        TARGET_ENCODING_SMOOTHING, TARGET_ENCODING_FOLDS, seed
+    )
+    fitted = {
+        **encoder,
+        "folds": TARGET_ENCODING_FOLDS,
+        "smoothing": TARGET_ENCODING_SMOOTHING,
+        "prior": prior,
+        "table": table,
+    }
+    return values, fitted
+
+
+def target_encode(buckets: np.ndarray, encoder: Dict[str, Any]) -> np.ndarray:
+    """Valor del target encoding ajustado para cada bucket (la media global para nulos)"""
+    table = np.append(encoder["table"], encoder["prior"]).astype(np.float64)
+    return table[np.asarray(buckets, dtype=np.int64)]
+
+
+def transform_feature(series: pl.Series, encoder: Dict[str, Any]) -> pl.DataFrame:
+    """Codifica una feature con su encoder ajustado (cualquier estrategia)"""
+    strategy = encoder.get("strategy", "ordinal")
+    if strategy == "ordinal":
+        return apply_category_encoder(series, encoder).to_frame()
+
+    text = _as_text(series, encoder["normalize"])
+    if encoder["fill_value"] is not None:
+        text = text.fill_null(encoder["fill_value"])
+    dictionary, physical = _physical_codes(text)
+    hashes = _stable_hashes(dictionary, physical, series.name).to_numpy()
+    if strategy == "hashing":
+        return _hashed_columns(hashes, series.name, encoder["buckets"])
+
+    buckets = np.where(hashes >= 0, hashes % encoder["buckets"], -1)
+    return pl.DataFrame({series.name: target_encode(buckets, encoder)})
+
+
+def describe_encoder(encoder: Dict[str, Any]) -> Dict[str, Any]:
+    """Resumen serializable a JSON de un encoder (sin la tabla del target encoding)"""
+    return {key: value for key, value in encoder.items() if key != "table"}
+
+
+def apply_category_encoders(df: pl.DataFrame, encoders: Dict[str, Dict[str, Any]]) -> pl.DataFrame:
+    """
+    Codifica las columnas de `encoders` presentes en el DataFrame; las columnas
+    con hashing se reemplazan por sus buckets en la misma posición.
+    """
+    frames = [
+        transform_feature(df[col], encoders[col]) if col in encoders else df.select(col)
+        for col in df.columns
+    ]
+    return pl.concat(frames, how="horizontal")
@@ -0,0 +1,326 @@
+"""
+Imputación de valores faltantes para datasets grandes: KNN por bloques con
+árboles de vecinos (KD-tree / Ball-tree) sobre las filas completas, MICE
+iterativo con progreso, parada temprana y cancelación, y limpieza por mediana
+fuera de memoria sobre un LazyFrame.
+"""
+import logging
+import os
+import numpy as np
+import polars as pl
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from core.correlations import reservoir_sample_indices
+
+logger = logging.getLogger(__name__)
+
+# Filas con faltantes consultadas por bloque (acota la memoria de cada consulta)
+KNN_CHUNK_ROWS = 20_000
+
+# Hasta esta cantidad de dimensiones observadas se usa KD-tree; con más, Ball-tree
+KD_TREE_MAX_DIMENSIONS = 15
+
+# Patrones de faltantes con menos filas se resuelven por fuerza bruta (construir
+# un árbol sobre todas las filas completas cuesta más que las pocas consultas)
+KNN_BRUTE_FORCE_ROWS = 64
+_BRUTE_FORCE_ELEMENTS = 1 << 22
+
+# Filas completas usadas como donantes; con más se toma una muestra reservoir
+# (el tiempo de cada consulta crece con el tamaño del árbol)
+KNN_MAX_DONORS = 200_000
+
+# MICE se detiene cuando la norma infinito del cambio entre iteraciones (máxima
+# suma por fila de los cambios absolutos) es menor que tol * (máximo valor
+# absoluto observado), el mismo criterio de IterativeImputer
+MICE_TOLERANCE = 1e-3
+
+# Estrategia de imputación según cantidad de filas (ver `imputation_strategy`)
+KNN_EXACT_MAX_ROWS = 5_000
+MICE_MAX_ROWS = 50_000
+KNN_MAX_ROWS = 2_000_000
+
+
+class ImputationCancelled(Exception):
+    """La imputación se canceló antes de terminar"""
+
+
+def imputation_strategy(n_rows: int, knn_max_rows: int = KNN_MAX_ROWS) -> dict:
+    """
+    Método de imputación para un dataset de `n_rows` filas:
+    - ≤5,000 filas: KNNImputer de sklearn (donantes con faltantes incluidos)
+    - 5,001-50,000 filas: MICE/IterativeImputer
+    - hasta `knn_max_rows`: KNN por bloques con árboles de vecinos (`knn_impute`)
+    - más filas: mediana
+
+    Returns:
+        dict: key, method (nombre para mostrar) y description
+    """
+    if n_rows <= KNN_EXACT_MAX_ROWS:
+        return {"key": "knn", "method": "KNN Imputation",
+                "description": "Máxima precisión usando K-Nearest Neighbors"}
+    if n_rows <= MICE_MAX_ROWS:
+        return {"key": "mice", "method": "MICE (IterativeImputer)",
+                "description": "Multivariate Imputation by Chained Equations - captura relaciones entre variables"}
+    if n_rows <= knn_max_rows:
+        return {"key": "knn_tree", "method": "KNN Imputation (tree-indexed)",
+                "description": "K-Nearest Neighbors por bloques con KD-tree/Ball-tree sobre las filas completas"}
+    return {"key": "median", "method": "Median Imputation",
+            "description": "Imputación rápida por mediana para datasets masivos"}
+
+
+def _brute_force_neighbors(reference: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    Índices de los k vecinos más cercanos por distancia euclídea, sin árbol. Las
+    consultas se procesan por grupos para que la matriz de distancias no supere
+    `_BRUTE_FORCE_ELEMENTS` elementos.
+    """
+    reference_norms = (reference ** 2).sum(axis=1)
+    step = max(1, _BRUTE_FORCE_ELEMENTS // len(reference))
+    neighbors = np.empty((len(queries), k), dtype=np.intp)
+    for start in range(0, len(queries), step):
+        block = queries[start:start + step]
+        # |q|² es constante por fila: no cambia el orden de los vecinos
+        distances = reference_norms[None, :] - 2 * block @ reference.T
+        neighbors[start:start + step] = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return neighbors
+
+
+def knn_impute(
+    data: np.ndarray,
+    n_neighbors: int = 5,
+    chunk_rows: int = KNN_CHUNK_ROWS,
+    max_workers: Optional[int] = None,
+    max_donors: Optional[int] = KNN_MAX_DONORS,
+    seed: int = 42,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> np.ndarray:
+    """
+    Imputación KNN escalable: cada valor faltante es el promedio (pesos
+    uniformes, como KNNImputer) de sus k vecinos más cercanos entre las filas
+    completas, con la distancia euclídea sobre las columnas observadas de la fila.
+
+    Las filas con faltantes se agrupan por patrón de faltantes. Para cada patrón
+    se indexan las filas completas proyectadas en sus columnas observadas con un
+    KD-tree (o Ball-tree con muchas dimensiones) y se consultan por bloques de
+    `chunk_rows` filas en un pool de hilos (las consultas de sklearn liberan el
+    GIL). La memoria por consulta es O(chunk_rows * k), no O(n²). La
+    cancelación se consulta antes de cada bloque.
+
+    Args:
+        data: Matriz (filas x columnas) con NaN en los faltantes
+        n_neighbors: Vecinos por fila
+        chunk_rows: Filas con faltantes por bloque
+        max_workers: Hilos del pool (None = núcleos disponibles)
+        max_donors: Máximo de filas completas indexadas (None = todas)
+        seed: Semilla de la muestra de donantes
+        should_stop: Si devuelve True, se lanza `ImputationCancelled`
+
+    Returns:
+        np.ndarray: Copia de `data` sin faltantes (las filas sin ninguna columna
+        observada o sin filas completas de referencia usan la media de la columna)
+    """
+    from sklearn.neighbors import BallTree, KDTree
+
+    data = np.array(data, dtype=np.float64)
+    missing = np.isnan(data)
+    incomplete = missing.any(axis=1)
+    if not incomplete.any():
+        return data
+
+    sums = np.where(missing, 0.0, data).sum(axis=0)
+    observed_counts = (~missing).sum(axis=0)
+    means = np.divide(sums, observed_counts, out=np.full(data.shape[1], np.nan), where=observed_counts > 0)
+
+    complete = data[~incomplete]
+    if max_donors is not None and len(complete) > max_donors:
+        complete = complete[reservoir_sample_indices(len(complete), max_donors, seed=seed)]
+    incomplete_rows = np.flatnonzero(incomplete)
+    if len(complete) == 0:
+        rows, cols = np.nonzero(missing)
+        data[rows, cols] = means[cols]
+        return data
+    k = min(n_neighbors, len(complete))
+
+    # Patrones de faltantes, del más frecuente al menos frecuente
+    patterns, inverse, counts = np.unique(
+        missing[incomplete], axis=0, return_inverse=True, return_counts=True
+    )
+    inverse = inverse.ravel()
+
+    def impute_block(neighbors_of, donors: np.ndarray, observed: np.ndarray, rows: np.ndarray):
+        if should_stop is not None and should_stop():
+            raise ImputationCancelled()
+        neighbors = neighbors_of(data[np.ix_(rows, observed)])
+        data[np.ix_(rows, ~observed)] = donors[neighbors].mean(axis=1)
+
+    workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for p in np.argsort(-counts, kind="stable"):
+            observed = ~patterns[p]
+            members = incomplete_rows[inverse == p]
+            if not observed.any():
+                data[np.ix_(members, ~observed)] = means
+                continue
+
+            reference = complete[:, observed]
+            donors = complete[:, ~observed]
+            if len(members) < KNN_BRUTE_FORCE_ROWS:
+                neighbors_of = lambda queries, reference=reference: _brute_force_neighbors(reference, queries, k)
+                impute_block(neighbors_of, donors, observed, members)
+                continue
+
+            tree_type = KDTree if observed.sum() <= KD_TREE_MAX_DIMENSIONS else BallTree
+            tree = tree_type(reference)
+            neighbors_of = lambda queries, tree=tree: tree.query(queries, k=k, return_distance=False)
+            # Cada bloque escribe solo sus filas: no hay escrituras concurrentes compartidas
+            list(pool.map(
+                lambda start: impute_block(neighbors_of, donors, observed, members[start:start + chunk_rows]),
+                range(0, len(members), chunk_rows),
+            ))
+    return data
+
+
+def mice_impute(
+    data: np.ndarray,
+    estimator_factory: Callable,
+    max_iter: int = 10,
+    tol: float = MICE_TOLERANCE,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Tuple[np.ndarray, dict]:
+    """
+    MICE (Multivariate Imputation by Chained Equations) con el mismo esquema
+    que IterativeImputer: imputación inicial por la media y, en cada iteración,
+    cada columna con faltantes (de menos a más faltantes) se predice a partir
+    de las demás con un estimador nuevo.
+
+    La parada temprana es la de IterativeImputer: norma infinito del cambio
+    entre iteraciones (máxima suma por fila de los cambios absolutos) menor que
+    tol * (máximo valor absoluto observado). A diferencia de IterativeImputer,
+    informa el avance después de cada iteración y se puede cancelar entre columnas.
+
+    Args:
+        data: Matriz (filas x columnas) con NaN en los faltantes
+        estimator_factory: Función sin argumentos que crea un regresor de sklearn
+        max_iter: Máximo de iteraciones
+        tol: Tolerancia relativa de la parada temprana
+        progress: Se llama con (iteración, max_iter, norma del cambio) al terminar cada iteración
+        should_stop: Si devuelve True, se lanza `ImputationCancelled`
+
+    Returns:
+        tuple: (datos imputados, {iterations, max_iter, converged, changes, tolerance})
+    """
+    data = np.array(data, dtype=np.float64)
+    missing = np.isnan(data)
+    report = {"iterations": 0, "max_iter": max_iter, "converged": True, "changes": [], "tolerance": 0.0}
+    if not missing.any():
+        return data, report
+
+    observed_counts = (~missing).sum(axis=0)
+    sums = np.where(missing, 0.0, data).sum(axis=0)
+    # Columnas sin ningún valor: 0 (no hay con qué estimarlas)
+    means = np.divide(sums, observed_counts, out=np.zeros(data.shape[1]), where=observed_counts > 0)
+    observed_max = float(np.abs(data[~missing]).max()) if (~missing).any() else 0.0
+    rows, cols = np.nonzero(missing)
+    data[rows, cols] = means[cols]
+
+    targets = [
+        col for col in np.argsort(missing.sum(axis=0), kind="stable")
+        if 0 < observed_counts[col] and missing[:, col].any()
+    ]
+    if data.shape[1] < 2 or not targets:
+        return data, report
+
+    normalized_tol = tol * observed_max
+    report["tolerance"] = normalized_tol
+    report["converged"] = False
+    missing_rows = np.nonzero(missing)[0]
+    for iteration in range(1, max_iter + 1):
+        previous = data[missing]
+        for col in targets:
+            if should_stop is not None and should_stop():
+                raise ImputationCancelled()
+            rows = missing[:, col]
+            others = np.arange(data.shape[1]) != col
+            estimator = estimator_factory()
+            estimator.fit(data[~rows][:, others], data[~rows, col])
+            data[rows, col] = estimator.predict(data[rows][:, others])
+
+        # Norma infinito de la matriz de cambios (solo cambian las celdas faltantes)
+        change = float(np.bincount(missing_rows, weights=np.abs(data[missing] - previous)).max())
+        report["iterations"] = iteration
+        report["changes"].append(change)
+        if progress is not None:
+            progress(iteration, max_iter, change)
+        if change < normalized_tol:
+            report["converged"] = True
+            break
+    return data, report
+
+
+def clean_out_of_core(lf: pl.LazyFrame, cols: List[str], bounds: dict, output_path: str) -> dict:
+    """
+    Limpieza por mediana sin materializar el dataset: los outliers (fuera de
+    `bounds`) pasan a null y los nulos se completan con la mediana de los
+    valores que quedan. Todo se arma como expresiones sobre el LazyFrame y el
+    resultado se escribe en Parquet con `sink_parquet`.
+
+    Se hacen dos pasadas en modo streaming: una consulta con las medianas, los
+    outliers y los nulos a completar de cada columna (solo lee esas columnas) y
+    la escritura del resultado, que procesa el archivo por bloques.
+
+    Las columnas conservan su tipo salvo las enteras que se completan con una
+    mediana no entera, que pasan a Float64.
+
+    El motor de streaming no puede escribir desde todos los escaneos (p.ej.
+    `scan_ipc`, el de los datasets de la caché); en ese caso el resultado se
+    materializa y se escribe con `write_parquet` (la lectura sigue siendo
+    perezosa y el archivo IPC se mapea en memoria).
+
+    Args:
+        lf: LazyFrame con el dataset completo
+        cols: Columnas a limpiar
+        bounds: {columna: (límite inferior, límite superior)} (ver `core.outliers`)
+        output_path: Archivo Parquet de salida
+
+    Returns:
+        dict: medians y outliers_nulled por columna
+    """
+    kept = {}
+    for col in cols:
+        lower, upper = bounds.get(col, (None, None))
+        if lower is None:
+            kept[col] = pl.col(col)
+        else:
+            kept[col] = pl.when((pl.col(col) >= lower) & (pl.col(col) <= upper)).then(pl.col(col)).otherwise(None)
+
+    n_cols = len(cols)
+    row = lf.select(
+        [kept[col].median().alias(f"{i}|median") for i, col in enumerate(cols)]
+        + [(pl.col(col).is_not_null() & kept[col].is_null()).sum().alias(f"{i}|nulled") for i, col in enumerate(cols)]
+        + [kept[col].null_count().alias(f"{i}|missing") for i, col in enumerate(cols)]
+    ).collect(streaming=True).row(0)
+    medians = dict(zip(cols, row[:n_cols]))
+    nulled = {col: int(count) for col, count in zip(cols, row[n_cols:2 * n_cols])}
+    missing = dict(zip(cols, row[2 * n_cols:]))
+
+    schema = lf.schema
+    replacements = []
+    for col in cols:
+        median = medians[col]
+        if not missing[col] or median is None:
+            # Nada que completar (o columna sin valores): sin outliers queda igual
+            replacements.append(kept[col].alias(col))
+        elif str(schema[col]).startswith(("Int", "UInt")) and not float(median).is_integer():
+            replacements.append(kept[col].cast(pl.Float64).fill_null(median).alias(col))
+        else:
+            replacements.append(kept[col].fill_null(pl.lit(median).cast(schema[col])).alias(col))
+
+    cleaned = lf.with_columns(replacements)
+    try:
+        cleaned.sink_parquet(output_path)
+    except pl.InvalidOperationError:
+        logger.warning("El escaneo no admite sink_parquet; el resultado limpio se materializa para escribirlo")
+        cleaned.collect(streaming=True).write_parquet(output_path)
+    return {"medians": medians, "outliers_nulled": nulled}
@@ -0,0 +1,423 @@
+"""
+Ingesta de archivos subidos: volcado en streaming a disco y detección de dialecto
+
+"""
+import io
+import os
+import bz2
+import csv
+import zlib
+import codecs
+import hashlib
+import tempfile
+import logging
+from collections import OrderedDict
+
+import chardet
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de cada bloque leído del cuerpo del request
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Bytes iniciales usados para detectar encoding y separador
+SNIFF_BYTES = 64 * 1024
+
+# Bytes que se pasan a chardet cuando el prefijo no es UTF-8 válido
+CHARDET_BYTES = 20 * 1024
+
+# Registros (quote-aware) usados para puntuar cada separador candidato
+SNIFF_MAX_RECORDS = 50
+
+# Dialectos detectados recientemente, indexados por hash del prefijo
+DIALECT_CACHE_SIZE = 128
+
+# Tamaño máximo de cada bloque producido al descomprimir
+DECOMPRESSED_BLOCK_SIZE = 4 * 1024 * 1024  # 4 MB
+
+CSV_SEPARATORS = [',', ';', '\t', '|', ' ']
+
+# Encodings que Polars puede leer directamente desde disco (mmap) sin decodificar en Python
+UTF8_COMPATIBLE = {"ascii", "utf-8", "utf8"}
+
+# Extensiones aceptadas y el formato de lectura correspondiente
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "ipc",
+    ".ipc": "ipc",
+    ".feather": "ipc",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+
+# Compresiones aceptadas (solo para formatos de texto)
+COMPRESSIONS = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+}
+COMPRESSIBLE_FORMATS = {"csv", "ndjson"}
+
+
+def detect_compression(filename: str):
+    """Obtiene la compresión de un archivo a partir de su extensión (None si no está comprimido)"""
+    name = (filename or "").lower()
+    for extension, compression in COMPRESSIONS.items():
+        if name.endswith(extension):
+            return compression
+    return None
+
+
+def detect_format(filename: str):
+    """
+    Obtiene el formato de un archivo a partir de su extensión (None si no es soportado).
+    Ignora el sufijo de compresión: "datos.csv.gz" es "csv".
+    """
+    name = (filename or "").lower()
+    compression = detect_compression(name)
+    if compression is not None:
+        name = name.rsplit(".", 1)[0]
+
+    for extension, file_format in FILE_FORMATS.items():
+        if name.endswith(extension):
+            if compression is not None and file_format not in COMPRESSIBLE_FORMATS:
+                return None
+            return file_format
+    return None
+
+
+class UploadTooLargeError(Exception):
+    """El archivo subido supera el tamaño máximo permitido"""
+
+
+class StreamDecompressor:
+    """
+    Descompresor incremental para gzip, bz2 y zstd.
+
+    Recibe el archivo comprimido bloque a bloque y entrega la salida en bloques
+    acotados, de modo que nunca conviven en memoria el archivo comprimido y el
+    descomprimido. Soporta archivos con varios miembros/frames concatenados.
+    """
+
+    def __init__(self, compression: str):
+        self.compression = compression
+        self._obj = self._new_decompressor()
+
+    def _new_decompressor(self):
+        if self.compression == "gzip":
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.compression == "bz2":
+            return bz2.BZ2Decompressor()
+        if self.compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ValueError("La descompresión zstd requiere el paquete 'zstandard'")
+            return zstandard.ZstdDecompressor().decompressobj()
+        raise ValueError(f"Compresión no soportada: {self.compression}")
+
+    def decompress(self, data: bytes):
+        """Descomprime un bloque y genera la salida en bloques de DECOMPRESSED_BLOCK_SIZE"""
+        while True:
+            obj = self._obj
+            if self.compression == "gzip":
+                block = obj.decompress(data, DECOMPRESSED_BLOCK_SIZE)
+                data = obj.unconsumed_tail
+                pending = bool(data)
+            elif self.compression == "bz2":
+                block = obj.decompress(data, DECOMPRESSED_BLOCK_SIZE)
+                data = b''
+                pending = not obj.eof and not obj.needs_input
+            else:
+                block = obj.decompress(data)
+                data = b''
+                pending = False
+
+            if block:
+                yield block
+
+            if obj.eof:
+                # Siguiente miembro/frame concatenado
+                rest = obj.unused_data
+                if not rest:
+                    return
+                self._obj = self._new_decompressor()
+                data = rest
+            elif not pending:
+                return
+
+    def close(self):
+        """Verifica que el flujo comprimido haya terminado correctamente"""
+        if not self._obj.eof:
+            raise ValueError("El archivo comprimido está incompleto o dañado")
+
+
+_dialect_cache = OrderedDict()
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Detecta el encoding a partir de una muestra acotada del archivo.
+    Si la muestra es UTF-8 válido se evita chardet (el caso más común y el más caro).
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'UTF-8-SIG'
+    if sample.isascii():
+        return 'ascii'
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # Un carácter multibyte cortado al final de la muestra no invalida el UTF-8
+        if e.reason == 'unexpected end of data' and e.start >= len(sample) - 3:
+            return 'utf-8'
+
+    result = chardet.detect(sample[:CHARDET_BYTES])
+    return result['encoding'] or 'utf-8'
+
+
+def rank_separators(text: str, quote_char: str = '"', max_records: int = SNIFF_MAX_RECORDS) -> list:
+    """
+    Puntúa cada separador candidato sobre los primeros registros de la muestra.
+
+    Los registros se leen con el módulo csv, respetando comillas: un separador
+    dentro de un campo entre comillas (o un salto de línea dentro de él) no
+    altera el conteo de campos. El puntaje premia muchos campos, un número
+    de campos constante entre registros y una cabecera coherente con los datos.
+
+    Returns:
+        list: [(separador, puntaje)] ordenado de mejor a peor (solo candidatos válidos)
+    """
+    body = '\n'.join(
+        line for line in text.split('\n') if not line.strip().startswith('#')
+    )
+
+    ranking = []
+    for sep in CSV_SEPARATORS:
+        counts = []
+        try:
+            reader = csv.reader(io.StringIO(body), delimiter=sep, quotechar=quote_char)
+            for row in reader:
+                if not row or not any(field.strip() for field in row):
+                    continue
+                counts.append(len(row) - 1)
+                if len(counts) >= max_records:
+                    break
+        except csv.Error:
+            continue
+
+        if not counts:
+            continue
+        mode = max(set(counts), key=counts.count)
+        if mode < 1:
+            continue
+        consistency = counts.count(mode) / len(counts)
+        score = mode * consistency ** 2
+        if counts[0] != mode:
+            # La cabecera debe tener el mismo número de campos que los datos
+            score *= 0.1
+        ranking.append((sep, score))
+
+    ranking.sort(key=lambda item: item[1], reverse=True)
+    return ranking
+
+
+def sniff_csv(sample: bytes, encoding: str = None) -> dict:
+    """
+    Detecta el dialecto (encoding, separador, comillas) usando solo el prefijo del archivo.
+
+    La última línea de la muestra se descarta porque puede estar cortada
+    a mitad de registro (o de un carácter multibyte). El resultado se
+    cachea por hash del prefijo, así que re-subir el mismo archivo (o
+    volver a escanearlo) no repite la detección.
+
+    Args:
+        sample: Prefijo del archivo (se usan como máximo SNIFF_BYTES)
+        encoding: Encoding ya conocido (omite su detección)
+
+    Returns:
+        dict: {"encoding", "separator", "quote_char", "candidates"} donde
+        candidates es la lista de separadores válidos ordenada por puntaje
+    """
+    sample = sample[:SNIFF_BYTES]
+    key = (hashlib.blake2b(sample, digest_size=16).hexdigest(), encoding)
+    if key in _dialect_cache:
+        _dialect_cache.move_to_end(key)
+        return dict(_dialect_cache[key])
+
+    encoding = encoding or detect_encoding(sample)
+
+    try:
+        text = sample.decode(encoding, errors='replace')
+    except LookupError:
+        encoding = 'utf-8'
+        text = sample.decode('utf-8', errors='replace')
+
+    if '\n' in text:
+        text = text.rsplit('\n', 1)[0]
+
+    candidates = [sep for sep, _ in rank_separators(text)]
+    dialect = {
+        "encoding": encoding,
+        "separator": candidates[0] if candidates else ',',
+        "quote_char": '"',
+        "candidates": candidates,
+    }
+
+    _dialect_cache[key] = dialect
+    if len(_dialect_cache) > DIALECT_CACHE_SIZE:
+        _dialect_cache.popitem(last=False)
+
+    return dict(dialect)
+
+
+def polars_encoding(encoding: str) -> str:
+    """Traduce un encoding detectado al valor que acepta pl.read_csv"""
+    if encoding.lower() in UTF8_COMPATIBLE:
+        return "utf8-lossy"
+    return encoding
+
+
+async def spool_upload(
+    upload,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    suffix: str = ".csv",
+    sniff: bool = True,
+    compression: str = None,
+    max_decompressed_bytes: int = None,
+) -> dict:
+    """
+    Vuelca un UploadFile a un archivo temporal en disco, bloque a bloque.
+
+    - Nunca mantiene en memoria más de un bloque (más el prefijo de detección).
+    - Detecta encoding y separador solo con los primeros SNIFF_BYTES.
+    - Si el encoding no es compatible con UTF-8 se transcodifica al vuelo,
+      de modo que Polars pueda leer el archivo directamente desde disco.
+    - Aborta con UploadTooLargeError en cuanto se supera max_bytes.
+
+    Con sniff=False (Parquet, Arrow IPC, NDJSON) los bytes se copian tal cual
+    y encoding/separator se devuelven como None.
+
+    Con compression ("gzip", "bz2", "zstd") el archivo se descomprime en
+    streaming: en disco queda solo el contenido descomprimido y la detección
+    corre sobre el primer bloque descomprimido. max_bytes se aplica a los bytes
+    recibidos y max_decompressed_bytes (si se indica) al contenido expandido.
+
+    Mientras copia calcula el SHA-256 de los bytes recibidos, que sirve como
+    clave de la caché de datasets.
+
+    Returns:
+        dict: {"path", "sha256", "size_bytes", "decompressed_bytes", "encoding", "separator"}
+    """
+    fd, path = tempfile.mkstemp(prefix="nebula_upload_", suffix=suffix)
+    content_hash = hashlib.sha256()
+    total = 0
+    written = 0
+    head = bytearray()
+    dialect = None
+    decoder = None
+    decompressor = StreamDecompressor(compression) if compression else None
+
+    def write(out, data: bytes):
+        if decoder is None:
+            out.write(data)
+        else:
+            out.write(decoder.decode(data).encode('utf-8'))
+
+    def consume(out, data: bytes):
+        nonlocal dialect, decoder, head, written
+        written += len(data)
+        if max_decompressed_bytes is not None and written > max_decompressed_bytes:
+            raise UploadTooLargeError(
+                f"El archivo descomprimido supera el tamaño máximo de {max_decompressed_bytes / (1024 * 1024):.0f} MB"
+            )
+
+        if dialect is not None or not sniff:
+            write(out, data)
+            return
+
+        head += data
+        if len(head) >= SNIFF_BYTES:
+            dialect = sniff_csv(bytes(head[:SNIFF_BYTES]))
+            decoder = _make_transcoder(dialect["encoding"])
+            write(out, bytes(head))
+            head = bytearray()
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+
+                total += len(chunk)
+                if total > max_bytes:
+                    raise UploadTooLargeError(
+                        f"El archivo supera el tamaño máximo de {max_bytes / (1024 * 1024):.0f} MB"
+                    )
+                content_hash.update(chunk)
+
+                if decompressor is None:
+                    consume(out, chunk)
+                else:
+                    for block in decompressor.decompress(chunk):
+                        consume(out, block)
+
+            if decompressor is not None:
+                decompressor.close()
+
+            if not sniff:
+                dialect = {"encoding": None, "separator": None}
+            elif dialect is None:
+                dialect = sniff_csv(bytes(head))
+                decoder = _make_transcoder(dialect["encoding"])
+                write(out, bytes(head))
+
+            if decoder is not None:
+                out.write(decoder.decode(b'', final=True).encode('utf-8'))
+
+    except BaseException:
+        _remove_quietly(path)
+        raise
+
+    logger.info(
+        f"Upload volcado a disco: {total / (1024 * 1024):.2f} MB recibidos, "
+        f"{written / (1024 * 1024):.2f} MB en disco | "
+        f"Sep: {repr(dialect['separator'])} | Enc: {dialect['encoding']}"
+    )
+
+    return {
+        "path": path,
+        "sha256": content_hash.hexdigest(),
+        "size_bytes": total,
+        "decompressed_bytes": written,
+        "encoding": dialect["encoding"],
+        "separator": dialect["separator"],
+    }
+
+
+def _make_transcoder(encoding: str):
+    """Crea un decodificador incremental si el encoding requiere pasar a UTF-8"""
+    if encoding is None or encoding.lower() in UTF8_COMPATIBLE:
+        return None
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors='replace')
+    except LookupError:
+        return None
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_spooled_file(path: str):
+    """Elimina un archivo temporal generado por spool_upload"""
+    if path:
+        _remove_quietly(path)
@@ -4,21 +4,19 @@ Funciones principales de nebula para Machine Learning
 """
 import polars as pl
 import numpy as np
-import chardet
 import joblib
 import io
 import base64
 import logging
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 
 logger = logging.getLogger(__name__)
 
 # Sklearn imports
 from sklearn.impute import KNNImputer
-from sklearn.model_selection import train_test_split, StratifiedShuffleSplit
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import LabelEncoder
 from sklearn.linear_model import LinearRegression, Ridge, Lasso, ElasticNet, LogisticRegression
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
@@ -33,121 +31,156 @@ from sklearn.metrics import (
     classification_report, confusion_matrix
 )
 
-# Scipy imports for statistical tests
-from scipy import stats
-
 import polars as pl
-import chardet
 import io
+import os
+
+from core.ingestion import (
+    SNIFF_BYTES,
+    CSV_SEPARATORS,
+    sniff_csv,
+    polars_encoding,
+)
+from core.correlations import (
+    CORRELATION_METHODS,
+    KENDALL_SAMPLE_THRESHOLD,
+    KENDALL_SAMPLE_SIZE,
+    pairwise_correlation_matrices,
+    merge_correlation_update,
+    sampled_correlation_matrices,
+    pair_scores,
+    rank_pairs,
+)
+from core.outliers import iqr_bounds, null_outliers, null_detected
+from core.imputation import KNN_MAX_ROWS, MICE_TOLERANCE, ImputationCancelled, imputation_strategy, knn_impute, mice_impute
+from core.associations import MAX_CATEGORIES, categorical_columns, association_matrices
+from core.encoding import is_categorical, fit_category_encoder, describe_encoder
+from core.preprocessing import build_preprocessing_plan, feature_importance, fit_target_columns, training_split
+from core.profiling import (
+    profile_columns,
+    approximate_profile_columns,
+    count_rows_and_nulls,
+    numeric_stats,
+    outliers_detection,
+    normality_sample,
+    run_normality_tests,
+    histogram_data,
+    NORMALITY_SAMPLE_SIZE,
+    NORMALITY_SEED,
+)
+
+# Filas leídas para validar un separador alternativo antes del parseo completo
+FALLBACK_SAMPLE_ROWS = 200
+
+def _drop_empty_name_columns(df: pl.DataFrame) -> pl.DataFrame:
+    """Elimina columnas con nombres vacíos o solo espacios"""
+    valid_columns = [col for col in df.columns if col and str(col).strip() != ""]
+    if len(valid_columns) < len(df.columns):
+        print(f" Advertencia: Se eliminaron {len(df.columns) - len(valid_columns)} columnas con nombres vacíos")
+        df = df.select(valid_columns)
+    return df
+
+
+def _csv_config(separator: str, encoding: str) -> dict:
+    """Configuración común de Polars para leer (o escanear) CSVs"""
+    return {
+        'separator': separator,
+        'encoding': polars_encoding(encoding),
+        'comment_prefix': '#',
+        'truncate_ragged_lines': True,
+        'ignore_errors': True,
+        'infer_schema_length': 1000,
+        'null_values': ['', 'NA', 'N/A', 'NULL', 'null', 'None', 'nan', 'NaN'],
+    }
+
 
 def load_csv(file_obj, **kwargs):
     """
-    Carga un archivo CSV desde un objeto file (upload) usando Polars.
+    Carga un archivo CSV usando Polars.
     Detecta automáticamente encoding, separador y maneja comentarios.
 
+    Si recibe una ruta en disco, solo lee un prefijo acotado para la detección
+    y Polars lee el archivo directamente (sin copias intermedias en memoria).
+
     Args:
-        file_obj: Objeto file de Streamlit/Flask/etc (con método .read())
-        **kwargs: Parámetros adicionales para pl.read_csv()
+        file_obj: Ruta al archivo (str/Path) u objeto file con método .read()
+        **kwargs: Parámetros adicionales para pl.read_csv(). Si incluyen
+            'encoding' o 'separator' se omite la detección correspondiente.
 
     Returns:
         pl.DataFrame
     """
     try:
-        # 1. LEER CONTENIDO
-        content = file_obj.read()
-        file_obj.seek(0)  # Resetear por si acaso
-
-        # 2. DETECTAR ENCODING
-        result = chardet.detect(content[:50000])
-        encoding = result['encoding'] or 'utf-8'
+        # 1. LEER MUESTRA
+        if isinstance(file_obj, (str, os.PathLike)):
+            source = os.fspath(file_obj)
+            with open(source, 'rb') as f:
+                sample = f.read(SNIFF_BYTES)
+        else:
+            content = file_obj.read()
+            file_obj.seek(0)  # Resetear por si acaso
+            source = io.BytesIO(content)
+            sample = content[:SNIFF_BYTES]
+
+        # 2. DETECTAR DIALECTO (encoding + separador) SOLO CON EL PREFIJO
+        encoding = kwargs.pop('encoding', None)
+        forced_sep = kwargs.pop('separator', None)
+        dialect = sniff_csv(sample, encoding=encoding)
+        encoding = dialect['encoding']
+        best_sep = forced_sep or dialect['separator']
+
+        # Orden de reintento: candidatos puntuados primero, luego el resto
+        separators = [best_sep] + [
+            sep for sep in dialect['candidates'] + CSV_SEPARATORS if sep != best_sep
+        ]
+        separators = list(dict.fromkeys(separators))
 
-        # 3. DECODIFICAR Y ANALIZAR MUESTRA
-        try:
-            text_content = content.decode(encoding, errors='replace')
-        except:
-            text_content = content.decode('utf-8', errors='replace')
-
-        # Obtener primeras líneas (sin comentarios)
-        lines = []
-        for line in text_content.split('\n'):
-            if not line.strip().startswith('#'):
-                lines.append(line)
-            if len(lines) >= 10:
-                break
-
-        # 4. DETECTAR SEPARADOR
-        separators = [',', ';', '\t', '|', ' ']
-        best_sep = ','
-        best_score = 0
-
-        for sep in separators:
-            counts = [line.count(sep) for line in lines if line.strip()]
-            if counts and max(counts) > 0:
-                avg = sum(counts) / len(counts)
-                if avg < 1:
-                    continue
-                std = (sum((c - avg)**2 for c in counts) / len(counts))**0.5
-                score = avg / (1 + std)
-                if score > best_score:
-                    best_score = score
-                    best_sep = sep
-
-        # 5. CONFIGURACIÓN POLARS
-        config = {
-            'separator': best_sep,
-            'encoding': encoding,
-            'comment_prefix': '#',
-            'truncate_ragged_lines': True,
-            'ignore_errors': True,
-            'infer_schema_length': 1000,
-            'null_values': ['', 'NA', 'N/A', 'NULL', 'null', 'None', 'nan', 'NaN'],
-        }
+        # 3. CONFIGURACIÓN POLARS
+        config = _csv_config(best_sep, encoding)
 
         # Override con kwargs del usuario
         config.update(kwargs)
 
-        # 6. CREAR BUFFER Y CARGAR
-        csv_buffer = io.BytesIO(content)
+        def rewind():
+            if not isinstance(source, str):
+                source.seek(0)
 
+        # 4. CARGAR
         try:
-            df = pl.read_csv(csv_buffer, **config)
-
-            # Eliminar columnas con nombres vacíos o solo espacios
-            valid_columns = [col for col in df.columns if col and str(col).strip() != ""]
-            if len(valid_columns) < len(df.columns):
-                print(f" Advertencia: Se eliminaron {len(df.columns) - len(valid_columns)} columnas con nombres vacíos")
-                df = df.select(valid_columns)
+            df = _drop_empty_name_columns(pl.read_csv(source, **config))
 
             print(f" Cargado: {df.shape[0]:,} filas × {df.shape[1]} cols")
             print(f"   Sep: {repr(best_sep)} | Enc: {encoding}")
             return df
 
         except Exception as e:
-            # FALLBACK: Probar otros separadores
-            for sep in separators:
-                if sep == best_sep:
+            # FALLBACK: probar los demás separadores sobre una muestra pequeña
+            # y hacer un único parseo completo con el primero que funcione
+            sample_config = dict(config, n_rows=FALLBACK_SAMPLE_ROWS)
+            for sep in separators[1:]:
+                try:
+                    rewind()
+                    sample_df = pl.read_csv(source, **dict(sample_config, separator=sep))
+                    if sample_df.shape[1] < 2:
+                        continue
+                except Exception:
                     continue
+
                 try:
-                    csv_buffer.seek(0)  # Resetear buffer
+                    rewind()
                     config['separator'] = sep
-                    df = pl.read_csv(csv_buffer, **config)
-
-                    # Eliminar columnas con nombres vacíos
-                    valid_columns = [col for col in df.columns if col and str(col).strip() != ""]
-                    if len(valid_columns) < len(df.columns):
-                        print(f" Advertencia: Se eliminaron {len(df.columns) - len(valid_columns)} columnas con nombres vacíos")
-                        df = df.select(valid_columns)
+                    df = _drop_empty_name_columns(pl.read_csv(source, **config))
 
                     print(f" Cargado (fallback): {df.shape[0]:,} filas × {df.shape[1]} cols")
                     print(f"   Sep: {repr(sep)} | Enc: {encoding}")
                     return df
-                except:
-                    continue
+                except Exception:
+                    break
             try:
-                csv_buffer.seek(0)
+                rewind()
                 config['separator'] = best_sep
                 config['infer_schema_length'] = 0
-                df = pl.read_csv(csv_buffer, **config)
+                df = pl.read_csv(source, **config)
                 print(f" Cargado (modo string): {df.shape[0]:,} filas × {df.shape[1]} cols")
                 return df
             except:
@@ -157,38 +190,295 @@ def load_csv(file_obj, **kwargs):
         raise Exception(f" Error al cargar CSV: {str(e)}")
 
 
+def scan_csv(path, separator: str = None, encoding: str = 'utf-8', **kwargs) -> pl.LazyFrame:
+    """
+    Crea un LazyFrame sobre un CSV en disco sin materializarlo.
+
+    Cada consulta posterior construye su propio plan, de modo que Polars
+    solo lee las columnas y filas que esa etapa necesita (projection y
+    predicate pushdown). El archivo debe estar en UTF-8 (spool_upload ya
+    lo transcodifica).
+
+    Args:
+        path: Ruta al archivo CSV
+        separator: Separador ya detectado (si es None se detecta con el prefijo)
+        encoding: Encoding del archivo en disco
+        **kwargs: Parámetros adicionales para pl.scan_csv()
+
+    Returns:
+        pl.LazyFrame
+    """
+    try:
+        if separator is None:
+            with open(path, 'rb') as f:
+                sample = f.read(SNIFF_BYTES)
+            separator = sniff_csv(sample, encoding=encoding)['separator']
+
+        config = _csv_config(separator, encoding)
+        config.update(kwargs)
+
+        lf = pl.scan_csv(path, **config)
+
+        # Resolver el schema aquí valida el separador y descarta columnas sin nombre
+        columns = list(lf.schema.keys())
+        valid_columns = [col for col in columns if col and str(col).strip() != ""]
+        if len(valid_columns) < len(columns):
+            lf = lf.select(valid_columns)
+
+        print(f" Escaneado (lazy): {len(valid_columns)} cols | Sep: {repr(separator)}")
+        return lf
+
+    except Exception as e:
+        raise Exception(f" Error al escanear CSV: {str(e)}")
+
+
+def load_dataset(path, file_format: str = "csv", **kwargs) -> pl.DataFrame:
+    """
+    Carga un archivo en disco según su formato.
+
+    - csv: load_csv (detección de encoding y separador)
+    - parquet / ipc: usan el schema del archivo; IPC se mapea en memoria (zero-copy)
+    - ndjson: lectura directa, el schema se infiere de los registros
+
+    Args:
+        path: Ruta al archivo
+        file_format: "csv", "parquet", "ipc" o "ndjson"
+        **kwargs: Parámetros adicionales para la función de lectura de Polars
+
+    Returns:
+        pl.DataFrame
+    """
+    if file_format == "csv":
+        return load_csv(path, **kwargs)
+
+    try:
+        if file_format == "parquet":
+            df = pl.read_parquet(path, memory_map=True, **kwargs)
+        elif file_format == "ipc":
+            df = pl.read_ipc(path, memory_map=True, **kwargs)
+        elif file_format == "ndjson":
+            df = pl.read_ndjson(path, **kwargs)
+        else:
+            raise ValueError(f"Formato no soportado: {file_format}")
+
+        df = _drop_empty_name_columns(df)
+        print(f" Cargado ({file_format}): {df.shape[0]:,} filas × {df.shape[1]} cols")
+        return df
+
+    except Exception as e:
+        raise Exception(f" Error al cargar {file_format}: {str(e)}")
+
+
+def scan_dataset(path, file_format: str = "csv", **kwargs) -> pl.LazyFrame:
+    """
+    Crea un LazyFrame sobre un archivo en disco según su formato.
+    Parquet e IPC permiten además leer solo los row groups / columnas necesarios.
+    """
+    if file_format == "csv":
+        return scan_csv(path, **kwargs)
+
+    try:
+        if file_format == "parquet":
+            lf = pl.scan_parquet(path, **kwargs)
+        elif file_format == "ipc":
+            lf = pl.scan_ipc(path, memory_map=True, **kwargs)
+        elif file_format == "ndjson":
+            lf = pl.scan_ndjson(path, **kwargs)
+        else:
+            raise ValueError(f"Formato no soportado: {file_format}")
+
+        columns = list(lf.schema.keys())
+        valid_columns = [col for col in columns if col and str(col).strip() != ""]
+        if len(valid_columns) < len(columns):
+            lf = lf.select(valid_columns)
+
+        print(f" Escaneado (lazy, {file_format}): {len(valid_columns)} cols")
+        return lf
+
+    except Exception as e:
+        raise Exception(f" Error al escanear {file_format}: {str(e)}")
+
+
 # 2. GET DATA SUMMARY
-def get_data_summary(df: pl.DataFrame, preview_rows: int = 5, top_n_categorical: int = 10):
+def _iter_column_batches(df, columns: list, batch_size: int, collect: bool = True):
+    """
+    Itera el dataset por lotes de columnas. Un DataFrame se entrega completo;
+    un LazyFrame se materializa de a `batch_size` columnas (con `collect=False`
+    se entregan los LazyFrame de cada lote, para perfilarlos en streaming).
+    """
+    if not isinstance(df, pl.LazyFrame):
+        yield df
+        return
+    for start in range(0, len(columns), batch_size):
+        batch = df.select(columns[start:start + batch_size])
+        yield batch.collect() if collect else batch
+
+
+def _column_detail_blocks(frame: pl.DataFrame, col: str, non_null_count: int, profile: dict,
+                          top_n_categorical: int, normality_sample_size: int, seed: int,
+                          normality_samples: dict) -> dict:
+    """
+    Bloques pesados del resumen de una columna: test de normalidad e histograma
+    (numéricas) o top de categorías. La muestra para el test de normalidad se
+    agrega a `normality_samples`; el test se ejecuta después con `_apply_normality_tests`.
+    """
+    details = {}
+    dtype = str(frame[col].dtype)
+    if dtype.startswith(("Int", "UInt", "Float")):
+        # Test de normalidad: se muestrea ahora y se ejecuta al final en paralelo
+        try:
+            sample = normality_sample(frame[col], normality_sample_size, seed)
+            if len(sample) > 3:  # Mínimo requerido para test
+                normality_samples[col] = sample
+                details["normality_test"] = None
+        except Exception:
+            details["normality_test"] = None
+
+        # Información para histogramas
+        try:
+            histogram = profile.get("histogram") or histogram_data(frame[col].drop_nulls().to_numpy())
+            if histogram is not None:
+                details["histogram_data"] = histogram
+        except Exception:
+            details["histogram_data"] = None
+
+    else:
+        # Para categóricas: top N valores más frecuentes
+        try:
+            # Contar valores y obtener los top N
+            value_counts = (
+                frame.select(pl.col(col))
+                .drop_nulls()
+                .group_by(col)
+                .agg(pl.count().alias("count"))
+                .sort("count", descending=True)
+                .head(top_n_categorical)
+            )
+
+            top_values = []
+            for row in value_counts.iter_rows(named=True):
+                top_values.append({
+                    "value": row[col],
+                    "count": row["count"],
+                    "percentage": round((row["count"] / non_null_count) * 100, 2) if non_null_count > 0 else 0
+                })
+
+            details["top_categories"] = {
+                "top_n": len(top_values),
+                "values": top_values
+            }
+
+            # Mantener compatibilidad con versión anterior
+            if len(top_values) > 0:
+                details["top"] = top_values[0]["value"]
+                details["freq"] = top_values[0]["count"]
+
+        except Exception:
+            details["top_categories"] = None
+
+    return details
+
+
+def _apply_normality_tests(entries: Dict[str, dict], normality_samples: dict,
+                           time_budget_s: Optional[float], max_sample_size: int, seed: int) -> dict:
+    """
+    Ejecuta en paralelo los tests de normalidad de las muestras y guarda cada
+    resultado en `entries[col]["normality_test"]` (las entradas deben tener
+    "non_null_count"). Retorna el detalle del muestreo.
+    """
+    normality_results, timed_out = run_normality_tests(normality_samples, time_budget_s)
+    sampled_columns = {}
+    for col, sample in normality_samples.items():
+        sample_size = len(sample)
+        sampled = sample_size < entries[col]["non_null_count"]
+        if sampled:
+            sampled_columns[col] = sample_size
+        result = normality_results.get(col)
+        if result is not None:
+            result["sample_size"] = sample_size
+            result["sampled"] = sampled
+            entries[col]["normality_test"] = result
+    return {
+        "seed": seed,
+        "max_sample_size": max_sample_size,
+        "sampled_columns": sampled_columns,
+        "timed_out_columns": timed_out,
+        "time_budget_s": time_budget_s,
+    }
+
+
+def get_data_summary(df, preview_rows: int = 5, top_n_categorical: int = 10, column_batch_size: int = 50,
+                     approx_threshold_rows: int = 0, normality_sample_size: int = NORMALITY_SAMPLE_SIZE,
+                     normality_time_budget_s: Optional[float] = None, seed: int = NORMALITY_SEED,
+                     include_details: bool = True):
     """
     Obtiene un resumen estadístico completo del DataFrame usando Polars.
     Incluye shape, tipos de datos, nulls, memoria, columnas numéricas y categóricas,
     análisis de normalidad, detección de outliers, y top de categorías.
 
+    Acepta también un LazyFrame: en ese caso los conteos generales se calculan
+    con una sola consulta agregada y el detalle por columna se materializa en
+    lotes de `column_batch_size` columnas, sin cargar nunca el dataset completo.
+
+    Con `approx_threshold_rows` > 0, los datasets con al menos esas filas se
+    perfilan con sketches (valores únicos, cuartiles e histogramas aproximados)
+    y cada columna reporta sus cotas de error en "approximation". Sobre un
+    LazyFrame y con `include_details=False`, los sketches se alimentan en
+    streaming sin materializar las columnas.
+
+    Los tests de normalidad se hacen sobre una muestra reproducible de a lo sumo
+    `normality_sample_size` valores por columna, en paralelo y dentro de
+    `normality_time_budget_s`; el detalle queda en "normality_sampling".
+
+    Con `include_details=False` se omiten los bloques pesados por columna
+    (normality_test, histogram_data y top_categories), que luego se obtienen
+    con `get_column_details`; "details_status" queda en "pending". En modo
+    aproximado el histograma de los sketches se incluye igual (ya está calculado).
+
     Args:
-        df: DataFrame de Polars
+        df: DataFrame o LazyFrame de Polars
         preview_rows: Número de filas para preview
         top_n_categorical: Número de valores categóricos más frecuentes a mostrar
+        column_batch_size: Columnas materializadas a la vez (solo LazyFrame)
+        approx_threshold_rows: Filas a partir de las cuales el perfilado es aproximado (0 = nunca)
+        normality_sample_size: Tamaño máximo de la muestra para el test de normalidad
+        normality_time_budget_s: Tiempo máximo para todos los tests de normalidad (None = sin límite)
+        seed: Semilla del muestreo
+        include_details: Si False, solo se calcula el encabezado y las estadísticas básicas
 
     Returns:
         dict: Resumen completo del dataset
     """
     try:
+        is_lazy = isinstance(df, pl.LazyFrame)
+        schema = df.schema
+        columns = list(schema.keys())
+        dtypes = list(schema.values())
+
         #  Información general
-        total_rows, total_cols = df.shape
-        null_counts = df.null_count().to_dicts()[0]
+        if is_lazy:
+            total_rows, null_counts = count_rows_and_nulls(df)
+            total_cols = len(columns)
+        else:
+            total_rows, total_cols = df.shape
+            null_counts = df.null_count().to_dicts()[0]
         total_cells = total_rows * total_cols
+        approximate = approx_threshold_rows > 0 and total_rows >= approx_threshold_rows
         total_nulls = sum(null_counts.values())
         missing_values_percent = (
             round((total_nulls / total_cells) * 100, 2) if total_cells > 0 else 0
         )
 
         # Preview de datos (primeras filas) 
-        preview_data = df.head(preview_rows).to_dicts()
+        if is_lazy:
+            preview_data = df.head(preview_rows).collect().to_dicts()
+        else:
+            preview_data = df.head(preview_rows).to_dicts()
 
         # Clasificación de columnas por tipo
         numeric_columns = []
         categorical_columns = []
-        for col, dtype in zip(df.columns, df.dtypes):
+        for col, dtype in zip(columns, dtypes):
             # Filtrar columnas con nombres vacíos o solo espacios
             if not col or str(col).strip() == "":
                 continue
@@ -201,179 +491,144 @@ def get_data_summary(df: pl.DataFrame, preview_rows: int = 5, top_n_categorical:
         #  Resumen general del dataset 
         summary = {
             "shape": {"rows": total_rows, "columns": total_cols},
-            "columns": df.columns,
-            "data_types": {col: str(dtype) for col, dtype in zip(df.columns, df.dtypes)},
-            "memory_usage_mb": round(df.estimated_size("mb"), 3),
+            "columns": columns,
+            "data_types": {col: str(dtype) for col, dtype in zip(columns, dtypes)},
+            "memory_usage_mb": 0.0 if is_lazy else round(df.estimated_size("mb"), 3),
             "missing_values_percent": f"{missing_values_percent}%",
             "numeric_columns_count": len(numeric_columns),
             "categorical_columns_count": len(categorical_columns),
             "preview": preview_data,
+            "profiling_mode": "approximate" if approximate else "exact",
         }
 
         #  Resumen por columna 
         column_summaries = []
-        for col in df.columns:
-            # Saltar columnas con nombres vacíos
-            if not col or str(col).strip() == "":
-                continue
-            col_data = df.select(col)
-            dtype = str(df[col].dtype)
-            non_null_count = total_rows - null_counts[col]
-            nan_percent = (
-                round((null_counts[col] / total_rows) * 100, 2)
-                if total_rows > 0
-                else 0
+        normality_samples = {}
+        # Perfilado aproximado sin detalles: los lotes de un LazyFrame se
+        # perfilan en streaming y no se materializan (memory_usage_mb queda en 0)
+        streaming = is_lazy and approximate and not include_details
+        for batch_df in _iter_column_batches(df, columns, column_batch_size, collect=not streaming):
+            if is_lazy and not streaming:
+                summary["memory_usage_mb"] += batch_df.estimated_size("mb")
+            batch_columns = [col for col in batch_df.columns if col and str(col).strip() != ""]
+            # Estadísticas de todas las columnas del lote en una sola pasada
+            profiler = approximate_profile_columns if approximate else profile_columns
+            profiles = profiler(
+                batch_df,
+                batch_columns,
+                [col for col in batch_columns if col in numeric_columns],
             )
-            unique_values = col_data.n_unique()
-            col_summary = {
-                "column": col,
-                "dtype": dtype,
-                "non_null_count": non_null_count,
-                "missing_percent": f"{nan_percent}%",
-                "unique_values": int(unique_values),
-                "nan_percentage": f"{nan_percent}%",
-            }
-
-            # Si es numérica, agrega estadísticas descriptivas avanzadas
-            if dtype.startswith(("Int", "UInt", "Float")):
-                try:
-                    # Calcular estadísticas manualmente para mayor compatibilidad
-                    non_null = col_data.drop_nulls()
-                    if len(non_null) > 0:
-                        col_summary.update({
-                            "mean": float(non_null.mean()[col][0]) if len(non_null) > 0 else None,
-                            "std": float(non_null.std()[col][0]) if len(non_null) > 1 else None,
-                            "min": float(non_null.min()[col][0]) if len(non_null) > 0 else None,
-                            "max": float(non_null.max()[col][0]) if len(non_null) > 0 else None,
-                            "25%": float(non_null.quantile(0.25)[col][0]) if len(non_null) > 0 else None,
-                            "50%": float(non_null.quantile(0.50)[col][0]) if len(non_null) > 0 else None,
-                            "75%": float(non_null.quantile(0.75)[col][0]) if len(non_null) > 0 else None,
-                        })
-                except Exception as e:
-                    logger.warning(f"Error calculando estadísticas para {col}: {e}")
-                    col_summary.update({
-                        "mean": None,
-                        "std": None,
-                        "min": None,
-                        "max": None,
-                        "25%": None,
-                        "50%": None,
-                        "75%": None,
-                    })
-
-                # Detección de outliers usando IQR
-                try:
-                    non_null_data = df.select(pl.col(col)).drop_nulls()
-                    if len(non_null_data) > 0:
-                        q1 = non_null_data.select(pl.col(col).quantile(0.25))[col][0]
-                        q3 = non_null_data.select(pl.col(col).quantile(0.75))[col][0]
-                        iqr = q3 - q1
-                        lower_bound = q1 - 1.5 * iqr
-                        upper_bound = q3 + 1.5 * iqr
-
-                        outliers_mask = (df[col] < lower_bound) | (df[col] > upper_bound)
-                        outliers_count = outliers_mask.sum()
-
-                        col_summary["outliers_detection"] = {
-                            "method": "IQR",
-                            "lower_bound": float(lower_bound) if lower_bound is not None else None,
-                            "upper_bound": float(upper_bound) if upper_bound is not None else None,
-                            "outliers_count": int(outliers_count),
-                            "outliers_percentage": round((outliers_count / total_rows) * 100, 2),
-                            "has_outliers": bool(outliers_count > 0)
-                        }
-                except Exception:
-                    col_summary["outliers_detection"] = None
-
-                # Test de normalidad (Shapiro-Wilk para n < 5000, Anderson-Darling para n >= 5000)
-                try:
-                    non_null_data = df.select(pl.col(col)).drop_nulls().to_series().to_numpy()
-                    if len(non_null_data) > 3:  # Mínimo requerido para test
-                        if len(non_null_data) < 5000:
-                            # Shapiro-Wilk test
-                            statistic, p_value = stats.shapiro(non_null_data)
-                            test_name = "Shapiro-Wilk"
-                        else:
-                            # Anderson-Darling test
-                            result = stats.anderson(non_null_data)
-                            statistic = result.statistic
-                            # Para Anderson, usamos el nivel de significancia del 5% (índice 2)
-                            p_value = 0.05 if statistic < result.critical_values[2] else 0.01
-                            test_name = "Anderson-Darling"
-
-                        is_normal = p_value > 0.05
-                        col_summary["normality_test"] = {
-                            "test_name": test_name,
-                            "statistic": float(statistic),
-                            "p_value": float(p_value) if isinstance(p_value, (int, float)) else 0.05,
-                            "is_normal": bool(is_normal),
-                            "interpretation": "Distribución normal" if is_normal else "Distribución no normal",
-                            "alpha": 0.05
-                        }
-                except Exception as e:
-                    col_summary["normality_test"] = None
-
-                # Información para histogramas
-                try:
-                    non_null_data = df.select(pl.col(col)).drop_nulls().to_series().to_numpy()
-                    if len(non_null_data) > 0:
-                        # Calcular bins usando regla de Sturges
-                        n_bins = int(np.ceil(np.log2(len(non_null_data)) + 1))
-                        n_bins = min(max(n_bins, 5), 50)  # Entre 5 y 50 bins
-
-                        hist, bin_edges = np.histogram(non_null_data, bins=n_bins)
-
-                        col_summary["histogram_data"] = {
-                            "n_bins": n_bins,
-                            "bin_edges": [float(x) for x in bin_edges],
-                            "frequencies": [int(x) for x in hist],
-                            "bin_width": float(bin_edges[1] - bin_edges[0]) if len(bin_edges) > 1 else 0
-                        }
-                except Exception:
-                    col_summary["histogram_data"] = None
+            for col in batch_columns:
+                profile = profiles[col]
+                dtype = str(schema[col])
+                non_null_count = total_rows - null_counts[col]
+                nan_percent = (
+                    round((null_counts[col] / total_rows) * 100, 2)
+                    if total_rows > 0
+                    else 0
+                )
+                col_summary = {
+                    "column": col,
+                    "dtype": dtype,
+                    "non_null_count": non_null_count,
+                    "missing_percent": f"{nan_percent}%",
+                    "unique_values": int(profile["n_unique"]),
+                    "nan_percentage": f"{nan_percent}%",
+                }
+                if approximate:
+                    col_summary["approximation"] = profile["error_bounds"]
+                    # El histograma del sketch ya está calculado: no se deja para el detalle
+                    if not include_details and profile.get("histogram") is not None:
+                        col_summary["histogram_data"] = profile["histogram"]
+
+                # Si es numérica, agrega estadísticas descriptivas avanzadas
+                if dtype.startswith(("Int", "UInt", "Float")):
+                    col_summary.update(numeric_stats(profile, non_null_count))
+
+                    # Detección de outliers usando IQR
+                    outliers = outliers_detection(profile, non_null_count, total_rows)
+                    if outliers is not None:
+                        col_summary["outliers_detection"] = outliers
+
+                if include_details:
+                    col_summary.update(_column_detail_blocks(
+                        batch_df, col, non_null_count, profile, top_n_categorical,
+                        normality_sample_size, seed, normality_samples,
+                    ))
+
+                column_summaries.append(col_summary)
+
+        if is_lazy:
+            summary["memory_usage_mb"] = round(summary["memory_usage_mb"], 3)
+
+        if include_details:
+            summary["normality_sampling"] = _apply_normality_tests(
+                {col_summary["column"]: col_summary for col_summary in column_summaries},
+                normality_samples, normality_time_budget_s, normality_sample_size, seed,
+            )
+        summary["details_status"] = "complete" if include_details else "pending"
 
-            else:
-                # Para categóricas: top N valores más frecuentes
-                try:
-                    # Contar valores y obtener los top N
-                    value_counts = (
-                        df.select(pl.col(col))
-                        .drop_nulls()
-                        .group_by(col)
-                        .agg(pl.count().alias("count"))
-                        .sort("count", descending=True)
-                        .head(top_n_categorical)
-                    )
+        summary["columns_summary"] = column_summaries
 
-                    top_values = []
-                    for row in value_counts.iter_rows(named=True):
-                        top_values.append({
-                            "value": row[col],
-                            "count": row["count"],
-                            "percentage": round((row["count"] / non_null_count) * 100, 2) if non_null_count > 0 else 0
-                        })
+        return summary
 
-                    col_summary["top_categories"] = {
-                        "top_n": len(top_values),
-                        "values": top_values
-                    }
+    except Exception as e:
+        return {"error": f"Error al generar resumen de datos: {str(e)}"}
 
-                    # Mantener compatibilidad con versión anterior
-                    if len(top_values) > 0:
-                        col_summary["top"] = top_values[0]["value"]
-                        col_summary["freq"] = top_values[0]["count"]
 
-                except Exception:
-                    col_summary["top_categories"] = None
+def get_column_details(df, columns: Optional[List[str]] = None, top_n_categorical: int = 10,
+                       column_batch_size: int = 50, normality_sample_size: int = NORMALITY_SAMPLE_SIZE,
+                       normality_time_budget_s: Optional[float] = None, seed: int = NORMALITY_SEED,
+                       histograms: Optional[Dict[str, dict]] = None):
+    """
+    Calcula los bloques pesados del resumen (normality_test, histogram_data,
+    top_categories) para algunas o todas las columnas. Complementa a
+    `get_data_summary(..., include_details=False)`.
 
-            column_summaries.append(col_summary)
+    Args:
+        df: DataFrame o LazyFrame de Polars
+        columns: Columnas a procesar (None = todas)
+        top_n_categorical: Número de valores categóricos más frecuentes a mostrar
+        column_batch_size: Columnas materializadas a la vez (solo LazyFrame)
+        normality_sample_size: Tamaño máximo de la muestra para el test de normalidad
+        normality_time_budget_s: Tiempo máximo para todos los tests de normalidad (None = sin límite)
+        seed: Semilla del muestreo
+        histograms: Histogramas ya calculados por columna (p.ej. los de los
+            sketches del resumen aproximado); esas columnas no se recalculan
 
-        summary["columns_summary"] = column_summaries
+    Returns:
+        dict: {"columns": {columna: detalle}, "normality_sampling": {...}}
+    """
+    try:
+        histograms = histograms or {}
+        if columns is None:
+            columns = [col for col in df.schema.keys() if col and str(col).strip() != ""]
+        if not isinstance(df, pl.LazyFrame):
+            df = df.select(columns)
+
+        details = {}
+        normality_samples = {}
+        for batch_df in _iter_column_batches(df, columns, column_batch_size):
+            total_rows = batch_df.height
+            null_counts = batch_df.null_count().to_dicts()[0]
+            for col in batch_df.columns:
+                non_null_count = total_rows - null_counts[col]
+                details[col] = {
+                    "column": col,
+                    "non_null_count": non_null_count,
+                    **_column_detail_blocks(
+                        batch_df, col, non_null_count, {"histogram": histograms.get(col)}, top_n_categorical,
+                        normality_sample_size, seed, normality_samples,
+                    ),
+                }
 
-        return summary
+        sampling = _apply_normality_tests(
+            details, normality_samples, normality_time_budget_s, normality_sample_size, seed,
+        )
+        return {"columns": details, "normality_sampling": sampling}
 
     except Exception as e:
-        return {"error": f"Error al generar resumen de datos: {str(e)}"}
+        return {"error": f"Error al calcular el detalle de columnas: {str(e)}"}
 
 
 # 3. ANALYZE CORRELATIONS
@@ -391,14 +646,48 @@ def safe_float(value):
         return None
 
 
-def analyze_correlations(df: pl.DataFrame):
+def safe_float_list(values) -> list:
+    """Aplana un arreglo a lista de floats (fila por fila), con None en NaN e Infinity"""
+    values = np.asarray(values, dtype=np.float64).ravel()
+    result = values.astype(object)
+    result[~np.isfinite(values)] = None
+    return result.tolist()
+
+
+def analyze_correlations(
+    df: pl.DataFrame,
+    kendall_sample_threshold: int = KENDALL_SAMPLE_THRESHOLD,
+    kendall_sample_size: int = KENDALL_SAMPLE_SIZE,
+    seed: int = 42,
+    pairwise_complete: bool = True,
+    output_format: str = "legacy",
+    previous: Optional[dict] = None,
+    changed_columns: Optional[List[str]] = None,
+    include_associations: bool = True,
+    association_max_categories: int = MAX_CATEGORIES,
+):
     """
     Analiza las correlaciones entre todas las variables numéricas del DataFrame.
     Detecta automáticamente las variables numéricas y calcula tres tipos de
-    correlaciones: Pearson, Spearman y Kendall, con sus p-valores.
+    correlaciones: Pearson, Spearman y Kendall, con sus p-valores. Las variables
+    categóricas se relacionan con V de Cramér, eta e información mutua
+    (ver `core.associations`).
 
     Args:
         df: DataFrame de Polars
+        kendall_sample_threshold: Con más filas que esto, Kendall se calcula sobre una muestra (0 = nunca)
+        kendall_sample_size: Tamaño de la muestra reservoir para Kendall
+        seed: Semilla de la muestra (resultados reproducibles)
+        pairwise_complete: Si True, cada par usa sus filas sin nulos en ambas
+            variables; si False, se descartan las filas con algún nulo (listwise)
+        output_format: "legacy" (lista de pares y matrices anidadas) o "compact"
+            (matrices densas fila por fila; ver `correlation_page`)
+        previous: Resultado compacto anterior del mismo dataset y columnas; con
+            `changed_columns` solo se recalculan los pares de esas columnas
+        changed_columns: Columnas modificadas desde `previous`
+        include_associations: Si True, agrega las medidas de asociación de las
+            variables categóricas en "associations"
+        association_max_categories: Las categóricas con más categorías se omiten
 
     Returns:
         dict: Diccionario con correlaciones y p-valores para los tres métodos
@@ -414,176 +703,328 @@ def analyze_correlations(df: pl.DataFrame):
             if dtype_str.startswith(("Int", "UInt", "Float")):
                 numeric_columns.append(col)
 
-        if len(numeric_columns) < 2:
+        associations = None
+        if include_associations:
+            categorical = categorical_columns(df.schema)
+            if categorical:
+                associations = association_matrices(
+                    df, categorical, numeric_columns, max_categories=association_max_categories
+                )
+                if not associations["categorical_variables"]:
+                    associations = None
+
+        if len(numeric_columns) < 2 and associations is None:
             return {
-                "error": "Se necesitan al menos 2 variables numéricas para calcular correlaciones"
+                "error": "Se necesitan al menos 2 variables numéricas o una categórica para calcular correlaciones"
             }
 
-        # Convertir a numpy para cálculos
-        df_numeric = df.select(numeric_columns).drop_nulls()
-        data_array = df_numeric.to_numpy()
-
         n_vars = len(numeric_columns)
+        methods = CORRELATION_METHODS
+
+        # Actualización incremental: solo con pairwise-complete (en listwise un
+        # cambio en los nulos de una columna cambia las filas de todos los pares)
+        targets = None
+        if (
+            previous is not None and changed_columns and pairwise_complete
+            and previous.get("null_handling") == "pairwise"
+            and previous.get("variables") == numeric_columns
+        ):
+            targets = [numeric_columns.index(col) for col in changed_columns if col in numeric_columns]
+
+        if n_vars < 2:
+            # Solo asociaciones categóricas: matrices numéricas vacías
+            empty = np.full((n_vars, n_vars), np.nan)
+            matrices = {method: (empty, empty) for method in methods}
+            pair_rows = kendall_rows = np.zeros((n_vars, n_vars), dtype=np.int64)
+        elif pairwise_complete:
+            # Nulos como NaN: cada par se calcula sobre su propia máscara de filas válidas
+            data_array = df.select([pl.col(col).cast(pl.Float64) for col in numeric_columns]).to_numpy()
+            matrices, pair_rows, kendall_rows = pairwise_correlation_matrices(
+                data_array, methods, kendall_sample_threshold, kendall_sample_size, seed, targets=targets
+            )
+            if targets is not None:
+                previous_corr, previous_p = _compact_arrays(previous)
+                for method in methods:
+                    matrices[method] = merge_correlation_update(
+                        (previous_corr[method], previous_p[method]), matrices[method], targets
+                    )
+                shape = (n_vars, n_vars)
+                pair_rows = merge_correlation_update(np.array(previous["pair_n"]).reshape(shape), pair_rows, targets)
+                kendall_rows = merge_correlation_update(np.array(previous["kendall_n"]).reshape(shape), kendall_rows, targets)
+        else:
+            # Convertir a numpy para cálculos
+            df_numeric = df.select(numeric_columns).drop_nulls()
+            data_array = df_numeric.to_numpy()
+            matrices, kendall_n = sampled_correlation_matrices(
+                data_array, methods, kendall_sample_threshold, kendall_sample_size, seed
+            )
+            pair_rows = np.full((n_vars, n_vars), len(data_array), dtype=np.int64)
+            kendall_rows = np.full((n_vars, n_vars), kendall_n, dtype=np.int64)
 
-        # Matrices para cada tipo de correlación
-        methods = ["pearson", "spearman", "kendall"]
-        correlation_matrices = {}
-        p_value_matrices = {}
-
-        for method in methods:
-            correlation_matrices[method] = np.zeros((n_vars, n_vars))
-            p_value_matrices[method] = np.zeros((n_vars, n_vars))
-
-            # Calcular correlaciones y p-valores
-            for i in range(n_vars):
-                for j in range(n_vars):
-                    if i == j:
-                        correlation_matrices[method][i, j] = 1.0
-                        p_value_matrices[method][i, j] = 0.0
-                    else:
-                        if method == "pearson":
-                            corr, p_val = stats.pearsonr(data_array[:, i], data_array[:, j])
-                        elif method == "spearman":
-                            corr, p_val = stats.spearmanr(data_array[:, i], data_array[:, j])
-                        elif method == "kendall":
-                            corr, p_val = stats.kendalltau(data_array[:, i], data_array[:, j])
-
-                        correlation_matrices[method][i, j] = corr
-                        p_value_matrices[method][i, j] = p_val
-
-        # Crear lista de correlaciones con todos los métodos
-        correlations_list = []
-        for i in range(n_vars):
-            for j in range(i + 1, n_vars):  # Solo mitad superior (sin diagonal)
-                # Usar safe_float para manejar NaN e Infinity
-                pearson_corr = safe_float(correlation_matrices["pearson"][i, j])
-                pearson_pval = safe_float(p_value_matrices["pearson"][i, j])
-                spearman_corr = safe_float(correlation_matrices["spearman"][i, j])
-                spearman_pval = safe_float(p_value_matrices["spearman"][i, j])
-                kendall_corr = safe_float(correlation_matrices["kendall"][i, j])
-                kendall_pval = safe_float(p_value_matrices["kendall"][i, j])
-
-                corr_entry = {
-                    "variable_1": numeric_columns[i],
-                    "variable_2": numeric_columns[j],
-                    "pearson": {
-                        "correlation": pearson_corr,
-                        "p_value": pearson_pval,
-                    },
-                    "spearman": {
-                        "correlation": spearman_corr,
-                        "p_value": spearman_pval,
-                    },
-                    "kendall": {
-                        "correlation": kendall_corr,
-                        "p_value": kendall_pval,
-                    }
-                }
-
-                # Agregar correlación absoluta promedio para ordenar
-                # Solo calcular si todos los valores son válidos
-                valid_corrs = [c for c in [pearson_corr, spearman_corr, kendall_corr] if c is not None]
-                if valid_corrs:
-                    avg_abs_corr = sum(abs(c) for c in valid_corrs) / len(valid_corrs)
-                    corr_entry["average_abs_correlation"] = avg_abs_corr
-                else:
-                    corr_entry["average_abs_correlation"] = 0.0
-
-                correlations_list.append(corr_entry)
-
-        # Ordenar por correlación absoluta promedio (de mayor a menor)
-        correlations_list.sort(key=lambda x: x["average_abs_correlation"], reverse=True)
-
-        # Crear matrices de correlación como diccionarios
-        correlation_dict = {}
-        for method in methods:
-            correlation_dict[method] = {}
-            for i, col_i in enumerate(numeric_columns):
-                correlation_dict[method][col_i] = {}
-                for j, col_j in enumerate(numeric_columns):
-                    correlation_dict[method][col_i][col_j] = {
-                        "correlation": safe_float(correlation_matrices[method][i, j]),
-                        "p_value": safe_float(p_value_matrices[method][i, j])
-                    }
+        off_diagonal = ~np.eye(n_vars, dtype=bool)
+        off_diagonal_rows = pair_rows[off_diagonal]
 
-        return {
+        # Formato compacto: matrices densas fila por fila indexadas por `variables`
+        compact = {
             "success": True,
+            "format": "compact",
             "methods": methods,
-            "n_variables": len(numeric_columns),
+            "n_variables": n_vars,
             "variables": numeric_columns,
-            "correlation_matrices": correlation_dict,
-            "correlations_list": correlations_list,
-            "total_correlations": len(correlations_list),
-            "samples_used": len(df_numeric)
+            "total_correlations": n_vars * (n_vars - 1) // 2,
+            # Con pairwise-complete, el máximo de filas usado por algún par
+            "samples_used": int(off_diagonal_rows.max()) if off_diagonal_rows.size else 0,
+            "null_handling": "pairwise" if pairwise_complete else "listwise",
+            "kendall_sample_size": int(kendall_rows[off_diagonal].max()) if off_diagonal_rows.size else 0,
+            "kendall_sampled": bool((kendall_rows[off_diagonal] < off_diagonal_rows).any()),
+            "matrices": {
+                method: {"correlation": safe_float_list(corr), "p_value": safe_float_list(p_values)}
+                for method, (corr, p_values) in matrices.items()
+            },
+            "pair_n": pair_rows.ravel().tolist(),
+            "kendall_n": kendall_rows.ravel().tolist(),
+            # Columnas recalculadas en una actualización incremental (None = todas)
+            "recomputed_columns": None if targets is None else [numeric_columns[k] for k in targets],
+            "associations": _association_lists(associations) if associations is not None else None,
         }
+        return compact if output_format == "compact" else expand_correlations(compact)
 
     except Exception as e:
         return {"error": f"Error al analizar correlaciones: {str(e)}"}
 
 
+def _association_lists(associations: dict) -> dict:
+    """Aplana las matrices numpy de `association_matrices` (fila por fila) para JSON"""
+    result = {key: value for key, value in associations.items() if key not in ("categorical", "categorical_numeric")}
+    for group in ("categorical", "categorical_numeric"):
+        result[group] = {
+            measure: matrix.ravel().tolist() if measure == "n" else safe_float_list(matrix)
+            for measure, matrix in associations[group].items()
+        }
+    return result
+
+
+def _compact_arrays(compact: dict):
+    """Reconstruye las matrices numpy de un resultado compacto"""
+    n_vars = compact["n_variables"]
+    shape = (n_vars, n_vars)
+    correlation_matrices = {}
+    p_value_matrices = {}
+    for method in compact["methods"]:
+        # None -> NaN
+        correlation_matrices[method] = np.array(compact["matrices"][method]["correlation"], dtype=np.float64).reshape(shape)
+        p_value_matrices[method] = np.array(compact["matrices"][method]["p_value"], dtype=np.float64).reshape(shape)
+    return correlation_matrices, p_value_matrices
+
+
+def expand_correlations(compact: dict):
+    """
+    Convierte un resultado compacto de `analyze_correlations` al formato
+    original: lista de todos los pares ordenada y matrices como diccionarios
+    anidados {método: {variable: {variable: {correlation, p_value}}}}.
+
+    Args:
+        compact: Resultado con format="compact"
+
+    Returns:
+        dict: Resultado en el formato original
+    """
+    numeric_columns = compact["variables"]
+    n_vars = compact["n_variables"]
+    methods = compact["methods"]
+    correlation_matrices, p_value_matrices = _compact_arrays(compact)
+    pair_rows = np.array(compact["pair_n"], dtype=np.int64).reshape(n_vars, n_vars)
+    kendall_rows = np.array(compact["kendall_n"], dtype=np.int64).reshape(n_vars, n_vars)
+
+    # Crear lista de correlaciones con todos los métodos
+    correlations_list = []
+    for i in range(n_vars):
+        for j in range(i + 1, n_vars):  # Solo mitad superior (sin diagonal)
+            # Usar safe_float para manejar NaN e Infinity
+            pearson_corr = safe_float(correlation_matrices["pearson"][i, j])
+            pearson_pval = safe_float(p_value_matrices["pearson"][i, j])
+            spearman_corr = safe_float(correlation_matrices["spearman"][i, j])
+            spearman_pval = safe_float(p_value_matrices["spearman"][i, j])
+            kendall_corr = safe_float(correlation_matrices["kendall"][i, j])
+            kendall_pval = safe_float(p_value_matrices["kendall"][i, j])
+
+            corr_entry = {
+                "variable_1": numeric_columns[i],
+                "variable_2": numeric_columns[j],
+                "n": int(pair_rows[i, j]),
+                "pearson": {
+                    "correlation": pearson_corr,
+                    "p_value": pearson_pval,
+                },
+                "spearman": {
+                    "correlation": spearman_corr,
+                    "p_value": spearman_pval,
+                },
+                "kendall": {
+                    "correlation": kendall_corr,
+                    "p_value": kendall_pval,
+                    "n": int(kendall_rows[i, j]),
+                }
+            }
+
+            # Agregar correlación absoluta promedio para ordenar
+            # Solo calcular si todos los valores son válidos
+            valid_corrs = [c for c in [pearson_corr, spearman_corr, kendall_corr] if c is not None]
+            if valid_corrs:
+                avg_abs_corr = sum(abs(c) for c in valid_corrs) / len(valid_corrs)
+                corr_entry["average_abs_correlation"] = avg_abs_corr
+            else:
+                corr_entry["average_abs_correlation"] = 0.0
+
+            correlations_list.append(corr_entry)
+
+    # Ordenar por correlación absoluta promedio (de mayor a menor)
+    correlations_list.sort(key=lambda x: x["average_abs_correlation"], reverse=True)
+
+    # Crear matrices de correlación como diccionarios
+    correlation_dict = {}
+    for method in methods:
+        correlation_dict[method] = {}
+        for i, col_i in enumerate(numeric_columns):
+            correlation_dict[method][col_i] = {}
+            for j, col_j in enumerate(numeric_columns):
+                correlation_dict[method][col_i][col_j] = {
+                    "correlation": safe_float(correlation_matrices[method][i, j]),
+                    "p_value": safe_float(p_value_matrices[method][i, j])
+                }
+
+    return {
+        "success": True,
+        "methods": methods,
+        "n_variables": n_vars,
+        "variables": numeric_columns,
+        "correlation_matrices": correlation_dict,
+        "correlations_list": correlations_list,
+        "total_correlations": len(correlations_list),
+        "samples_used": compact["samples_used"],
+        "null_handling": compact["null_handling"],
+        "kendall_sample_size": compact["kendall_sample_size"],
+        "kendall_sampled": compact["kendall_sampled"],
+        "associations": compact.get("associations")
+    }
+
+
+def correlation_page(
+    compact: dict,
+    top_n: int = 5,
+    min_abs_corr: float = 0.0,
+    cursor: int = 0,
+    limit: int = 500,
+    include_matrices: bool = True,
+):
+    """
+    Arma una respuesta compacta a partir del resultado de `analyze_correlations`.
+    Los pares son triples [i, j, correlación absoluta promedio] con índices en
+    `variables`; sus coeficientes se leen de las matrices (posición i * n + j).
+
+    Args:
+        compact: Resultado con format="compact"
+        top_n: Pares más fuertes a devolver en "top_correlations"
+        min_abs_corr: Solo se listan pares con correlación absoluta promedio >= este valor
+        cursor: Posición del ranking desde la que empieza la página
+        limit: Pares por página
+        include_matrices: Si False, se omiten las matrices (páginas siguientes)
+
+    Returns:
+        dict: Encabezado, top N, página de pares y cursor siguiente (None al final)
+    """
+    correlation_matrices, _ = _compact_arrays(compact)
+    rows, cols, scores = pair_scores(correlation_matrices)
+
+    def as_pairs(indices):
+        return [[int(rows[k]), int(cols[k]), float(scores[k])] for k in indices]
+
+    top, _ = rank_pairs(scores, top_n, min_abs_corr=min_abs_corr)
+    page, total = rank_pairs(scores, limit, offset=cursor, min_abs_corr=min_abs_corr)
+    next_cursor = cursor + len(page)
+
+    result = {key: value for key, value in compact.items() if key not in ("matrices", "pair_n", "kendall_n")}
+    if include_matrices:
+        result["matrices"] = compact["matrices"]
+        result["pair_n"] = compact["pair_n"]
+        result["kendall_n"] = compact["kendall_n"]
+    result.update({
+        "min_abs_corr": min_abs_corr,
+        "top_correlations": as_pairs(top),
+        "pairs": as_pairs(page),
+        "pairs_total": total,
+        "cursor": cursor,
+        "next_cursor": next_cursor if next_cursor < total else None,
+    })
+    return result
+
+
 # 4. DETECT OUTLIERS AND CLEAN
 def detect_iqr_bounds(df: pl.DataFrame, col: str, k: float = 2.5):
-    """Calcula límites IQR  usando expresiones Polars"""
-    q = df.select([
-        pl.col(col).quantile(0.25).alias("q1"),
-        pl.col(col).quantile(0.75).alias("q3")
-    ])
-    q1, q3 = q["q1"][0], q["q3"][0]
-    iqr = q3 - q1
-    lower = q1 - k * iqr
-    upper = q3 + k * iqr
-    return lower, upper
+    """Calcula límites IQR  usando expresiones Polars (para varias columnas usar `iqr_bounds`)"""
+    return iqr_bounds(df, [col], k=k)[col]
 
 def clean_and_impute(
     df: pl.DataFrame,
     cols: list[str],
     iqr_k: float = 1.5,
-    n_neighbors: int = 5
+    n_neighbors: int = 5,
+    detection: Optional[dict] = None,
+    knn_max_rows: int = KNN_MAX_ROWS,
+    mice_tol: float = MICE_TOLERANCE,
+    progress=None,
+    should_stop=None
 ) -> pl.DataFrame:
     """
-    Limpieza de outliers e imputación inteligente de 3 niveles.
+    Limpieza de outliers e imputación inteligente por niveles.
 
-    Estrategia basada en tamaño del dataset:
+    Los límites IQR de todas las columnas se calculan en una sola consulta y los
+    outliers se reemplazan con un solo `with_columns`. Con `detection` (resultado
+    de `core.outliers.detect_outliers`) se usan los outliers de ese detector.
+
+    Estrategia basada en tamaño del dataset (ver `core.imputation.imputation_strategy`):
     - ≤5,000 filas: KNN Imputation (máxima precisión, O(n²))
     - 5,001-50,000 filas: MICE/IterativeImputer (robusto y razonablemente rápido)
-    - >50,000 filas: Median Imputation (muy rápido para datasets masivos)
-
-    IterativeImputer implementa MICE (Multivariate Imputation by Chained Equations),
-    método científicamente validado (van Buuren & Groothuis-Oudshoorn, 2011) que
-    captura relaciones entre variables.
+    - hasta `knn_max_rows`: KNN por bloques con KD-tree/Ball-tree (memoria acotada)
+    - más filas: Median Imputation con expresiones de Polars (sin pasar por NumPy);
+      para datasets en modo lazy ver `core.imputation.clean_out_of_core`
+
+    MICE (Multivariate Imputation by Chained Equations) es un método
+    científicamente validado (van Buuren & Groothuis-Oudshoorn, 2011) que
+    captura relaciones entre variables. Se ejecuta con `core.imputation.mice_impute`:
+    `progress(iteración, max_iter, cambio)` se llama tras cada iteración, se
+    detiene antes si el cambio es menor que `mice_tol`, y si `should_stop()`
+    devuelve True se lanza `ImputationCancelled` (también entre los bloques de
+    KNN por árboles).
     """
     import logging
     logger = logging.getLogger(__name__)
-    from sklearn.impute import SimpleImputer
-    from sklearn.experimental import enable_iterative_imputer
-    from sklearn.impute import IterativeImputer
     from sklearn.ensemble import ExtraTreesRegressor
 
-    df_clean = df.clone()
-    n_rows = len(df_clean)
+    if should_stop is not None and should_stop():
+        raise ImputationCancelled()
+
+    n_rows = len(df)
     n_cols = len(cols)
 
-    # Paso 1: Reemplazar outliers con None
+    # Paso 1: Reemplazar outliers con None (todas las columnas en una pasada)
     logger.info(f"Limpiando outliers en {n_cols} columnas con {n_rows:,} filas...")
-    for col in cols:
-        lower, upper = detect_iqr_bounds(df_clean, col, k=iqr_k)
-        df_clean = df_clean.with_columns(
-            pl.when((pl.col(col) >= lower) & (pl.col(col) <= upper))
-              .then(pl.col(col))
-              .otherwise(None)
-              .alias(col)
-        )
+    if detection is None:
+        df_clean, _ = null_outliers(df, iqr_bounds(df, cols, k=iqr_k))
+    else:
+        df_clean, _ = null_detected(df, cols, detection)
 
-    # Paso 2: Imputar valores faltantes con estrategia de 3 niveles
+    # Paso 2: Imputar valores faltantes con estrategia por niveles
+    strategy = imputation_strategy(n_rows, knn_max_rows)
 
-    if n_rows <= 5000:
+    if strategy["key"] == "knn":
         # Datasets pequeños: KNN (máxima precisión)
         logger.info(f"Dataset pequeño ({n_rows:,} filas). Usando KNN Imputation (k={n_neighbors}) para máxima precisión...")
         imputer = KNNImputer(n_neighbors=n_neighbors)
         imputed = imputer.fit_transform(df_clean.select(cols))
         method_used = "KNN"
 
-    elif n_rows <= 50000:
+    elif strategy["key"] == "mice":
         # Datasets medianos: MICE/IterativeImputer (balance óptimo)
         logger.info(f"Dataset mediano ({n_rows:,} filas, {n_cols} columnas). Usando MICE/IterativeImputer con ExtraTreesRegressor...")
         logger.info("Este método captura relaciones entre variables (científicamente validado)")
@@ -592,27 +1033,42 @@ def clean_and_impute(
         # max_iter reducido para datasets grandes
         max_iter = 5 if n_rows > 20000 else 10
 
-        imputer = IterativeImputer(
-            estimator=ExtraTreesRegressor(
+        def estimator_factory():
+            return ExtraTreesRegressor(
                 n_estimators=10,  # Reducido para performance
                 max_depth=10,
                 min_samples_leaf=5,
                 n_jobs=-1,
                 random_state=42
-            ),
+            )
+
+        data = df_clean.select([pl.col(col).cast(pl.Float64) for col in cols]).to_numpy()
+        imputed, report = mice_impute(
+            data,
+            estimator_factory,
             max_iter=max_iter,
-            random_state=42,
-            verbose=0
+            tol=mice_tol,
+            progress=progress,
+            should_stop=should_stop
         )
-        imputed = imputer.fit_transform(df_clean.select(cols))
+        logger.info(f"MICE: {report['iterations']} iteraciones, convergencia: {report['converged']}")
         method_used = "MICE"
 
+    elif strategy["key"] == "knn_tree":
+        # Datasets grandes: KNN por bloques contra un árbol de las filas completas
+        logger.info(f"Dataset grande ({n_rows:,} filas). Usando KNN Imputation por bloques con árboles de vecinos (k={n_neighbors})...")
+        data = df_clean.select([pl.col(col).cast(pl.Float64) for col in cols]).to_numpy()
+        imputed = knn_impute(data, n_neighbors=n_neighbors, should_stop=should_stop)
+        method_used = "KNN (tree-indexed)"
+
     else:
-        # Datasets grandes: Median (muy rápido)
+        # Datasets masivos: Median (muy rápido)
         logger.info(f"Dataset grande ({n_rows:,} filas). Usando Median Imputation para óptima performance...")
-        imputer = SimpleImputer(strategy='median')
-        imputed = imputer.fit_transform(df_clean.select(cols))
-        method_used = "Median"
+        df_clean = df_clean.with_columns([
+            pl.col(col).cast(pl.Float64).fill_null(pl.col(col).median()) for col in cols
+        ])
+        logger.info("Limpieza e imputación completada exitosamente usando Median")
+        return df_clean
 
     imputed_df = pl.DataFrame(imputed, schema=cols)
     df_clean = df_clean.with_columns(imputed_df)
@@ -622,45 +1078,37 @@ def clean_and_impute(
 
 
 # 4. HANDLE CATEGORICAL FEATURES
-def handle_categorical_features(df: pl.DataFrame, features: list[str]) -> tuple[pl.DataFrame, dict]:
+def handle_categorical_features(df: pl.DataFrame, features: list[str],
+                                ordinal_max_categories: Optional[int] = None) -> tuple[pl.DataFrame, dict]:
     """
     Codifica variables categóricas de forma ULTRA robusta:
     1. Normaliza strings (strip, lowercase)
     2. Imputa nulls con moda
-    3. Mapea texto → números
-    4. Convierte a Int64 con default=-1 para valores no mapeados
-    """
-    df_proc = df.clone()
-    encoders = {}
+    3. Mapea texto → números con los códigos físicos de Categorical, en el orden
+       de las categorías ordenadas (determinista)
+    4. Convierte a Int64 con -1 para valores no mapeados
 
-    for col in features:
-        if str(df[col].dtype) in ["Utf8", "String", "Categorical"]:
-            # 1. Normalizar strings: quitar espacios y convertir a lowercase
-            df_proc = df_proc.with_columns(
-                pl.col(col).str.strip_chars().str.to_lowercase().alias(col)
-            )
-            
-            # 2. Imputar nulls con moda
-            mode_values = df_proc[col].mode().to_list()
-            if len(mode_values) > 0:
-                df_proc = df_proc.with_columns(
-                    pl.col(col).fill_null(mode_values[0]).alias(col)
-                )
-            
-            # 3. Obtener valores únicos (después de normalizar e imputar)
-            uniques = df_proc[col].unique().to_list()
+    Cada encoder guarda las categorías ordenadas, el valor de relleno y la
+    normalización (ver `core.encoding.apply_category_encoder` para inferencia).
 
-            # 4. Crear mapeo texto → número
-            mapping = {val: i for i, val in enumerate(uniques)}
+    Con `ordinal_max_categories`, las columnas con más valores distintos (sin
+    normalizar) quedan como texto: el plan de entrenamiento las codifica con
+    target encoding o hashing (ver `core.preprocessing`).
+    """
+    encoded = {}
+    encoders = {}
 
-            # 5. Aplicar replace con default=-1 y strict=False
-            df_proc = df_proc.with_columns(
-                pl.col(col).replace(mapping, default=-1).cast(pl.Int64, strict=False).alias(col)
-            )
+    candidates = [col for col in features if is_categorical(df[col].dtype)]
+    if ordinal_max_categories is not None and candidates:
+        counts = df.select([pl.col(col).drop_nulls().n_unique() for col in candidates]).row(0)
+        candidates = [col for col, count in zip(candidates, counts) if count <= ordinal_max_categories]
 
-            encoders[col] = mapping
+    for col in candidates:
+        encoded[col], encoders[col] = fit_category_encoder(df[col])
 
-    return df_proc, encoders
+    if not encoded:
+        return df.clone(), encoders
+    return df.with_columns(list(encoded.values())), encoders
 
 
 # 5. CHECK CLASSIFICATION OR REGRESSION
@@ -825,86 +1273,31 @@ def prepare_data_for_ml(df: pl.DataFrame, features: list, label: str):
     - Ya NO hace drop_nulls agresivo
     - Imputa con estrategia apropiada por tipo
     - Garantiza todo numérico para sklearn
+
+    Usa el mismo plan que `train_model` (ver `core.preprocessing.build_preprocessing_plan`);
+    sin división train/test, el target encoding se ajusta fuera de fold con todas las filas.
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
     try:
-        # Seleccionar solo las columnas necesarias
-        selected_data = df.select(features + [label])
-        logger.info(f"Filas iniciales: {len(selected_data)}")
-        
-        # 1. Eliminar solo filas donde el LABEL es null
-        selected_data = selected_data.filter(pl.col(label).is_not_null())
-        logger.info(f"Filas después de filtrar label nulls: {len(selected_data)}")
-        
-        if len(selected_data) == 0:
-            raise Exception(f"Todas las filas tienen null en la columna label '{label}'")
-        
-        # 2. Procesar cada feature
-        for col in features:
-            dtype = str(selected_data[col].dtype)
-            nulls_before = selected_data[col].null_count()
-            
-            # Si es numérica
-            if dtype.startswith(("Int", "UInt", "Float")):
-                # Imputar con mediana, si falla usar 0
-                median_val = selected_data[col].median()
-                fill_val = median_val if median_val is not None else 0
-                selected_data = selected_data.with_columns(
-                    pl.col(col).fill_null(fill_val).alias(col)
-                )
-            
-            # Si es categórica (String)
-            elif dtype in ["Utf8", "String", "Categorical"]:
-                # Imputar nulls con moda, si falla usar "Unknown"
-                mode_values = selected_data[col].mode().to_list()
-                fill_val = mode_values[0] if len(mode_values) > 0 else "Unknown"
-                selected_data = selected_data.with_columns(
-                    pl.col(col).fill_null(fill_val).alias(col)
-                )
-                
-                # Codificar: crear mapping COMPLETO incluyendo todos los valores
-                uniques = selected_data[col].unique().to_list()
-                mapping = {val: i for i, val in enumerate(uniques)}
-                
-                # Aplicar replace con default para valores no mapeados
-                selected_data = selected_data.with_columns(
-                    pl.col(col).replace(mapping, default=-1).cast(pl.Int64, strict=False).alias(col)
-                )
-            
-            nulls_after = selected_data[col].null_count()
-            logger.info(f"Columna '{col}' ({dtype}): {nulls_before} nulls → {nulls_after} nulls")
-        
-        # 3. Manejar label si es categórico
-        label_dtype = str(selected_data[label].dtype)
-        if label_dtype in ["Utf8", "String", "Categorical"]:
-            uniques = selected_data[label].unique().to_list()
-            mapping = {val: i for i, val in enumerate(uniques)}
-            selected_data = selected_data.with_columns(
-                pl.col(label).replace(mapping, default=-1).cast(pl.Int64, strict=False).alias(label)
+        plan = build_preprocessing_plan(df, features, label, keep_frame=True)
+        X = plan["X"].copy()
+        if plan["target_columns"]:
+            fit_target_columns(plan, X, plan["y"], [])
+            plan["data"] = plan["data"].with_columns(
+                [pl.Series(col, X[:, index]) for col, index in plan["target_columns"].items()]
             )
-        
-        # 4. Verificar que no queden nulls
-        total_nulls = selected_data.null_count().sum_horizontal()[0]
-        logger.info(f"Total nulls restantes: {total_nulls}")
-        logger.info(f"Filas finales: {len(selected_data)}")
-        
-        if len(selected_data) == 0:
-            raise Exception("Dataset quedó vacío después del procesamiento")
-        
-        # 5. Separar features y target
-        X = selected_data.select(features).to_numpy()
-        y = selected_data.select(label).to_numpy().ravel()
-
-        return X, y, selected_data
+        return X, plan["y"], plan["data"]
 
     except Exception as e:
         raise Exception(f"Error al preparar los datos: {str(e)}")
 
 
 # 7. TRAIN MODEL (FUNCIÓN COMPLETA DEL NOTEBOOK)
-def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
+def train_model(df: pl.DataFrame, features: list, label: str, model_type: str, plan: Optional[dict] = None):
+    """
+    Entrena un modelo. Con `plan` (de `core.preprocessing.build_preprocessing_plan`,
+    p.ej. desde la caché del endpoint) se reutilizan X, y y los encoders ya
+    preparados y `df` no se usa; sin él, el plan se arma aquí.
+    """
 
     try:
         # Modelos de regresión y clasificación disponibles
@@ -934,74 +1327,27 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                 "error": f"Tipo de modelo no válido. Opciones disponibles: {valid_models}"
             }
 
-        # Manejar variables categóricas
-        processed_df, categorical_encoders = handle_categorical_features(df, features)
-
-        # Preparar datos
-        X, y, clean_data = prepare_data_for_ml(processed_df, features, label)
+        # Preparar datos: imputación y codificación categórica en un solo plan
+        if plan is None:
+            plan = build_preprocessing_plan(df, features, label)
+        X = plan["X"]
 
         if len(X) == 0:
             return {
                 "error": "No hay datos suficientes después de limpiar valores nulos"
             }
 
-        # División de datos con estratificación para clasificación
+        # División, muestreo y escalado: se reutilizan del plan si ya se prepararon
         is_classification = any(clf in model_type for clf in ['classification', 'logistic', 'naive_bayes', 'svm_classification', 'knn'])
-
-        # OPTIMIZATION: Intelligent stratified sampling for large datasets to prevent Azure timeouts
-        # This maintains scientific validity while reducing training time
-        use_sampling = False
+        split = training_split(plan, stratify=is_classification)
+        X_train, X_test = split["X_train"], split["X_test"]
+        y_train, y_test = split["y_train"], split["y_test"]
+        X_train_scaled, X_test_scaled = split["X_train_scaled"], split["X_test_scaled"]
+        scaler = split["scaler"]
+        categorical_encoders = split["encoders"]
+        use_sampling = split["sampling_strategy"] != "none"
         original_dataset_size = len(X)
 
-        if is_classification and len(np.unique(y)) > 1:
-            # Standard train/test split with stratification
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y
-            )
-
-            # OPTIMIZATION: Apply intelligent sampling for large datasets (>30,000 rows)
-            # Target: ~24,000 training samples (scientifically valid, prevents timeout)
-            if len(X_train) > 24000:
-                use_sampling = True
-                target_samples = 24000
-                logger.info(f"OPTIMIZATION: Large dataset detected ({len(X_train):,} training samples)")
-                logger.info(f"OPTIMIZATION: Applying stratified sampling to {target_samples:,} samples")
-                logger.info(f"OPTIMIZATION: This maintains scientific validity while preventing Azure timeouts")
-
-                # Use StratifiedShuffleSplit to maintain class distribution
-                sss = StratifiedShuffleSplit(n_splits=1, train_size=target_samples, random_state=42)
-                train_idx, _ = next(sss.split(X_train, y_train))
-                X_train = X_train[train_idx]
-                y_train = y_train[train_idx]
-
-                logger.info(f"OPTIMIZATION: Training set reduced from {len(train_idx):,} to {len(X_train):,} samples")
-                logger.info(f"OPTIMIZATION: Test set kept at full size: {len(X_test):,} samples for proper validation")
-        else:
-            # Regression or single-class classification
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
-
-            # OPTIMIZATION: For regression with large datasets, use simple random sampling
-            if len(X_train) > 24000:
-                use_sampling = True
-                target_samples = 24000
-                logger.info(f"OPTIMIZATION: Large dataset detected ({len(X_train):,} training samples)")
-                logger.info(f"OPTIMIZATION: Applying random sampling to {target_samples:,} samples")
-
-                # Random sampling for regression
-                from sklearn.utils import resample
-                X_train, y_train = resample(X_train, y_train, n_samples=target_samples,
-                                           random_state=42, replace=False)
-
-                logger.info(f"OPTIMIZATION: Training set sampled to {len(X_train):,} samples")
-                logger.info(f"OPTIMIZATION: Test set kept at full size: {len(X_test):,} samples for proper validation")
-
-        # Escalamiento de features
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-
         # Modelos de regresión
 
         if model_type == "linear_regression":
@@ -1082,10 +1428,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                 "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
                 "mae": float(mean_absolute_error(y_test, y_pred)),
                 "r2": float(r2_score(y_test, y_pred)),
-                "feature_importance": {
-                    feature: float(importance)
-                    for feature, importance in zip(features, model.feature_importances_)
-                },
+                "feature_importance": feature_importance(plan["column_features"], model.feature_importances_),
             }
 
         elif model_type == "gradient_boosting_regression":
@@ -1118,10 +1461,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                 "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
                 "mae": float(mean_absolute_error(y_test, y_pred)),
                 "r2": float(r2_score(y_test, y_pred)),
-                "feature_importance": {
-                    feature: float(importance)
-                    for feature, importance in zip(features, model.feature_importances_)
-                },
+                "feature_importance": feature_importance(plan["column_features"], model.feature_importances_),
             }
 
         elif model_type == "xgboost_regression":
@@ -1158,10 +1498,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                 "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
                 "mae": float(mean_absolute_error(y_test, y_pred)),
                 "r2": float(r2_score(y_test, y_pred)),
-                "feature_importance": {
-                    feature: float(importance)
-                    for feature, importance in zip(features, model.feature_importances_)
-                },
+                "feature_importance": feature_importance(plan["column_features"], model.feature_importances_),
             }
 
         elif model_type == "svr":
@@ -1241,10 +1578,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                     y_test, y_pred, output_dict=True, zero_division=0
                 ),
                 "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
-                "feature_importance": {
-                    feature: float(importance)
-                    for feature, importance in zip(features, model.feature_importances_)
-                },
+                "feature_importance": feature_importance(plan["column_features"], model.feature_importances_),
             }
 
         elif model_type == "gradient_boosting_classification":
@@ -1285,10 +1619,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                     y_test, y_pred, output_dict=True, zero_division=0
                 ),
                 "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
-                "feature_importance": {
-                    feature: float(importance)
-                    for feature, importance in zip(features, model.feature_importances_)
-                },
+                "feature_importance": feature_importance(plan["column_features"], model.feature_importances_),
             }
 
         elif model_type == "xgboost_classification":
@@ -1333,10 +1664,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                     y_test, y_pred, output_dict=True, zero_division=0
                 ),
                 "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
-                "feature_importance": {
-                    feature: float(importance)
-                    for feature, importance in zip(features, model.feature_importances_)
-                },
+                "feature_importance": feature_importance(plan["column_features"], model.feature_importances_),
             }
 
         elif model_type == "svm_classification":
@@ -1422,10 +1750,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
                     y_test, y_pred, output_dict=True, zero_division=0
                 ),
                 "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
-                "feature_importance": {
-                    feature: float(importance)
-                    for feature, importance in zip(features, model.feature_importances_)
-                },
+                "feature_importance": feature_importance(plan["column_features"], model.feature_importances_),
             }
 
         # Información adicional sobre el entrenamiento
@@ -1435,11 +1760,17 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
             "label_column": label,
             "training_samples": len(X_train),
             "test_samples": len(X_test),
-            "original_samples": len(clean_data),
-            "categorical_encoders": categorical_encoders if categorical_encoders else None,
+            "original_samples": plan["rows"],
+            "categorical_encoders": (
+                {col: describe_encoder(encoder) for col, encoder in categorical_encoders.items()}
+                if categorical_encoders else None
+            ),
+            "encoded_columns": plan["columns"],
+            "label_encoder": plan["label_encoder"],
+            "fill_values": plan["fill_values"],
             # OPTIMIZATION: Track sampling and optimization strategy
             "optimization_applied": use_sampling,
-            "optimization_strategy": "stratified_sampling" if (use_sampling and is_classification) else ("random_sampling" if use_sampling else "none"),
+            "optimization_strategy": split["sampling_strategy"],
             "original_dataset_size": original_dataset_size,
         }
 
@@ -1466,6 +1797,7 @@ def train_model(df: pl.DataFrame, features: list, label: str, model_type: str):
             "predictions": predictions_data,
             "model": model,
             "scaler": scaler,
+            "encoders": categorical_encoders,
             "message": f"Modelo {model_type} entrenado exitosamente",
         }
 
@@ -1483,6 +1815,7 @@ def model_to_bytes(model_results: dict) -> dict:
         model_package = {
             "model": model_results["model"],
             "scaler": model_results["scaler"],
+            "categorical_encoders": model_results.get("encoders"),
         }
 
         buffer = io.BytesIO()
@@ -1522,6 +1855,7 @@ def create_download_response(model_results: dict, filename: str = None) -> dict:
         model_package = {
             "model": model_results["model"],
             "scaler": model_results["scaler"],
+            "categorical_encoders": model_results.get("encoders"),
             "metrics": model_results["metrics"],
             "training_info": model_results["training_info"],
             "saved_at": datetime.now().isoformat(),
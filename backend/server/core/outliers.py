@@ -0,0 +1,386 @@
+"""
+Detección de outliers por lotes con detectores intercambiables.
+
+Los detectores univariados (IQR, MAD, z-score y z-score robusto) se reducen a
+límites por columna calculados a partir de estadísticas que salen de una sola
+consulta de Polars; el conteo y la limpieza se arman como un lote de
+expresiones (una por columna). Isolation Forest es multivariado: se entrena
+con una muestra y puntúa el DataFrame completo por bloques de filas.
+"""
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+import polars as pl
+from typing import Dict, List, Optional, Tuple
+
+from core.correlations import reservoir_sample_indices
+
+Bounds = Dict[str, Tuple[Optional[float], Optional[float]]]
+
+# Filas de la muestra con la que se entrena Isolation Forest
+ISOLATION_FOREST_SAMPLE_SIZE = 10_000
+
+# Filas por bloque al puntuar con Isolation Forest
+ISOLATION_FOREST_BATCH_ROWS = 100_000
+
+# Estadísticas por columna que pueden pedir los detectores
+STATISTICS = {
+    "q1": lambda c: c.quantile(0.25),
+    "q3": lambda c: c.quantile(0.75),
+    "median": lambda c: c.median(),
+    "mad": lambda c: (c - c.median()).abs().median(),
+    "mean": lambda c: c.mean(),
+    "std": lambda c: c.std(),
+}
+
+# Factor que hace de la MAD un estimador consistente de la desviación estándar (normal)
+MAD_SCALE = 1.4826
+
+# Factor que convierte el IQR en desviación estándar (normal)
+IQR_SCALE = 1.349
+
+
+def _select_row(frame, exprs: List[pl.Expr]) -> tuple:
+    """Una fila de agregados; un LazyFrame se escanea en modo streaming"""
+    if isinstance(frame, pl.LazyFrame):
+        return frame.select(exprs).collect(streaming=True).row(0)
+    return frame.select(exprs).row(0)
+
+
+def column_statistics(df, cols: List[str], statistics) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Estadísticas de varias columnas en un solo `select`.
+
+    Args:
+        df: DataFrame o LazyFrame de Polars
+        cols: Columnas numéricas
+        statistics: Nombres de `STATISTICS` a calcular
+
+    Returns:
+        dict: {columna: {estadística: valor}} (None si la columna no tiene valores)
+    """
+    statistics = sorted(set(statistics))
+    if not cols or not statistics:
+        return {col: {} for col in cols}
+    row = _select_row(df, [
+        STATISTICS[stat](pl.col(col)).alias(f"{i}|{stat}")
+        for i, col in enumerate(cols) for stat in statistics
+    ])
+    values = iter(row)
+    return {col: {stat: next(values) for stat in statistics} for col in cols}
+
+
+class OutlierDetector(ABC):
+    """
+    Detector univariado: define las estadísticas que necesita y cómo convertirlas
+    en límites por columna. Los valores fuera de [inferior, superior] son outliers;
+    límites (None, None) dejan la columna sin analizar.
+    """
+
+    name = ""
+    label = ""
+    statistics: Tuple[str, ...] = ()
+    default_threshold = 0.0
+    multivariate = False
+
+    @abstractmethod
+    def limits(self, stats: Dict[str, Optional[float]], threshold: float) -> Tuple[Optional[float], Optional[float]]:
+        """Límites (inferior, superior) de una columna a partir de sus estadísticas"""
+
+    def check_threshold(self, threshold: float):
+        """Lanza ValueError si el umbral no es válido para el detector"""
+
+    def bounds(self, stats: Dict[str, Dict[str, Optional[float]]], threshold: float) -> Bounds:
+        result = {}
+        for col, values in stats.items():
+            if any(values.get(stat) is None for stat in self.statistics):
+                result[col] = (None, None)
+            else:
+                result[col] = self.limits(values, threshold)
+        return result
+
+
+class IQRDetector(OutlierDetector):
+    """Fuera de [Q1 - k*IQR, Q3 + k*IQR]"""
+
+    name = "iqr"
+    label = "IQR"
+    statistics = ("q1", "q3")
+    default_threshold = 1.5
+
+    def limits(self, stats, threshold):
+        iqr = stats["q3"] - stats["q1"]
+        return stats["q1"] - threshold * iqr, stats["q3"] + threshold * iqr
+
+
+class MADDetector(OutlierDetector):
+    """
+    Desviación absoluta mediana: |x - mediana| > k * 1.4826 * MAD (z-score
+    modificado de Iglewicz y Hoaglin; k = 3.5 por defecto)
+    """
+
+    name = "mad"
+    label = "MAD"
+    statistics = ("median", "mad")
+    default_threshold = 3.5
+
+    def limits(self, stats, threshold):
+        # MAD 0 (más de la mitad de los valores iguales): cualquier otro valor
+        # sería outlier, así que la columna no se analiza
+        if stats["mad"] == 0:
+            return None, None
+        spread = threshold * MAD_SCALE * stats["mad"]
+        return stats["median"] - spread, stats["median"] + spread
+
+
+class ZScoreDetector(OutlierDetector):
+    """z-score clásico: |x - media| > k * desviación estándar"""
+
+    name = "zscore"
+    label = "Z-score"
+    statistics = ("mean", "std")
+    default_threshold = 3.0
+
+    def limits(self, stats, threshold):
+        spread = threshold * stats["std"]
+        return stats["mean"] - spread, stats["mean"] + spread
+
+
+class RobustZScoreDetector(OutlierDetector):
+    """z-score robusto: centro en la mediana y escala IQR / 1.349 (no depende de la MAD)"""
+
+    name = "robust_zscore"
+    label = "Robust Z-score"
+    statistics = ("median", "q1", "q3")
+    default_threshold = 3.0
+
+    def limits(self, stats, threshold):
+        # IQR 0: misma situación que la MAD nula, la columna no se analiza
+        if stats["q3"] == stats["q1"]:
+            return None, None
+        spread = threshold * (stats["q3"] - stats["q1"]) / IQR_SCALE
+        return stats["median"] - spread, stats["median"] + spread
+
+
+class IsolationForestDetector(OutlierDetector):
+    """
+    Isolation Forest multivariado: se entrena con una muestra de filas y puntúa
+    todas las filas por bloques. Los nulos se completan con la mediana (del
+    mismo pase de estadísticas). El umbral es la contaminación esperada
+    (0 = "auto", el criterio del artículo original).
+    """
+
+    name = "isolation_forest"
+    label = "Isolation Forest"
+    statistics = ("median",)
+    default_threshold = 0.0
+    multivariate = True
+
+    def __init__(self, sample_size: int = ISOLATION_FOREST_SAMPLE_SIZE,
+                 batch_rows: int = ISOLATION_FOREST_BATCH_ROWS, seed: int = 42):
+        self.sample_size = sample_size
+        self.batch_rows = batch_rows
+        self.seed = seed
+
+    def limits(self, stats, threshold):
+        # Multivariado: marca filas con `row_mask`, no tiene límites por columna
+        return None, None
+
+    def check_threshold(self, threshold):
+        # sklearn solo acepta contaminación en (0, 0.5]
+        if threshold != 0 and not 0 < threshold <= 0.5:
+            raise ValueError(
+                f"La contaminación de {self.label} debe estar en (0, 0.5] o ser 0 (auto); se recibió {threshold}"
+            )
+
+    def row_mask(self, df: pl.DataFrame, cols: List[str], stats, threshold: float) -> np.ndarray:
+        """Máscara booleana de filas outlier"""
+        from sklearn.ensemble import IsolationForest
+
+        n_rows = len(df)
+        mask = np.zeros(n_rows, dtype=bool)
+        usable = [col for col in cols if stats[col].get("median") is not None]
+        if n_rows == 0 or not usable:
+            return mask
+        filled = df.select([
+            pl.col(col).cast(pl.Float64).fill_nan(None).fill_null(stats[col]["median"]) for col in usable
+        ])
+
+        sample = filled[reservoir_sample_indices(n_rows, self.sample_size, seed=self.seed)].to_numpy()
+        forest = IsolationForest(
+            n_estimators=100,
+            contamination=threshold if threshold > 0 else "auto",
+            random_state=self.seed,
+        ).fit(sample)
+
+        for start in range(0, n_rows, self.batch_rows):
+            batch = filled.slice(start, self.batch_rows).to_numpy()
+            mask[start:start + len(batch)] = forest.predict(batch) == -1
+        return mask
+
+
+# Detectores disponibles para /outliers-analysis
+DETECTORS: Dict[str, OutlierDetector] = {
+    detector.name: detector
+    for detector in (IQRDetector(), MADDetector(), ZScoreDetector(), RobustZScoreDetector(), IsolationForestDetector())
+}
+
+
+def iqr_bounds(df: pl.DataFrame, cols: List[str], k: float = 1.5) -> Bounds:
+    """
+    Límites IQR (Q1 - k*IQR, Q3 + k*IQR) de varias columnas en un solo `select`.
+
+    Args:
+        df: DataFrame de Polars
+        cols: Columnas numéricas
+        k: Factor K del método IQR
+
+    Returns:
+        dict: {columna: (límite inferior, límite superior)}; (None, None) si la
+        columna no tiene valores
+    """
+    detector = DETECTORS["iqr"]
+    return detector.bounds(column_statistics(df, cols, detector.statistics), k)
+
+
+def _outlier_mask(col: str, lower: Optional[float], upper: Optional[float]) -> pl.Expr:
+    """Expresión booleana: el valor está fuera de [lower, upper] (nulos -> null)"""
+    if lower is None:
+        return pl.lit(False)
+    return (pl.col(col) < lower) | (pl.col(col) > upper)
+
+
+def count_outliers(df, bounds: Bounds) -> Dict[str, int]:
+    """Cantidad de outliers de cada columna (DataFrame o LazyFrame), todas en un solo `select`"""
+    if not bounds:
+        return {}
+    counts = _select_row(df, [
+        _outlier_mask(col, lower, upper).sum().alias(col) for col, (lower, upper) in bounds.items()
+    ])
+    return {col: int(count or 0) for col, count in zip(bounds, counts)}
+
+
+def null_outliers(df: pl.DataFrame, bounds: Bounds) -> Tuple[pl.DataFrame, Dict[str, int]]:
+    """
+    Reemplaza los outliers de todas las columnas por null con un solo
+    `with_columns`. Los conteos salen de la misma pasada: los nulos nuevos de
+    cada columna (`null_count` no recorre los datos).
+
+    Returns:
+        tuple: (DataFrame limpio, {columna: outliers reemplazados})
+    """
+    if not bounds:
+        return df, {}
+    cleaned = df.with_columns([
+        pl.when((pl.col(col) >= lower) & (pl.col(col) <= upper)).then(pl.col(col)).otherwise(None).alias(col)
+        for col, (lower, upper) in bounds.items() if lower is not None
+    ])
+    return cleaned, _new_nulls(df, cleaned, list(bounds))
+
+
+def _new_nulls(before: pl.DataFrame, after: pl.DataFrame, cols: List[str]) -> Dict[str, int]:
+    nulls_before = before.select(cols).null_count().row(0)
+    nulls_after = after.select(cols).null_count().row(0)
+    return {col: a - b for col, b, a in zip(cols, nulls_before, nulls_after)}
+
+
+def detect_outliers(df, cols: List[str], method: str = "iqr",
+                    threshold: Optional[float] = None, stats=None) -> dict:
+    """
+    Ejecuta un detector de `DETECTORS` y mide cuánto tarda cada etapa.
+
+    Args:
+        df: DataFrame de Polars (o LazyFrame, solo con detectores univariados)
+        cols: Columnas numéricas
+        method: Nombre del detector
+        threshold: Umbral del detector (None = el valor por defecto del detector)
+        stats: Estadísticas ya calculadas con `column_statistics` (se comparten
+            entre detectores); si faltan, se calculan aquí
+
+    Returns:
+        dict: method, threshold, bounds (univariados) o row_mask (multivariados),
+        counts por columna y timing en segundos
+    """
+    detector = DETECTORS[method]
+    if detector.multivariate and isinstance(df, pl.LazyFrame):
+        raise ValueError(f"El detector {detector.label} necesita los datos en memoria")
+    threshold = detector.default_threshold if threshold is None else threshold
+    detector.check_threshold(threshold)
+    timing = {"statistics_s": 0.0}
+
+    if stats is None or any(stat not in stats.get(col, {}) for col in cols for stat in detector.statistics):
+        start = time.perf_counter()
+        stats = column_statistics(df, cols, detector.statistics)
+        timing["statistics_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = {"method": method, "threshold": threshold, "bounds": None, "row_mask": None}
+    if detector.multivariate:
+        result["row_mask"] = detector.row_mask(df, cols, stats, threshold)
+        flagged = pl.Series(result["row_mask"])
+        # Outliers por columna: valores no nulos en las filas marcadas
+        counts = df.select([(pl.col(col).is_not_null() & flagged).sum().alias(col) for col in cols]).row(0)
+        result["counts"] = {col: int(count) for col, count in zip(cols, counts)}
+        result["outlier_rows"] = int(result["row_mask"].sum())
+    else:
+        result["bounds"] = detector.bounds(stats, threshold)
+        result["counts"] = count_outliers(df, result["bounds"])
+    timing["detection_s"] = time.perf_counter() - start
+    timing["total_s"] = timing["statistics_s"] + timing["detection_s"]
+    result["timing"] = {key: round(value, 4) for key, value in timing.items()}
+    return result
+
+
+def compare_detectors(df: pl.DataFrame, cols: List[str], methods: Optional[List[str]] = None,
+                      thresholds: Optional[Dict[str, float]] = None) -> Dict[str, dict]:
+    """
+    Ejecuta varios detectores sobre las mismas columnas compartiendo un solo
+    pase de estadísticas, para elegir el método más barato que sea adecuado.
+
+    Returns:
+        dict: {método: {threshold, total_outliers, timing}}; el tiempo del pase
+        de estadísticas compartido se informa aparte en "shared_statistics_s"
+    """
+    methods = methods or list(DETECTORS)
+    thresholds = thresholds or {}
+    start = time.perf_counter()
+    stats = column_statistics(df, cols, {stat for method in methods for stat in DETECTORS[method].statistics})
+    comparison = {"shared_statistics_s": round(time.perf_counter() - start, 4)}
+    for method in methods:
+        result = detect_outliers(df, cols, method, thresholds.get(method), stats=stats)
+        comparison[method] = {
+            "threshold": result["threshold"],
+            "total_outliers": sum(result["counts"].values()),
+            "timing": result["timing"],
+        }
+    return comparison
+
+
+def null_detected(df: pl.DataFrame, cols: List[str], detection: dict) -> Tuple[pl.DataFrame, Dict[str, int]]:
+    """
+    Reemplaza por null los outliers de un resultado de `detect_outliers`: fuera
+    de límites (univariados) o todas las columnas de las filas marcadas
+    (multivariados), con un solo `with_columns`.
+    """
+    if detection["bounds"] is not None:
+        return null_outliers(df, {col: detection["bounds"][col] for col in cols})
+    flagged = pl.Series(detection["row_mask"])
+    cleaned = df.with_columns([
+        pl.when(flagged).then(None).otherwise(pl.col(col)).alias(col) for col in cols
+    ])
+    return cleaned, _new_nulls(df, cleaned, cols)
+
+
+def outlier_summary(bounds: Optional[Bounds], counts: Dict[str, int], n_rows: int) -> Dict[str, dict]:
+    """Resumen por columna para la respuesta de /outliers-analysis"""
+    bounds = bounds or {}
+    summary = {}
+    for col, count in counts.items():
+        lower, upper = bounds.get(col, (None, None))
+        summary[col] = {
+            "lower_bound": float(lower) if lower is not None else None,
+            "upper_bound": float(upper) if upper is not None else None,
+            "outliers_count": count,
+            "outliers_percentage": round((count / n_rows) * 100, 2) if n_rows else 0.0,
+        }
+    return summary
@@ -0,0 +1,241 @@
+"""
+Plan de preprocesamiento para entrenar: a partir del dataset, las features y
+el label produce X, y y los parámetros ajustados (medianas y encoders) en una
+sola preparación, que todos los tipos de modelo reutilizan.
+"""
+import logging
+import numpy as np
+import polars as pl
+from typing import Any, Dict, List
+from sklearn.model_selection import train_test_split, StratifiedShuffleSplit
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils import resample
+
+from core.encoding import is_categorical, fit_category_encoder, fit_feature_encoder, fit_target_encoder, target_encode
+
+logger = logging.getLogger(__name__)
+
+# Un label entero con hasta estas clases se trata como clasificación
+CLASSIFICATION_MAX_CLASSES = 20
+
+# Datasets con más filas de entrenamiento se muestrean a este tamaño (el test queda completo)
+TRAINING_MAX_SAMPLES = 24000
+
+
+def _target_encodable(labels: pl.Series, categorical_label: bool) -> bool:
+    """
+    El label admite target encoding: regresión o clasificación binaria (en
+    multiclase la media de los códigos de clase no tiene sentido).
+    """
+    n_classes = labels.n_unique()
+    integer = str(labels.dtype).startswith(("Int", "UInt"))
+    return not (n_classes > 2 and (categorical_label or (integer and n_classes <= CLASSIFICATION_MAX_CLASSES)))
+
+
+def fit_target_columns(plan: Dict[str, Any], X_fit: np.ndarray, y_fit: np.ndarray,
+                       others: List[np.ndarray]) -> Dict[str, Dict[str, Any]]:
+    """
+    Ajusta el target encoding de las columnas del plan con las filas de
+    `X_fit`/`y_fit` (valores fuera de fold) y codifica `others` con la tabla de
+    esas filas. Reemplaza los buckets in place.
+
+    Returns:
+        dict: encoders del plan con los de target encoding ya ajustados
+    """
+    encoders = dict(plan["encoders"])
+    for col, index in plan["target_columns"].items():
+        values, encoders[col] = fit_target_encoder(X_fit[:, index], y_fit, plan["encoders"][col])
+        for X_other in others:
+            X_other[:, index] = target_encode(X_other[:, index], encoders[col])
+        X_fit[:, index] = values
+    return encoders
+
+
+def build_preprocessing_plan(df: pl.DataFrame, features: List[str], label: str,
+                             keep_frame: bool = False) -> Dict[str, Any]:
+    """
+    Prepara features y label en una sola pasada de Polars:
+    - descarta las filas con label nulo; las booleanas pasan a 0/1
+    - numéricas: nulos -> mediana (todas las medianas en una consulta; 0 si la
+      columna es toda nula)
+    - categóricas: strip + lowercase y nulos -> moda; códigos ordenados hasta
+      `ORDINAL_MAX_CATEGORIES` categorías y, por encima, target encoding fuera
+      de fold o feature hashing (`core.encoding.fit_feature_encoder`). El plan
+      no usa el label para codificar: las columnas de target encoding llevan el
+      bucket de cada fila ("target_columns") y se ajustan en `training_split`
+      solo con las filas de entrenamiento
+    - label categórico: códigos ordenados sin normalizar
+    Los reemplazos de una columna se aplican con un solo `with_columns`; las
+    features con hashing aportan varias columnas a X ("columns" y
+    "column_features" dicen de qué feature sale cada una).
+
+    Args:
+        df: DataFrame con al menos features + label
+        features: Columnas de entrada
+        label: Columna objetivo
+        keep_frame: Incluir el DataFrame preparado (X + label) en "data"
+
+    Returns:
+        dict: X, y, rows, columns, column_features, target_columns, encoders,
+        label_encoder, fill_values, splits (ver `training_split`; y data si keep_frame)
+    """
+    data = df.select(features + [label]).filter(pl.col(label).is_not_null())
+    if len(data) == 0:
+        raise ValueError(f"Todas las filas tienen null en la columna label '{label}'")
+
+    # Booleanas como 0/1 (to_numpy las dejaría como object)
+    booleans = [col for col in features + [label] if str(data.schema[col]) == "Boolean"]
+    if booleans:
+        data = data.with_columns([pl.col(col).cast(pl.Int8) for col in booleans])
+
+    schema = data.schema
+    numeric = [col for col in features if str(schema[col]).startswith(("Int", "UInt", "Float"))]
+    categorical = [col for col in features if is_categorical(schema[col])]
+
+    medians = data.select([pl.col(col).median() for col in numeric]).row(0) if numeric else ()
+    fill_values = {col: (value if value is not None else 0) for col, value in zip(numeric, medians)}
+
+    replacements = [pl.col(col).fill_null(value) for col, value in fill_values.items()]
+    label_encoder = None
+    if is_categorical(schema[label]):
+        codes, label_encoder = fit_category_encoder(data[label], normalize=False, fill_null=False)
+        replacements.append(codes)
+    if replacements:
+        data = data.with_columns(replacements)
+    y = data.get_column(label).to_numpy()
+
+    target_encodable = categorical and _target_encodable(df[label].drop_nulls(), label_encoder is not None)
+    encoders = {}
+    encoded = {}
+    for col in categorical:
+        encoded[col], encoders[col] = fit_feature_encoder(data[col], target_encodable=target_encodable)
+
+    # X en el orden de las features; una feature con hashing aporta varias columnas
+    frames = [encoded[col] if col in encoded else data.select(col) for col in features]
+    matrix = pl.concat(frames, how="horizontal")
+    column_features = [col for col, frame in zip(features, frames) for _ in frame.columns]
+    target_columns = {
+        col: matrix.columns.index(col) for col, encoder in encoders.items() if encoder["strategy"] == "target"
+    }
+
+    strategies = [encoder["strategy"] for encoder in encoders.values()]
+    logger.info(
+        f"Plan de preprocesamiento: {len(data):,} filas, {len(numeric)} numéricas, "
+        f"{len(categorical)} categóricas codificadas "
+        f"{ {name: strategies.count(name) for name in sorted(set(strategies))} }"
+    )
+    plan = {
+        "features": list(features),
+        "label": label,
+        # float64: el target encoding escribe sus medias sobre los buckets en X
+        "X": matrix.to_numpy().astype(np.float64),
+        "y": y,
+        "rows": len(data),
+        "columns": matrix.columns,
+        "column_features": column_features,
+        "target_columns": target_columns,
+        "encoders": encoders,
+        "label_encoder": label_encoder,
+        "fill_values": fill_values,
+        "splits": {},
+    }
+    if keep_frame:
+        plan["data"] = pl.concat([matrix, data.select(label)], how="horizontal")
+    return plan
+
+
+def feature_importance(column_features: List[str], importances) -> Dict[str, float]:
+    """Importancia por feature: suma la de todas sus columnas en X (p.ej. los buckets de hashing)"""
+    totals: Dict[str, float] = {}
+    for feature, importance in zip(column_features, importances):
+        totals[feature] = totals.get(feature, 0.0) + float(importance)
+    return totals
+
+
+def training_split(plan: Dict[str, Any], stratify: bool) -> Dict[str, Any]:
+    """
+    División train/test (80/20), target encoding, muestreo del entrenamiento y
+    escalado del plan. Se calcula una vez por plan y modo de estratificación y
+    se guarda en plan["splits"]: /prepare-data y cada /train sobre el mismo plan
+    cacheado reutilizan los mismos arrays.
+
+    El target encoding se ajusta con las filas de entrenamiento (fuera de fold)
+    y las de test se codifican con esa tabla: sus labels no intervienen.
+
+    Args:
+        plan: Resultado de `build_preprocessing_plan`
+        stratify: Estratificar por el label (modelos de clasificación)
+
+    Returns:
+        dict: X_train, X_test, y_train, y_test, X_train_scaled, X_test_scaled,
+        scaler, encoders (con el target encoding ajustado) y sampling_strategy
+        ("none", "stratified_sampling" o "random_sampling")
+    """
+    splits = plan.setdefault("splits", {})
+    if stratify in splits:
+        logger.info("División train/test reutilizada del plan de preprocesamiento")
+        return splits[stratify]
+
+    X, y = plan["X"], plan["y"]
+    sampling_strategy = "none"
+
+    def split_rows(**kwargs):
+        # Se dividen índices (la misma partición que con X, y) y las filas se copian
+        train_rows, test_rows = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, **kwargs)
+        X_train, X_test = X[train_rows], X[test_rows]
+        encoders = fit_target_columns(plan, X_train, y[train_rows], [X_test])
+        return X_train, X_test, y[train_rows], y[test_rows], encoders
+
+    # OPTIMIZATION: Intelligent stratified sampling for large datasets to prevent Azure timeouts
+    # This maintains scientific validity while reducing training time
+    if stratify and len(np.unique(y)) > 1:
+        # Standard train/test split with stratification
+        X_train, X_test, y_train, y_test, encoders = split_rows(stratify=y)
+
+        # OPTIMIZATION: Apply intelligent sampling for large datasets (>30,000 rows)
+        # Target: ~24,000 training samples (scientifically valid, prevents timeout)
+        if len(X_train) > TRAINING_MAX_SAMPLES:
+            sampling_strategy = "stratified_sampling"
+            logger.info(f"OPTIMIZATION: Large dataset detected ({len(X_train):,} training samples)")
+            logger.info(f"OPTIMIZATION: Applying stratified sampling to {TRAINING_MAX_SAMPLES:,} samples")
+            logger.info(f"OPTIMIZATION: This maintains scientific validity while preventing Azure timeouts")
+
+            # Use StratifiedShuffleSplit to maintain class distribution
+            sss = StratifiedShuffleSplit(n_splits=1, train_size=TRAINING_MAX_SAMPLES, random_state=42)
+            train_idx, _ = next(sss.split(X_train, y_train))
+            original_size = len(X_train)
+            X_train = X_train[train_idx]
+            y_train = y_train[train_idx]
+
+            logger.info(f"OPTIMIZATION: Training set reduced from {original_size:,} to {len(X_train):,} samples")
+            logger.info(f"OPTIMIZATION: Test set kept at full size: {len(X_test):,} samples for proper validation")
+    else:
+        # Regression or single-class classification
+        X_train, X_test, y_train, y_test, encoders = split_rows()
+
+        # OPTIMIZATION: For regression with large datasets, use simple random sampling
+        if len(X_train) > TRAINING_MAX_SAMPLES:
+            sampling_strategy = "random_sampling"
+            logger.info(f"OPTIMIZATION: Large dataset detected ({len(X_train):,} training samples)")
+            logger.info(f"OPTIMIZATION: Applying random sampling to {TRAINING_MAX_SAMPLES:,} samples")
+
+            X_train, y_train = resample(X_train, y_train, n_samples=TRAINING_MAX_SAMPLES,
+                                        random_state=42, replace=False)
+
+            logger.info(f"OPTIMIZATION: Training set sampled to {len(X_train):,} samples")
+            logger.info(f"OPTIMIZATION: Test set kept at full size: {len(X_test):,} samples for proper validation")
+
+    # Escalamiento de features
+    scaler = StandardScaler()
+    splits[stratify] = {
+        "X_train": X_train,
+        "X_test": X_test,
+        "y_train": y_train,
+        "y_test": y_test,
+        "X_train_scaled": scaler.fit_transform(X_train),
+        "X_test_scaled": scaler.transform(X_test),
+        "scaler": scaler,
+        "encoders": encoders,
+        "sampling_strategy": sampling_strategy,
+    }
+    return splits[stratify]
@@ -0,0 +1,422 @@
+"""
+Perfilado vectorizado de columnas para el resumen del dataset
+"""
+import os
+import zlib
+import logging
+import threading
+import numpy as np
+import polars as pl
+from concurrent.futures import ThreadPoolExecutor, wait
+from scipy import stats
+from typing import List, Dict, Any, Optional, Tuple
+
+from core.sketches import HyperLogLog, KLLSketch, StreamingHistogram, StreamingMoments
+
+logger = logging.getLogger(__name__)
+
+# Cuantiles reportados en el resumen de columnas numéricas
+NUMERIC_QUANTILES = {"25%": 0.25, "50%": 0.50, "75%": 0.75}
+
+# Multiplicador del IQR para la detección de outliers
+IQR_MULTIPLIER = 1.5
+
+# Test de normalidad: tamaño máximo de la muestra por columna y semilla base
+NORMALITY_SAMPLE_SIZE = 5000
+NORMALITY_SEED = 42
+
+# Perfilado aproximado: filas por bloque y parámetros de los sketches
+SKETCH_CHUNK_ROWS = 1_000_000
+KLL_K = 200
+HLL_PRECISION = 14
+
+
+def _numeric_exprs(col: str, prefix: str, quantiles: bool = True) -> List[pl.Expr]:
+    """Expresiones de estadísticas descriptivas de una columna numérica"""
+    c = pl.col(col)
+    exprs = [
+        c.mean().alias(f"{prefix}mean"),
+        c.std().alias(f"{prefix}std"),
+        c.min().cast(pl.Float64).alias(f"{prefix}min"),
+        c.max().cast(pl.Float64).alias(f"{prefix}max"),
+    ]
+    if quantiles:
+        exprs += [c.quantile(q).alias(f"{prefix}{name}") for name, q in NUMERIC_QUANTILES.items()]
+    return exprs
+
+
+def _collect_row(frame, exprs: List[pl.Expr]) -> Dict[str, Any]:
+    """Una fila de agregados; un LazyFrame se escanea en modo streaming"""
+    result = frame.select(exprs)
+    if isinstance(result, pl.LazyFrame):
+        result = result.collect(streaming=True)
+    return result.row(0, named=True)
+
+
+def profile_columns(frame, columns: List[str], numeric_columns: List[str],
+                    iqr_k: float = IQR_MULTIPLIER) -> Dict[str, Dict[str, Any]]:
+    """
+    Perfila varias columnas con consultas vectorizadas de Polars en lugar de
+    recorrerlas una a una. Funciona igual sobre DataFrame y LazyFrame.
+
+    - Una consulta calcula los valores únicos de todas las columnas y la media,
+      std, min, max y cuartiles de las numéricas.
+    - Con los cuartiles se derivan los límites IQR y una segunda consulta cuenta
+      los outliers de todas las columnas numéricas (los cuantiles son lo caro,
+      así no se recalculan).
+
+    Args:
+        frame: DataFrame o LazyFrame de Polars
+        columns: Columnas a perfilar
+        numeric_columns: Subconjunto de `columns` con tipo numérico
+        iqr_k: Multiplicador del IQR para los límites de outliers
+
+    Returns:
+        dict: {columna: {"n_unique": ..., "mean": ..., "outliers_count": ...}}
+    """
+    if not columns:
+        return {}
+    numeric = set(numeric_columns)
+
+    # Alias por posición para no depender de los nombres de columna
+    exprs = []
+    for i, col in enumerate(columns):
+        prefix = f"{i}|"
+        exprs.append(pl.col(col).n_unique().alias(f"{prefix}n_unique"))
+        if col in numeric:
+            exprs.extend(_numeric_exprs(col, prefix))
+
+    profiles = {col: {} for col in columns}
+    for alias, value in _collect_row(frame, exprs).items():
+        index, stat = alias.split("|", 1)
+        profiles[columns[int(index)]][stat] = value
+
+    _count_outliers(frame, columns, numeric, profiles, iqr_k)
+    return profiles
+
+
+def _outlier_exprs(columns: List[str], numeric: set, profiles: Dict[str, Dict[str, Any]], iqr_k: float) -> List[pl.Expr]:
+    """Deriva los límites IQR de los cuartiles y arma las expresiones que cuentan outliers"""
+    outlier_exprs = []
+    for i, col in enumerate(columns):
+        profile = profiles[col]
+        if col not in numeric or profile.get("25%") is None:
+            continue
+        iqr = profile["75%"] - profile["25%"]
+        profile["lower_bound"] = profile["25%"] - iqr_k * iqr
+        profile["upper_bound"] = profile["75%"] + iqr_k * iqr
+        outlier_exprs.append(
+            ((pl.col(col) < profile["lower_bound"]) | (pl.col(col) > profile["upper_bound"]))
+            .sum()
+            .alias(str(i))
+        )
+    return outlier_exprs
+
+
+def _count_outliers(frame, columns: List[str], numeric: set, profiles: Dict[str, Dict[str, Any]], iqr_k: float):
+    """Cuenta los outliers de todas las columnas numéricas en una sola consulta"""
+    outlier_exprs = _outlier_exprs(columns, numeric, profiles, iqr_k)
+    if outlier_exprs:
+        for alias, value in _collect_row(frame, outlier_exprs).items():
+            profiles[columns[int(alias)]]["outliers_count"] = value
+
+
+def _for_each_chunk(frame, chunk_rows: int, consume):
+    """
+    Llama a `consume` con cada bloque de a lo sumo `chunk_rows` filas. Un
+    LazyFrame se lee con el motor de streaming (`map_batches`) y cada lote se
+    descarta después de procesarlo, así el archivo nunca se materializa entero;
+    los lotes pueden llegar desde varios hilos, por eso se serializan.
+    """
+    if not isinstance(frame, pl.LazyFrame):
+        for chunk in frame.iter_slices(chunk_rows):
+            consume(chunk)
+        return
+
+    lock = threading.Lock()
+
+    def consume_batch(batch: pl.DataFrame) -> pl.DataFrame:
+        with lock:
+            for chunk in batch.iter_slices(chunk_rows):
+                consume(chunk)
+        return batch.clear()
+
+    frame.map_batches(consume_batch, schema=frame.schema, streamable=True).collect(streaming=True)
+
+
+def count_rows_and_nulls(frame, chunk_rows: int = SKETCH_CHUNK_ROWS) -> Tuple[int, Dict[str, int]]:
+    """
+    Filas totales y nulos por columna sumados bloque a bloque (con un LazyFrame,
+    en streaming: una consulta de `null_count` materializa las columnas).
+
+    Returns:
+        tuple: (filas, {columna: nulos})
+    """
+    total_rows = 0
+    null_counts = dict.fromkeys(frame.columns, 0)
+
+    def count(chunk: pl.DataFrame):
+        nonlocal total_rows
+        total_rows += chunk.height
+        for col, value in chunk.null_count().row(0, named=True).items():
+            null_counts[col] += value
+
+    _for_each_chunk(frame, chunk_rows, count)
+    return total_rows, null_counts
+
+
+def approximate_profile_columns(frame, columns: List[str], numeric_columns: List[str],
+                                iqr_k: float = IQR_MULTIPLIER,
+                                chunk_rows: int = SKETCH_CHUNK_ROWS) -> Dict[str, Dict[str, Any]]:
+    """
+    Variante de `profile_columns` para datasets muy grandes: los valores únicos,
+    los cuartiles y el histograma salen de sketches que se alimentan bloque a
+    bloque de `chunk_rows` filas y se combinan (HyperLogLog, KLL e histograma de
+    bins fijos). Media, std, min, max y el conteo de outliers (dados los límites)
+    siguen siendo exactos: se acumulan por bloque y se combinan.
+
+    Son dos lecturas por bloques: la primera alimenta los conteos, los momentos
+    y los sketches; la segunda, el histograma (necesita min y max) y el conteo
+    de outliers (necesita los cuartiles). Con un LazyFrame cada lectura usa el
+    motor de streaming, así la memoria queda acotada por el tamaño de los
+    bloques y no por el del archivo.
+
+    Cada perfil incluye "histogram" y "error_bounds" con el error de los sketches.
+
+    Args:
+        frame: DataFrame o LazyFrame de Polars
+        columns: Columnas a perfilar
+        numeric_columns: Subconjunto de `columns` con tipo numérico
+        iqr_k: Multiplicador del IQR para los límites de outliers
+        chunk_rows: Filas máximas por bloque
+
+    Returns:
+        dict: {columna: {"n_unique": ..., "25%": ..., "histogram": ..., "error_bounds": ...}}
+    """
+    if not columns:
+        return {}
+    numeric = set(numeric_columns)
+    selected = frame.select(columns)
+
+    hlls = {col: HyperLogLog(HLL_PRECISION) for col in columns}
+    klls = {col: KLLSketch(KLL_K) for col in columns if col in numeric}
+    moments = {col: StreamingMoments() for col in klls}
+    null_counts = dict.fromkeys(columns, 0)
+    total_rows = 0
+    n_chunks = 0
+
+    def first_pass(chunk: pl.DataFrame):
+        nonlocal total_rows, n_chunks
+        total_rows += chunk.height
+        n_chunks += 1
+        for col in columns:
+            series = chunk[col]
+            null_counts[col] += series.null_count()
+            hlls[col].update(series)
+            if col in klls:
+                values = series.drop_nulls().to_numpy()
+                klls[col].update(values)
+                moments[col].update(values)
+
+    _for_each_chunk(selected, chunk_rows, first_pass)
+
+    profiles = {col: {"null_count": null_counts[col]} for col in columns}
+    histograms = {}
+    for col in klls:
+        profile = profiles[col]
+        profile.update(moments[col].stats())
+        for name, q in NUMERIC_QUANTILES.items():
+            profile[name] = klls[col].quantile(q)
+        non_null = total_rows - profile["null_count"]
+        if non_null > 0 and np.isfinite([profile["min"], profile["max"]]).all():
+            histograms[col] = StreamingHistogram(profile["min"], profile["max"], sturges_bins(non_null))
+
+    outlier_exprs = _outlier_exprs(columns, numeric, profiles, iqr_k)
+    outlier_counts = {}
+
+    def second_pass(chunk: pl.DataFrame):
+        for col, histogram in histograms.items():
+            histogram.update(chunk[col].drop_nulls().to_numpy())
+        if outlier_exprs:
+            for alias, value in chunk.select(outlier_exprs).row(0, named=True).items():
+                outlier_counts[alias] = outlier_counts.get(alias, 0) + (value or 0)
+
+    if histograms or outlier_exprs:
+        _for_each_chunk(selected, chunk_rows, second_pass)
+    for alias, value in outlier_counts.items():
+        profiles[columns[int(alias)]]["outliers_count"] = value
+
+    for col in columns:
+        profile = profiles[col]
+        # Polars cuenta el nulo como un valor distinto más
+        profile["n_unique"] = int(round(hlls[col].estimate())) + (1 if profile["null_count"] > 0 else 0)
+        error_bounds = {
+            "unique_values_relative_error": round(hlls[col].relative_error, 4),
+            "chunks": n_chunks,
+        }
+        if col in klls:
+            error_bounds["quantile_rank_error"] = round(klls[col].rank_error, 4)
+        if col in histograms:
+            histogram = histograms[col]
+            profile["histogram"] = {
+                "n_bins": len(histogram.counts),
+                "bin_edges": [float(x) for x in histogram.bin_edges],
+                "frequencies": [int(x) for x in histogram.counts],
+                "bin_width": float(histogram.bin_edges[1] - histogram.bin_edges[0]),
+            }
+        profile["error_bounds"] = error_bounds
+
+    return profiles
+
+
+def _as_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def numeric_stats(profile: Dict[str, Any], non_null_count: int) -> Dict[str, Optional[float]]:
+    """Estadísticas descriptivas de una columna numérica a partir de su perfil"""
+    if non_null_count == 0:
+        return {}
+    return {
+        "mean": _as_float(profile.get("mean")),
+        "std": _as_float(profile.get("std")) if non_null_count > 1 else None,
+        "min": _as_float(profile.get("min")),
+        "max": _as_float(profile.get("max")),
+        **{name: _as_float(profile.get(name)) for name in NUMERIC_QUANTILES},
+    }
+
+
+def outliers_detection(profile: Dict[str, Any], non_null_count: int, total_rows: int) -> Optional[Dict[str, Any]]:
+    """Resultado de la detección de outliers por IQR a partir del perfil"""
+    if non_null_count == 0:
+        return None
+    outliers_count = int(profile.get("outliers_count") or 0)
+    return {
+        "method": "IQR",
+        "lower_bound": _as_float(profile.get("lower_bound")),
+        "upper_bound": _as_float(profile.get("upper_bound")),
+        "outliers_count": outliers_count,
+        "outliers_percentage": round((outliers_count / total_rows) * 100, 2) if total_rows > 0 else 0,
+        "has_outliers": outliers_count > 0,
+    }
+
+
+def normality_test(values: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Test de normalidad (Shapiro-Wilk para n <= 5000, Anderson-Darling para n > 5000).
+
+    Args:
+        values: Valores no nulos de la columna
+
+    Returns:
+        dict con el resultado, o None si no hay datos suficientes
+    """
+    if len(values) <= 3:  # Mínimo requerido para test
+        return None
+    if len(values) <= 5000:
+        statistic, p_value = stats.shapiro(values)
+        test_name = "Shapiro-Wilk"
+    else:
+        result = stats.anderson(values)
+        statistic = result.statistic
+        # Para Anderson, usamos el nivel de significancia del 5% (índice 2)
+        p_value = 0.05 if statistic < result.critical_values[2] else 0.01
+        test_name = "Anderson-Darling"
+
+    is_normal = p_value > 0.05
+    return {
+        "test_name": test_name,
+        "statistic": float(statistic),
+        "p_value": float(p_value) if isinstance(p_value, (int, float)) else 0.05,
+        "is_normal": bool(is_normal),
+        "interpretation": "Distribución normal" if is_normal else "Distribución no normal",
+        "alpha": 0.05
+    }
+
+
+def normality_sample(series: pl.Series, max_size: int = NORMALITY_SAMPLE_SIZE,
+                     seed: int = NORMALITY_SEED) -> np.ndarray:
+    """
+    Muestra reproducible de los valores no nulos de una columna para el test de
+    normalidad. La semilla se deriva de `seed` y del nombre de la columna, así
+    cada columna recibe siempre la misma muestra.
+
+    Args:
+        series: Columna numérica
+        max_size: Tamaño máximo de la muestra
+        seed: Semilla base
+
+    Returns:
+        np.ndarray con a lo sumo `max_size` valores
+    """
+    values = series.drop_nulls()
+    if len(values) > max_size:
+        column_seed = (seed + zlib.crc32(str(series.name).encode("utf-8"))) % 2 ** 32
+        values = values.sample(n=max_size, seed=column_seed)
+    return values.to_numpy()
+
+
+def run_normality_tests(samples: Dict[str, np.ndarray], time_budget_s: Optional[float] = None,
+                        max_workers: Optional[int] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Ejecuta `normality_test` sobre varias columnas en un pool de hilos.
+    Las columnas que no terminan dentro de `time_budget_s` se descartan.
+
+    Args:
+        samples: {columna: muestra de valores}
+        time_budget_s: Tiempo máximo total en segundos (None = sin límite)
+        max_workers: Hilos del pool (por defecto, uno por CPU)
+
+    Returns:
+        tuple: ({columna: resultado o None si falló}, columnas fuera de tiempo)
+    """
+    if not samples:
+        return {}, []
+
+    workers = max_workers or min(len(samples), os.cpu_count() or 1)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {executor.submit(normality_test, values): col for col, values in samples.items()}
+    done, pending = wait(futures, timeout=time_budget_s)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            logger.warning(f"Error en test de normalidad para {futures[future]}: {e}")
+            results[futures[future]] = None
+
+    timed_out = [col for col in samples if col not in results]
+    if timed_out:
+        logger.warning(f"Test de normalidad fuera de tiempo para {len(timed_out)} columnas")
+    return results, timed_out
+
+
+def sturges_bins(n: int) -> int:
+    """Número de bins por regla de Sturges, acotado entre 5 y 50"""
+    n_bins = int(np.ceil(np.log2(n) + 1))
+    return min(max(n_bins, 5), 50)
+
+
+def histogram_data(values: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Histograma con bins por regla de Sturges (entre 5 y 50 bins).
+
+    Args:
+        values: Valores no nulos de la columna
+
+    Returns:
+        dict con bins y frecuencias, o None si la columna está vacía
+    """
+    if len(values) == 0:
+        return None
+    n_bins = sturges_bins(len(values))
+
+    hist, bin_edges = np.histogram(values, bins=n_bins)
+    return {
+        "n_bins": n_bins,
+        "bin_edges": [float(x) for x in bin_edges],
+        "frequencies": [int(x) for x in hist],
+        "bin_width": float(bin_edges[1] - bin_edges[0]) if len(bin_edges) > 1 else 0
+    }
@@ -0,0 +1,253 @@
+"""
+Sketches mergeables para perfilar datasets muy grandes por bloques de filas:
+HyperLogLog (valores distintos), KLL (cuantiles), histograma de bins fijos y
+momentos exactos (media, std, min y max)
+"""
+import numpy as np
+import polars as pl
+from typing import Optional
+
+# Semilla del hash de Polars usada por HyperLogLog; debe ser la misma en todos
+# los bloques para que los sketches se puedan combinar
+HLL_HASH_SEED = 0
+
+
+def _leading_zeros(x: np.ndarray) -> np.ndarray:
+    """
+    Cuenta los ceros a la izquierda de enteros uint64. Cada mitad de 32 bits es
+    exacta en float64, y frexp da su longitud en bits sin redondeos de log2.
+    """
+    high = np.frexp((x >> np.uint64(32)).astype(np.float64))[1]
+    low = np.frexp((x & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+    return np.where(high > 0, 32 - high, 64 - low).astype(np.uint8)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """
+    Finalizador de splitmix64: el hash de Polars para enteros no distribuye bien
+    los bits altos, que HyperLogLog usa para elegir el registro
+    """
+    x = x.astype(np.uint64, copy=True)
+    with np.errstate(over="ignore"):
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return x
+
+
+class HyperLogLog:
+    """
+    Estimador de cardinalidad HyperLogLog sobre hashes de 64 bits.
+
+    Con precisión p usa 2^p registros de un byte y el error relativo estándar
+    es 1.04 / sqrt(2^p) (~0.8% con p=14).
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("La precisión de HyperLogLog debe estar entre 4 y 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, series: pl.Series):
+        """Agrega los valores no nulos de una Series de Polars"""
+        series = series.drop_nulls()
+        if len(series) > 0:
+            self.update_hashes(series.hash(seed=HLL_HASH_SEED).to_numpy())
+
+    def update_hashes(self, hashes: np.ndarray):
+        """Agrega hashes uint64 ya calculados"""
+        hashes = _mix64(hashes)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes << np.uint64(self.precision)
+        rank = np.minimum(_leading_zeros(remainder), 64 - self.precision) + 1
+
+        # Máximo por registro: rangos de menor a mayor, cada paso conserva
+        # solo los hashes con rango superior (la mitad, en promedio)
+        r = 1
+        while len(index) > 0:
+            present = np.bincount(index, minlength=self.m) > 0
+            self.registers[present] = np.maximum(self.registers[present], r)
+            keep = rank > r
+            index, rank = index[keep], rank[keep]
+            r += 1
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Combina otro sketch con la misma precisión"""
+        if other.precision != self.precision:
+            raise ValueError("Solo se pueden combinar sketches HyperLogLog con la misma precisión")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        """Cardinalidad estimada"""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Corrección para cardinalidades pequeñas (linear counting)
+        if raw <= 2.5 * self.m and zeros > 0:
+            return float(self.m * np.log(self.m / zeros))
+        return float(raw)
+
+    @property
+    def relative_error(self) -> float:
+        """Error relativo estándar del estimador"""
+        return 1.04 / np.sqrt(self.m)
+
+
+class KLLSketch:
+    """
+    Sketch de cuantiles KLL: una pila de compactadores donde el nivel h guarda
+    elementos con peso 2^h. Cuando un nivel supera su capacidad se ordena y se
+    promueve la mitad de sus elementos (pares o impares, al azar) al siguiente.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = 0):
+        if k < 8:
+            raise ValueError("El parámetro k de KLL debe ser al menos 8")
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values: np.ndarray):
+        """Agrega valores numéricos (se ignoran NaN)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Combina otro sketch nivel a nivel"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        while True:
+            level = next(
+                (h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)),
+                None,
+            )
+            if level is None:
+                return
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # Con una cantidad impar, el último elemento se queda en el nivel
+            leftover = items[len(items) - len(items) % 2:]
+            items = items[:len(items) - len(items) % 2]
+            offset = int(self._rng.integers(2))
+            self.levels[level] = leftover
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Cuantil aproximado q (0 <= q <= 1)"""
+        if self.n == 0:
+            return None
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(items), 2 ** level, dtype=np.int64) for level, items in enumerate(self.levels)
+        ])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(values[order][min(position, len(values) - 1)])
+
+    @property
+    def rank_error(self) -> float:
+        """
+        Error normalizado de rango (99% de confianza) para un cuantil individual,
+        según la aproximación empírica de Apache DataSketches para KLL.
+        """
+        return 2.296 / self.k ** 0.9723
+
+
+class StreamingHistogram:
+    """Histograma de bins fijos sobre un rango conocido; los conteos son exactos y sumables"""
+
+    def __init__(self, lower: float, upper: float, n_bins: int):
+        if lower == upper:
+            # Mismo criterio que np.histogram con un rango degenerado
+            lower, upper = lower - 0.5, upper + 0.5
+        self.bin_edges = np.linspace(lower, upper, n_bins + 1)
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+
+    def update(self, values: np.ndarray):
+        """Agrega valores (se ignoran los no finitos)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) > 0:
+            counts, _ = np.histogram(values, bins=self.bin_edges)
+            self.counts += counts
+
+    def merge(self, other: "StreamingHistogram") -> "StreamingHistogram":
+        """Suma los conteos de otro histograma con los mismos bins"""
+        if not np.array_equal(self.bin_edges, other.bin_edges):
+            raise ValueError("Solo se pueden combinar histogramas con los mismos bins")
+        self.counts += other.counts
+        return self
+
+
+class StreamingMoments:
+    """
+    Cantidad, media, std (ddof=1), min y max exactos por bloques: las medias y
+    la suma de cuadrados centrados se combinan con la fórmula de Chan et al.
+    Como Polars, min y max ignoran NaN y la media y la std lo propagan.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+    def update(self, values: np.ndarray):
+        """Agrega valores no nulos"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        self._combine(len(values), mean, m2, float(np.fmin.reduce(values)), float(np.fmax.reduce(values)))
+
+    def merge(self, other: "StreamingMoments") -> "StreamingMoments":
+        """Combina los momentos de otro bloque"""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def _combine(self, count: int, mean: float, m2: float, minimum: float, maximum: float):
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.min = float(np.fmin(self.min, minimum))
+        self.max = float(np.fmax(self.max, maximum))
+
+    def stats(self) -> dict:
+        """mean, std, min y max (None sin valores; std None con un solo valor)"""
+        if self.count == 0:
+            return {"mean": None, "std": None, "min": None, "max": None}
+        return {
+            "mean": self.mean,
+            "std": float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None,
+            "min": self.min,
+            "max": self.max,
+        }
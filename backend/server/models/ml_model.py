@@ -17,7 +17,7 @@ class PreviewData(BaseModel):
 
 
 class CorrelationData(BaseModel):
-    """Correlation analysis data"""
+    """Correlation analysis data (legacy or compact format)"""
     success: bool
     message: str
     methods: List[str]
@@ -25,9 +25,30 @@ class CorrelationData(BaseModel):
     variables: List[str]
     total_correlations: int
     samples_used: int
-    top_correlations: List[Dict[str, Any]]
-    all_correlations: List[Dict[str, Any]]
-    correlation_matrices: Dict[str, Any]
+    # Legacy: pair dicts; compact: [i, j, average_abs_correlation] triples
+    top_correlations: List[Any]
+
+    # Legacy format
+    all_correlations: Optional[List[Dict[str, Any]]] = None
+    correlation_matrices: Optional[Dict[str, Any]] = None
+
+    # Compact format: row-major matrices indexed by `variables`
+    format: Optional[str] = None
+    matrices: Optional[Dict[str, Dict[str, List[Optional[float]]]]] = None
+    pair_n: Optional[List[int]] = None
+    kendall_n: Optional[List[int]] = None
+    pairs: Optional[List[List[float]]] = None
+    pairs_total: Optional[int] = None
+    cursor: Optional[int] = None
+    next_cursor: Optional[int] = None
+    min_abs_corr: Optional[float] = None
+
+    null_handling: Optional[str] = None
+    kendall_sample_size: Optional[int] = None
+    kendall_sampled: Optional[bool] = None
+
+    # Categorical columns: Cramér's V, eta and mutual information (row-major matrices)
+    associations: Optional[Dict[str, Any]] = None
 
 
 class TrainingConfig(BaseModel):
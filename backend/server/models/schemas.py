@@ -36,7 +36,7 @@ class OutliersRequest(BaseModel):
     columns: Optional[List[str]] = Field(None, description="Columnas a analizar (None para todas las numéricas)")
     methods: List[str] = Field(
         default=["iqr"],
-        description="Métodos a usar: iqr, zscore, isolation_forest"
+        description="Métodos a usar: iqr, mad, zscore, robust_zscore, isolation_forest"
     )
     iqr_k: float = Field(default=1.5, description="Factor K para método IQR")
 
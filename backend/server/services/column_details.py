@@ -0,0 +1,79 @@
+"""
+Caché en memoria del detalle pesado por columna del resumen (normalidad,
+histograma y top de categorías), calculado en segundo plano tras el upload
+"""
+import threading
+from typing import Optional, Dict, Any
+
+
+class ColumnDetailsStore:
+    """
+    Guarda el detalle por columna del dataset activo. Cada dataset se identifica
+    con el token de `state_manager.dataset_token()`: al cambiar el dataset (nuevo
+    upload o limpieza) el token cambia y el detalle anterior deja de servirse.
+    """
+
+    PENDING = "pending"
+    COMPLETE = "complete"
+    FAILED = "failed"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._details: Dict[str, Dict[str, Any]] = {}
+        self._normality_sampling: Optional[Dict[str, Any]] = None
+        self._status = self.PENDING
+
+    def start(self, token: str):
+        """Inicia el detalle de un nuevo dataset (descarta el anterior)"""
+        with self._lock:
+            self._token = token
+            self._details = {}
+            self._normality_sampling = None
+            self._status = self.PENDING
+
+    def get(self, token: str, column: str) -> Optional[Dict[str, Any]]:
+        """Detalle de una columna, o None si no está calculado para ese dataset"""
+        with self._lock:
+            if token != self._token:
+                return None
+            return self._details.get(column)
+
+    def put(self, token: str, details: Dict[str, Dict[str, Any]]) -> bool:
+        """Guarda el detalle de algunas columnas; se ignora si el dataset ya cambió"""
+        with self._lock:
+            if token != self._token:
+                return False
+            self._details.update(details)
+            return True
+
+    def complete(self, token: str, details: Dict[str, Dict[str, Any]], normality_sampling: Optional[Dict[str, Any]] = None):
+        """Guarda el detalle de todas las columnas y marca el dataset como completo"""
+        with self._lock:
+            if token != self._token:
+                return
+            self._details.update(details)
+            self._normality_sampling = normality_sampling
+            self._status = self.COMPLETE
+
+    def fail(self, token: str):
+        """Marca el cálculo en segundo plano como fallido (el endpoint calcula bajo demanda)"""
+        with self._lock:
+            if token == self._token:
+                self._status = self.FAILED
+
+    def status(self, token: str) -> str:
+        """Estado del cálculo para el dataset indicado"""
+        with self._lock:
+            return self._status if token == self._token else self.PENDING
+
+    def snapshot(self, token: str) -> Optional[Dict[str, Any]]:
+        """Detalle completo (para persistirlo en la caché de datasets)"""
+        with self._lock:
+            if token != self._token or self._status != self.COMPLETE:
+                return None
+            return {"columns": dict(self._details), "normality_sampling": self._normality_sampling}
+
+
+# Instancia global del detalle por columna
+column_details = ColumnDetailsStore()
@@ -0,0 +1,58 @@
+"""
+Caché en memoria de resultados de correlaciones por dataset y conjunto de columnas
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+
+class CorrelationCache:
+    """
+    Guarda el resultado compacto de `analyze_correlations` junto con la versión
+    de cada columna (`state_manager.column_version`) con la que se calculó.
+
+    La clave combina la identidad del upload, las columnas numéricas y las
+    opciones de cálculo. Al consultar, si alguna columna cambió de versión el
+    llamador puede recalcular solo las filas y columnas de esas variables.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(identity: str, columns: List[str], options: Dict[str, Any]) -> str:
+        """Clave: upload + columnas (en el orden dado, que es el de las matrices) + opciones de cálculo"""
+        digest = hashlib.sha1("\x1f".join(columns).encode("utf-8")).hexdigest()
+        options_key = ",".join(f"{name}={options[name]}" for name in sorted(options))
+        return f"{identity}|{options_key}|{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            dict con "result" y "column_versions", o None si no hay entrada
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, result: Dict[str, Any], column_versions: Dict[str, int]):
+        """Guarda un resultado; descarta las entradas menos usadas si se supera el máximo"""
+        with self._lock:
+            self._entries[key] = {"result": result, "column_versions": dict(column_versions)}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Vacía la caché (p.ej. al reiniciar el estado)"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Instancia global de la caché de correlaciones
+correlation_cache = CorrelationCache()
@@ -0,0 +1,195 @@
+"""
+Caché en disco de datasets ya procesados, indexada por el hash del contenido subido
+"""
+import os
+import json
+import shutil
+import tempfile
+import threading
+import logging
+import polars as pl
+from typing import Optional, Dict, Any
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetCache:
+    """
+    Caché LRU en disco para evitar re-parsear y re-perfilar archivos repetidos.
+
+    Cada entrada es un directorio con:
+    - data.arrow: el DataFrame parseado en Arrow IPC sin comprimir (se lee con mmap)
+    - meta.json: metadata del upload (formato, encoding, separador, shape)
+    - <nombre>.json: resultados derivados (summary, correlations, ...)
+
+    La fecha de modificación de meta.json marca el último acceso; cuando el
+    total supera el presupuesto se eliminan las entradas menos usadas.
+    """
+
+    FRAME_FILE = "data.arrow"
+    META_FILE = "meta.json"
+
+    def __init__(self, cache_dir: str, max_mb: int, enabled: bool = True):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "nebula_dataset_cache")
+        self.max_bytes = max_mb * 1024 * 1024
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content_hash: str, file_format: str) -> str:
+        """Clave de la entrada: hash del contenido + formato de lectura"""
+        return f"{content_hash}-{file_format}"
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def frame_path(self, key: str) -> str:
+        """Ruta del Arrow IPC de una entrada"""
+        return os.path.join(self._entry_dir(key), self.FRAME_FILE)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca una entrada completa (frame + metadata). Marca el acceso para el LRU.
+
+        Returns:
+            dict con la metadata y "frame_path", o None si no existe
+        """
+        if not self.enabled or not key:
+            return None
+
+        meta_path = os.path.join(self._entry_dir(key), self.META_FILE)
+        frame_path = self.frame_path(key)
+        with self._lock:
+            if not (os.path.exists(meta_path) and os.path.exists(frame_path)):
+                return None
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                os.utime(meta_path, None)
+            except (OSError, ValueError):
+                return None
+
+        meta["frame_path"] = frame_path
+        return meta
+
+    def checkout_frame(self, key: str) -> Optional[str]:
+        """
+        Crea un archivo temporal propio con el frame de una entrada (hard link,
+        o copia si no es posible) para que la eviction no afecte a quien lo usa.
+        """
+        frame_path = self.frame_path(key)
+        fd, path = tempfile.mkstemp(prefix="nebula_cached_", suffix=".arrow")
+        os.close(fd)
+        os.remove(path)
+        try:
+            os.link(frame_path, path)
+        except OSError:
+            try:
+                shutil.copyfile(frame_path, path)
+            except OSError:
+                return None
+        return path
+
+    def store_frame(self, key: str, frame, meta: Dict[str, Any]) -> bool:
+        """
+        Guarda el DataFrame (o LazyFrame, en streaming con sink_ipc) y su metadata.
+        La escritura es atómica: se escribe a un temporal y luego se renombra.
+        """
+        if not self.enabled or not key:
+            return False
+
+        entry_dir = self._entry_dir(key)
+        frame_path = self.frame_path(key)
+        tmp_path = frame_path + ".tmp"
+        try:
+            os.makedirs(entry_dir, exist_ok=True)
+            if isinstance(frame, pl.LazyFrame):
+                frame.sink_ipc(tmp_path, compression=None)
+            else:
+                frame.write_ipc(tmp_path, compression="uncompressed")
+            os.replace(tmp_path, frame_path)
+            self._write_json(entry_dir, self.META_FILE, meta)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el dataset en caché: {e}")
+            self._remove_entry(key)
+            return False
+
+        self.evict()
+        return True
+
+    def get_result(self, key: str, name: str) -> Optional[Any]:
+        """Obtiene un resultado derivado (p.ej. "summary") de una entrada"""
+        if not self.enabled or not key:
+            return None
+        path = os.path.join(self._entry_dir(key), f"{name}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store_result(self, key: str, name: str, value: Any):
+        """Guarda un resultado derivado en una entrada existente"""
+        if not self.enabled or not key:
+            return
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return
+        try:
+            self._write_json(entry_dir, f"{name}.json", value)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar '{name}' en caché: {e}")
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta respetar el presupuesto de disco"""
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                names = os.listdir(self.cache_dir)
+            except OSError:
+                return
+            for name in names:
+                entry_dir = os.path.join(self.cache_dir, name)
+                if not os.path.isdir(entry_dir):
+                    continue
+                size = 0
+                for file_name in os.listdir(entry_dir):
+                    try:
+                        size += os.path.getsize(os.path.join(entry_dir, file_name))
+                    except OSError:
+                        pass
+                try:
+                    last_access = os.path.getmtime(os.path.join(entry_dir, self.META_FILE))
+                except OSError:
+                    last_access = 0
+                entries.append((last_access, name, size))
+                total += size
+
+            entries.sort()
+            while total > self.max_bytes and entries:
+                _, name, size = entries.pop(0)
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+                total -= size
+                logger.info(f"Caché de datasets: entrada {name} eliminada (LRU)")
+
+    def _remove_entry(self, key: str):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    @staticmethod
+    def _write_json(entry_dir: str, file_name: str, value: Any):
+        path = os.path.join(entry_dir, file_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp_path, path)
+
+
+# Instancia global de la caché de datasets
+dataset_cache = DatasetCache(
+    cache_dir=settings.DATASET_CACHE_DIR,
+    max_mb=settings.DATASET_CACHE_MAX_MB,
+    enabled=settings.DATASET_CACHE_ENABLED,
+)
@@ -0,0 +1,145 @@
+"""
+Trabajos de limpieza e imputación en segundo plano: estado, progreso por
+iteración y cancelación, consultables desde /imputation-jobs/{job_id}
+"""
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+
+class ImputationJobStore:
+    """
+    Guarda los trabajos de imputación más recientes. Cada trabajo pertenece al
+    dataset identificado por `state_manager.dataset_token()` al crearlo; la
+    cancelación es cooperativa (el trabajo consulta `is_cancelled`).
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETE = "complete"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    ACTIVE = (PENDING, RUNNING)
+
+    def __init__(self, max_jobs: int = 20):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self.max_jobs = max_jobs
+
+    def create(self, token: str, method: str) -> str:
+        """Registra un trabajo pendiente y devuelve su id"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "token": token,
+                "status": self.PENDING,
+                "method": method,
+                "progress": {"iteration": 0, "max_iter": None, "changes": []},
+                "result": None,
+                "error": None,
+                "created_at": datetime.now().isoformat(),
+                "finished_at": None,
+            }
+            self._cancel_events[job_id] = threading.Event()
+            self._evict()
+        return job_id
+
+    def active_job(self, token: str) -> Optional[str]:
+        """Id del trabajo pendiente o en curso del dataset, si hay uno"""
+        with self._lock:
+            for job_id, job in self._jobs.items():
+                if job["token"] == token and job["status"] in self.ACTIVE:
+                    return job_id
+        return None
+
+    def start(self, job_id: str) -> bool:
+        """Marca el trabajo en curso; False si fue cancelado antes de empezar"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != self.PENDING:
+                return False
+            job["status"] = self.RUNNING
+            return True
+
+    def progress(self, job_id: str, iteration: int, max_iter: int, change: float):
+        """Registra el avance de una iteración y su cambio máximo"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["progress"]["iteration"] = iteration
+                job["progress"]["max_iter"] = max_iter
+                job["progress"]["changes"].append(change)
+
+    def cancel(self, job_id: str) -> bool:
+        """Pide cancelar el trabajo; False si no existe o ya terminó"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] not in self.ACTIVE:
+                return False
+            self._cancel_events[job_id].set()
+            if job["status"] == self.PENDING:
+                self._finish(job, self.CANCELLED)
+            return True
+
+    def is_cancelled(self, job_id: str) -> bool:
+        event = self._cancel_events.get(job_id)
+        return event is not None and event.is_set()
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["result"] = result
+                self._finish(job, self.COMPLETE)
+
+    def cancelled(self, job_id: str):
+        """Confirma que el trabajo se detuvo por una cancelación"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._finish(job, self.CANCELLED)
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["error"] = error
+                self._finish(job, self.FAILED)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Copia del estado del trabajo (None si no existe)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {key: value for key, value in job.items() if key != "token"}
+            snapshot["progress"] = {**job["progress"], "changes": list(job["progress"]["changes"])}
+            return snapshot
+
+    def clear(self):
+        """Cancela los trabajos activos y olvida todos"""
+        with self._lock:
+            for event in self._cancel_events.values():
+                event.set()
+            self._jobs.clear()
+            self._cancel_events.clear()
+
+    def _finish(self, job: Dict[str, Any], status: str):
+        job["status"] = status
+        job["finished_at"] = datetime.now().isoformat()
+
+    def _evict(self):
+        # Se descartan primero los trabajos terminados más antiguos
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] not in self.ACTIVE]
+        while len(self._jobs) > self.max_jobs and finished:
+            job_id = finished.pop(0)
+            del self._jobs[job_id]
+            del self._cancel_events[job_id]
+
+
+# Instancia global de los trabajos de imputación
+imputation_jobs = ImputationJobStore()
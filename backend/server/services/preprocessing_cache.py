@@ -0,0 +1,52 @@
+"""
+Caché en memoria de planes de preprocesamiento por versión del dataset, features y label
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+
+class PreprocessingCache:
+    """
+    Guarda el plan de `core.preprocessing.build_preprocessing_plan` (X, y y
+    encoders ajustados) para que entrenar varios modelos seguidos prepare los
+    datos una sola vez.
+
+    La clave usa `state_manager.dataset_token()`, que cambia con cada upload o
+    modificación del dataset, así que un plan nunca se reutiliza sobre datos
+    distintos. Las entradas guardan arrays del tamaño del dataset: se conservan pocas.
+    """
+
+    def __init__(self, max_entries: int = 2):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(token: str, features: List[str], label: str) -> str:
+        """Clave: versión del dataset + features (en orden, definen las columnas de X) + label"""
+        return "\x1f".join([token, label, *features])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is not None:
+                self._entries.move_to_end(key)
+            return plan
+
+    def put(self, key: str, plan: Dict[str, Any]):
+        """Guarda un plan; descarta los menos usados si se supera el máximo"""
+        with self._lock:
+            self._entries[key] = plan
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Vacía la caché (p.ej. al reiniciar el estado)"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Instancia global de la caché de preprocesamiento
+preprocessing_cache = PreprocessingCache()
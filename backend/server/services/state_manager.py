@@ -1,8 +1,9 @@
 """
 Gestor de estado en memoria para mantener DataFrames y resultados entre requests
 """
+import os
 import polars as pl
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
@@ -26,6 +27,18 @@ class StateManager:
         self.df: Optional[pl.DataFrame] = None
         self.df_original: Optional[pl.DataFrame] = None
         self.df_cleaned: Optional[pl.DataFrame] = None
+
+        # Dataset en disco escaneado de forma perezosa (modo LazyFrame)
+        self.lazy_source: Optional[pl.LazyFrame] = None
+        self.source_path: Optional[str] = None
+        self.row_count: Optional[int] = None
+
+        # Identidad del dataset: hash del contenido subido y número de modificaciones
+        self.dataset_key: Optional[str] = None
+        self.dataset_version: int = 0
+        # Versión en la que se modificó cada columna por última vez (ausente = 0)
+        self.column_versions: Dict[str, int] = {}
+
         self.filename: Optional[str] = None
         self.encoding: Optional[str] = None
         self.separator: Optional[str] = None
@@ -57,33 +70,170 @@ class StateManager:
 
         self._initialized = True
 
-    def set_dataframe(self, df: pl.DataFrame, filename: str, encoding: str, separator: str):
+    def set_dataframe(self, df: pl.DataFrame, filename: str, encoding: str, separator: str, dataset_key: Optional[str] = None):
         """Establece el DataFrame principal"""
+        self._discard_source()
+        self.dataset_key = dataset_key
+        self.dataset_version = 0
+        self.column_versions = {}
         self.df = df.clone()
         self.df_original = df.clone()
         self.filename = filename
         self.encoding = encoding
         self.separator = separator
+        self.row_count = df.shape[0]
+        self.created_at = datetime.now()
+        self.last_updated = datetime.now()
+
+    def set_lazy_source(
+        self,
+        lf: pl.LazyFrame,
+        source_path: str,
+        filename: str,
+        encoding: str,
+        separator: str,
+        dataset_key: Optional[str] = None
+    ):
+        """
+        Establece un dataset respaldado por un archivo en disco sin materializarlo.
+        Cada consulta se construye sobre el LazyFrame y solo lee lo que necesita.
+        """
+        self._discard_source()
+        self.dataset_key = dataset_key
+        self.dataset_version = 0
+        self.column_versions = {}
+        self.df = None
+        self.df_original = None
+        self.lazy_source = lf
+        self.source_path = source_path
+        self.filename = filename
+        self.encoding = encoding
+        self.separator = separator
+        self.row_count = None
         self.created_at = datetime.now()
         self.last_updated = datetime.now()
 
-    def get_dataframe(self) -> Optional[pl.DataFrame]:
-        """Obtiene el DataFrame actual"""
-        return self.df
+    def get_lazyframe(self) -> Optional[pl.LazyFrame]:
+        """Obtiene un LazyFrame sobre el dataset actual (en memoria o en disco)"""
+        if self.df is not None:
+            return self.df.lazy()
+        return self.lazy_source
+
+    def get_dataframe(self, columns: Optional[List[str]] = None, predicate: Optional[pl.Expr] = None) -> Optional[pl.DataFrame]:
+        """
+        Obtiene el DataFrame actual.
+
+        Si se indican `columns` y/o `predicate`, solo se materializan esas columnas
+        y filas (en modo LazyFrame se empujan al escaneo del archivo). Sin
+        argumentos, un dataset perezoso se materializa completo una sola vez.
+        """
+        if columns is None and predicate is None:
+            if self.df is None and self.lazy_source is not None:
+                self.df = self.lazy_source.collect()
+                self.row_count = self.df.shape[0]
+            return self.df
+
+        lf = self.get_lazyframe()
+        if lf is None:
+            return None
+        if columns is not None:
+            lf = lf.select(columns)
+        if predicate is not None:
+            lf = lf.filter(predicate)
+        return lf.collect()
+
+    def get_schema(self) -> Dict[str, pl.DataType]:
+        """Obtiene columnas y tipos sin materializar el dataset"""
+        if self.df is not None:
+            return self.df.schema
+        if self.lazy_source is not None:
+            return self.lazy_source.schema
+        return {}
+
+    def get_columns(self) -> List[str]:
+        """Obtiene los nombres de columnas del dataset actual"""
+        return list(self.get_schema().keys())
+
+    def get_shape(self):
+        """Obtiene (filas, columnas) del dataset actual"""
+        if self.df is not None:
+            return self.df.shape
+        if self.lazy_source is None:
+            return None
+        if self.row_count is None:
+            self.row_count = self.lazy_source.select(pl.count()).collect().item()
+        return (self.row_count, len(self.get_schema()))
 
     def has_dataframe(self) -> bool:
         """Verifica si hay un DataFrame cargado"""
-        return self.df is not None
+        return self.df is not None or self.lazy_source is not None
 
-    def update_dataframe(self, df: pl.DataFrame):
-        """Actualiza el DataFrame (para después de limpieza, encoding, etc.)"""
+    def is_lazy(self) -> bool:
+        """Indica si el dataset actual aún no está materializado en memoria"""
+        return self.df is None and self.lazy_source is not None
+
+    def update_dataframe(self, df: pl.DataFrame, changed_columns: Optional[List[str]] = None):
+        """
+        Actualiza el DataFrame (para después de limpieza, encoding, etc.)
+
+        Args:
+            df: Nuevo DataFrame
+            changed_columns: Columnas que cambiaron (por defecto, todas)
+        """
         self.df = df.clone()
+        self.row_count = df.shape[0]
+        self.dataset_version += 1
+        for col in (df.columns if changed_columns is None else changed_columns):
+            self.column_versions[col] = self.dataset_version
         self.last_updated = datetime.now()
 
+    def is_pristine(self) -> bool:
+        """Indica si el dataset sigue siendo exactamente el archivo subido"""
+        return self.dataset_key is not None and self.dataset_version == 0
+
+    def dataset_identity(self) -> str:
+        """Identifica el upload actual (no cambia al modificar el dataset)"""
+        created = self.created_at.isoformat() if self.created_at else ""
+        return f"{self.dataset_key or self.filename}:{created}"
+
+    def dataset_token(self) -> str:
+        """Identifica el dataset actual y su versión (cambia con cada upload o modificación)"""
+        return f"{self.dataset_identity()}:{self.dataset_version}"
+
+    def column_version(self, col: str) -> int:
+        """Versión del dataset en la que se modificó la columna por última vez"""
+        return self.column_versions.get(col, 0)
+
+    def update_columns(self, df_columns: pl.DataFrame):
+        """
+        Reemplaza solo algunas columnas del dataset actual (mismas filas).
+        Permite que las etapas trabajen sobre las columnas seleccionadas.
+        """
+        df = self.get_dataframe()
+        self.update_dataframe(df.with_columns(df_columns), changed_columns=df_columns.columns)
+
     def set_cleaned_dataframe(self, df: pl.DataFrame):
-        """Guarda el DataFrame limpio"""
-        self.df_cleaned = df.clone()
-        self.update_dataframe(df)
+        """Guarda el DataFrame limpio (completo o solo las columnas limpiadas)"""
+        if set(df.columns) == set(self.get_columns()):
+            self.update_dataframe(df)
+        else:
+            self.update_columns(df)
+        self.df_cleaned = self.df.clone()
+
+    def set_cleaned_source(self, source_path: str, changed_columns: List[str]):
+        """
+        Reemplaza el dataset perezoso por su versión limpia ya escrita en disco
+        (ver `core.imputation.clean_out_of_core`) sin materializarla.
+        """
+        self._discard_source()
+        self.lazy_source = pl.scan_parquet(source_path)
+        self.source_path = source_path
+        self.df = None
+        self.df_cleaned = None
+        self.dataset_version += 1
+        for col in changed_columns:
+            self.column_versions[col] = self.dataset_version
+        self.last_updated = datetime.now()
 
     def set_features_and_label(self, features: list, label: str):
         """Establece las features y label seleccionadas"""
@@ -156,8 +306,20 @@ class StateManager:
         self.task_recommendation = recommendation
         self.last_updated = datetime.now()
 
+    def _discard_source(self):
+        """Elimina el archivo en disco del dataset perezoso anterior"""
+        if self.source_path:
+            try:
+                os.remove(self.source_path)
+            except OSError:
+                pass
+        self.lazy_source = None
+        self.source_path = None
+
     def reset(self):
         """Reinicia todo el estado"""
+        self._discard_source()
+        self._initialized = False
         self.__init__()
         self._initialized = True
 
@@ -165,7 +327,8 @@ class StateManager:
         """Obtiene información del estado actual"""
         return {
             "has_dataframe": self.has_dataframe(),
-            "dataframe_shape": self.df.shape if self.df is not None else None,
+            "dataframe_shape": self.get_shape(),
+            "lazy_mode": self.is_lazy(),
             "filename": self.filename,
             "has_features_and_label": self.has_features_and_label(),
             "features_count": len(self.features) if self.features else 0,
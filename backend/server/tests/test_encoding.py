@@ -0,0 +1,70 @@
+"""
+Pruebas del target encoding: se ajusta solo con las filas de entrenamiento
+"""
+import numpy as np
+import polars as pl
+
+from core.preprocessing import build_preprocessing_plan, training_split
+
+
+def _dataset(rows: int = 2000, categories: int = 200, seed: int = 0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    store = rng.integers(0, categories, rows)
+    return pl.DataFrame({
+        "store": [f"s{value}" for value in store],
+        "x": rng.normal(size=rows),
+        "y": store * 0.1 + rng.normal(size=rows),
+    })
+
+
+def _split(df: pl.DataFrame):
+    plan = build_preprocessing_plan(df, ["store", "x"], "y")
+    return plan, training_split(plan, stratify=False)
+
+
+def test_high_cardinality_feature_uses_target_encoding():
+    plan, split = _split(_dataset())
+    assert plan["encoders"]["store"]["strategy"] == "target"
+    assert "table" not in plan["encoders"]["store"]
+    assert "table" in split["encoders"]["store"]
+
+
+def test_test_rows_do_not_depend_on_test_labels():
+    df = _dataset()
+    plan, split = _split(df)
+    index = plan["target_columns"]["store"]
+
+    # Mismas filas de entrenamiento; labels de test cambiados por completo
+    test_labels = {float(value) for value in split["y_test"]}
+    changed = df.with_columns(
+        pl.when(pl.col("y").is_in(list(test_labels))).then(pl.col("y") * -100 + 7).otherwise(pl.col("y"))
+    )
+    _, changed_split = _split(changed)
+
+    assert not np.allclose(split["y_test"], changed_split["y_test"])
+    np.testing.assert_array_equal(split["X_test"][:, index], changed_split["X_test"][:, index])
+    np.testing.assert_array_equal(split["X_train"][:, index], changed_split["X_train"][:, index])
+
+
+def test_split_is_cached_per_plan():
+    plan, split = _split(_dataset())
+    assert training_split(plan, stratify=False) is split
+
+
+def test_target_encoding_is_not_truncated_without_float_features():
+    rng = np.random.default_rng(1)
+    rows = 2000
+    uid = rng.integers(0, 300, rows)
+    df = pl.DataFrame({
+        "uid": [f"u{value}" for value in uid],
+        "c": rng.choice(["a", "b"], rows).tolist(),
+        "y": (uid % 2).astype(np.int64),
+    })
+    plan = build_preprocessing_plan(df, ["uid", "c"], "y")
+    split = training_split(plan, stratify=True)
+    index = plan["target_columns"]["uid"]
+
+    assert plan["X"].dtype == np.float64
+    for values in (split["X_train"][:, index], split["X_test"][:, index]):
+        assert not np.allclose(values, np.round(values))
+        assert 0.0 < values.min() < values.max() < 1.0
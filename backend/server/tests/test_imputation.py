@@ -0,0 +1,73 @@
+"""
+Pruebas de la imputación: parada temprana de MICE, cancelación de KNN y
+limpieza fuera de memoria
+"""
+import numpy as np
+import polars as pl
+import pytest
+from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+from sklearn.impute import IterativeImputer
+from sklearn.linear_model import BayesianRidge
+
+from core.imputation import ImputationCancelled, clean_out_of_core, knn_impute, mice_impute
+
+
+def _with_missing(rows: int, fraction: float = 0.15, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    data = rng.normal(size=(rows, 4))
+    data[:, 1] += data[:, 0]
+    data[:, 2] = 2 * data[:, 1] + 0.3 * rng.normal(size=rows)
+    data[rng.random(data.shape) < fraction] = np.nan
+    return data
+
+
+@pytest.mark.parametrize("tol", [1e-3, 5e-2, 1e-1])
+def test_mice_stops_like_iterative_imputer(tol):
+    data = _with_missing(2000)
+    reference = IterativeImputer(estimator=BayesianRidge(), max_iter=20, tol=tol).fit(data)
+    imputed, report = mice_impute(data, BayesianRidge, max_iter=20, tol=tol)
+
+    assert report["iterations"] == reference.n_iter_
+    np.testing.assert_allclose(imputed, reference.transform(data), atol=1e-8)
+
+
+def test_knn_can_be_cancelled_between_chunks():
+    checks = []
+
+    def should_stop():
+        checks.append(True)
+        return len(checks) > 2
+
+    with pytest.raises(ImputationCancelled):
+        knn_impute(_with_missing(50_000, fraction=0.1), chunk_rows=1000, max_workers=1, should_stop=should_stop)
+
+
+def test_clean_out_of_core_keeps_integer_columns(tmp_path):
+    source, output = tmp_path / "source.parquet", tmp_path / "clean.parquet"
+    pl.DataFrame({
+        "untouched": [1, 2, 3, 4, 5],
+        "integral_median": [1, None, 3, 5, 7],
+        "fractional_median": [1, 2, None, 3, 4],
+        "outlier": [1, 2, 3, 4, 100],
+    }).write_parquet(source)
+    bounds = {"untouched": (None, None), "integral_median": (None, None),
+              "fractional_median": (None, None), "outlier": (0, 10)}
+
+    result = clean_out_of_core(pl.scan_parquet(source), list(bounds), bounds, str(output))
+    cleaned = pl.read_parquet(output)
+
+    assert cleaned.schema["untouched"] == pl.Int64
+    assert cleaned.schema["integral_median"] == pl.Int64
+    assert cleaned["integral_median"].to_list() == [1, 4, 3, 5, 7]
+    assert cleaned.schema["fractional_median"] == pl.Float64
+    assert cleaned["outlier"].to_list() == [1.0, 2.0, 3.0, 4.0, 2.5]
+    assert result["outliers_nulled"]["outlier"] == 1
+
+
+def test_clean_out_of_core_writes_from_ipc_scans(tmp_path):
+    source, output = tmp_path / "source.arrow", tmp_path / "clean.parquet"
+    pl.DataFrame({"x": [1.0, None, 3.0, 100.0], "label": ["a", "b", "c", "d"]}).write_ipc(source)
+
+    clean_out_of_core(pl.scan_ipc(source), ["x"], {"x": (0, 10)}, str(output))
+
+    assert pl.read_parquet(output)["x"].to_list() == [1.0, 2.0, 3.0, 2.0]
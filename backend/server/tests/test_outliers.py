@@ -0,0 +1,50 @@
+"""
+Pruebas de los detectores de outliers univariados
+"""
+import polars as pl
+import pytest
+
+from core.outliers import DETECTORS, OutlierDetector, column_statistics, detect_outliers, null_detected
+
+# Mayoría de ceros: la MAD y el IQR valen 0
+ZERO_SPREAD = [0.0] * 90 + [float(value) for value in range(1, 11)]
+
+
+@pytest.mark.parametrize("method", ["mad", "robust_zscore"])
+def test_zero_spread_column_is_skipped(method):
+    df = pl.DataFrame({"x": ZERO_SPREAD})
+    detection = detect_outliers(df, ["x"], method)
+
+    assert detection["bounds"]["x"] == (None, None)
+    assert detection["counts"]["x"] == 0
+    cleaned, replaced = null_detected(df, ["x"], detection)
+    assert replaced["x"] == 0
+    assert cleaned["x"].to_list() == ZERO_SPREAD
+
+
+@pytest.mark.parametrize("method", ["mad", "robust_zscore"])
+def test_outliers_are_detected_with_spread(method):
+    df = pl.DataFrame({"x": [float(value % 10) for value in range(100)] + [1000.0]})
+    detection = detect_outliers(df, ["x"], method)
+    assert detection["counts"]["x"] == 1
+
+
+def test_statistics_of_empty_column_skip_it():
+    df = pl.DataFrame({"x": [None, None]}, schema={"x": pl.Float64})
+    stats = column_statistics(df, ["x"], DETECTORS["mad"].statistics)
+    assert DETECTORS["mad"].bounds(stats, 3.5) == {"x": (None, None)}
+
+
+def test_detector_requires_limits():
+    class Incomplete(OutlierDetector):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("threshold", [-0.1, 0.6, 1.0])
+def test_isolation_forest_rejects_invalid_contamination(threshold):
+    df = pl.DataFrame({"x": [float(value) for value in range(100)]})
+    with pytest.raises(ValueError):
+        detect_outliers(df, ["x"], "isolation_forest", threshold)
@@ -0,0 +1,36 @@
+"""
+Pruebas del perfilado aproximado por bloques
+"""
+import numpy as np
+import polars as pl
+import pytest
+
+from core.profiling import approximate_profile_columns, count_rows_and_nulls, profile_columns
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=5000)
+    return pl.DataFrame({
+        "x": [None if i % 13 == 0 else float(v) for i, v in enumerate(values)],
+        "n": rng.integers(0, 20, 5000),
+        "c": [f"k{i % 7}" if i % 11 else None for i in range(5000)],
+    })
+
+
+def test_lazy_approximate_profile_matches_exact_moments(frame):
+    exact = profile_columns(frame, ["x", "n", "c"], ["x", "n"])
+    profiles = approximate_profile_columns(frame.lazy(), ["x", "n", "c"], ["x", "n"], chunk_rows=700)
+
+    for col in ("x", "n"):
+        for stat in ("mean", "std", "min", "max"):
+            assert profiles[col][stat] == pytest.approx(exact[col][stat])
+        assert sum(profiles[col]["histogram"]["frequencies"]) == frame[col].drop_nulls().len()
+    assert profiles["n"]["n_unique"] == exact["n"]["n_unique"]
+    assert profiles["c"]["n_unique"] == exact["c"]["n_unique"]
+    assert profiles["c"]["null_count"] == frame["c"].null_count()
+
+
+def test_count_rows_and_nulls_streams_lazy_frames(frame):
+    assert count_rows_and_nulls(frame.lazy(), chunk_rows=700) == (frame.height, frame.null_count().row(0, named=True))
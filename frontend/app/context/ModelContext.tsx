@@ -26,6 +26,8 @@ export interface DatasetInfo {
     numeric_columns_count: number;
     categorical_columns_count: number;
     preview: Array<Record<string, string | number | boolean | null>>;
+    // "pending": normality_test, histogram_data and top_categories come from /api/column-summary
+    details_status?: "pending" | "complete";
     columns_summary: Array<{
       column: string;
       dtype: string;
@@ -97,6 +99,55 @@ export interface ModelTrainingConfig {
 /**
  * Interface for correlation data from backend
  */
+export interface CorrelationPair {
+  variable_1: string;
+  variable_2: string;
+  n?: number;
+  pearson: {
+    correlation: number | null;
+    p_value: number | null;
+  };
+  spearman: {
+    correlation: number | null;
+    p_value: number | null;
+  };
+  kendall: {
+    correlation: number | null;
+    p_value: number | null;
+    n?: number;
+  };
+  average_abs_correlation: number;
+}
+
+/**
+ * Compact pair: [index of variable_1, index of variable_2, average_abs_correlation]
+ */
+export type CompactCorrelationPair = [number, number, number];
+
+/**
+ * Categorical associations: row-major matrices indexed by `categorical_variables`
+ * (categorical) or by `categorical_variables` x `numeric_variables` (categorical_numeric)
+ */
+export interface CategoricalAssociations {
+  categorical_variables: string[];
+  numeric_variables: string[];
+  skipped: Record<string, string>;
+  max_categories: number;
+  numeric_bins: number;
+  categorical: {
+    cramers_v: Array<number | null>;
+    mutual_information: Array<number | null>;
+    normalized_mutual_information: Array<number | null>;
+    n: number[];
+  };
+  categorical_numeric: {
+    eta: Array<number | null>;
+    mutual_information: Array<number | null>;
+    normalized_mutual_information: Array<number | null>;
+    n: number[];
+  };
+}
+
 export interface CorrelationData {
   success: boolean;
   message: string;
@@ -105,44 +156,30 @@ export interface CorrelationData {
   variables: string[];
   total_correlations: number;
   samples_used: number;
-  top_correlations: Array<{
-    variable_1: string;
-    variable_2: string;
-    pearson: {
-      correlation: number | null;
-      p_value: number | null;
-    };
-    spearman: {
-      correlation: number | null;
-      p_value: number | null;
-    };
-    kendall: {
-      correlation: number | null;
-      p_value: number | null;
-    };
-    average_abs_correlation: number;
-  }>;
-  all_correlations: Array<{
-    variable_1: string;
-    variable_2: string;
-    pearson: {
-      correlation: number | null;
-      p_value: number | null;
-    };
-    spearman: {
-      correlation: number | null;
-      p_value: number | null;
-    };
-    kendall: {
-      correlation: number | null;
-      p_value: number | null;
-    };
-    average_abs_correlation: number;
-  }>;
-  correlation_matrices: Record<string, Record<string, Record<string, {
+  null_handling?: "pairwise" | "listwise";
+  kendall_sample_size?: number;
+  kendall_sampled?: boolean;
+  top_correlations: CorrelationPair[] | CompactCorrelationPair[];
+  // Legacy format
+  all_correlations?: CorrelationPair[];
+  correlation_matrices?: Record<string, Record<string, Record<string, {
     correlation: number | null;
     p_value: number | null;
   }>>>;
+  // Compact format: row-major matrices indexed by `variables` (value of (i, j) at i * n_variables + j)
+  format?: "compact";
+  matrices?: Record<string, {
+    correlation: Array<number | null>;
+    p_value: Array<number | null>;
+  }>;
+  pair_n?: number[];
+  kendall_n?: number[];
+  pairs?: CompactCorrelationPair[];
+  pairs_total?: number;
+  cursor?: number;
+  next_cursor?: number | null;
+  min_abs_corr?: number;
+  associations?: CategoricalAssociations | null;
 }
 
 /**
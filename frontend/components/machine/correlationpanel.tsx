@@ -31,7 +31,7 @@ const CorrelationPanel = ({ columns }: CorrelationPanelProps) => {
       try {
         const apiUrl = getClientApiUrl();
 
-        const response = await fetch(`${apiUrl}/api/correlations?top_n=10`);
+        const response = await fetch(`${apiUrl}/api/correlations?format=compact&top_n=10&limit=10`);
 
         if (!response.ok) {
           throw new Error(`Failed to fetch correlations: ${response.statusText}`);
@@ -51,7 +51,34 @@ const CorrelationPanel = ({ columns }: CorrelationPanelProps) => {
   }, [columns, setCorrelationData]);
 
   const getMethodCorrelations = (method: string): CorrelationItem[] => {
-    if (!correlationData || !correlationData.all_correlations) {
+    if (!correlationData) {
+      return [];
+    }
+
+    // Compact format: read the upper triangle of the row-major matrix
+    if (correlationData.matrices) {
+      const matrix = correlationData.matrices[method];
+      if (!matrix) return [];
+      const n = correlationData.n_variables;
+      const items: CorrelationItem[] = [];
+      for (let i = 0; i < n; i++) {
+        for (let j = i + 1; j < n; j++) {
+          const correlation = matrix.correlation[i * n + j];
+          if (correlation === null) continue;
+          items.push({
+            variable1: correlationData.variables[i],
+            variable2: correlationData.variables[j],
+            correlation,
+            pValue: matrix.p_value[i * n + j],
+          });
+        }
+      }
+      return items
+        .sort((a, b) => Math.abs(b.correlation!) - Math.abs(a.correlation!))
+        .slice(0, 10);
+    }
+
+    if (!correlationData.all_correlations) {
       return [];
     }
 
@@ -85,7 +85,15 @@ const FileUploader = () => {
   const { getRootProps, getInputProps, open, fileRejections } = useDropzone({
     onDrop,
     multiple: false,
-    accept: { "text/csv": [".csv"] },
+    accept: {
+      "text/csv": [".csv"],
+      "application/vnd.apache.parquet": [".parquet", ".pq"],
+      "application/vnd.apache.arrow.file": [".arrow", ".ipc", ".feather"],
+      "application/x-ndjson": [".ndjson", ".jsonl"],
+      "application/gzip": [".gz"],
+      "application/x-bzip2": [".bz2"],
+      "application/zstd": [".zst"],
+    },
     maxSize: 10 * 1024 * 1024, // 10MB limit
     noClick: true,
     noKeyboard: true,
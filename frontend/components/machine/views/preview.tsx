@@ -1,7 +1,8 @@
 // app/components/machine/views/preview.tsx
 "use client";
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useModel } from "@/app/context";
+import { getClientApiUrl } from "@/lib/config";
 import TablePreview from "../tablepreview";
 import StatusBar from "@/components/machine/statusbar";
 import CorrelationPanel from "@/components/machine/correlationpanel";
@@ -13,6 +14,38 @@ import { ArrowLeft, ArrowRight } from "lucide-react";
 const Preview = () => {
   const { dataset, setCurrentView } = useModel();
   const [selectedColumn, setSelectedColumn] = useState<string | null>(null);
+  // Per-column detail (normality, histogram, top categories) fetched on demand
+  const [columnDetails, setColumnDetails] = useState<Record<string, Record<string, unknown>>>({});
+
+  const detailsPending = dataset?.data_summary?.details_status === "pending";
+
+  useEffect(() => {
+    setColumnDetails({});
+  }, [dataset]);
+
+  useEffect(() => {
+    if (!selectedColumn || !detailsPending || columnDetails[selectedColumn]) return;
+
+    const fetchColumnDetails = async () => {
+      try {
+        const apiUrl = getClientApiUrl();
+        const response = await fetch(
+          `${apiUrl}/api/column-summary/${encodeURIComponent(selectedColumn)}`
+        );
+
+        if (!response.ok) {
+          throw new Error(`Failed to fetch column details: ${response.statusText}`);
+        }
+
+        const data = await response.json();
+        setColumnDetails((prev) => ({ ...prev, [selectedColumn]: data.details }));
+      } catch (err) {
+        console.error("Error fetching column details:", err);
+      }
+    };
+
+    fetchColumnDetails();
+  }, [selectedColumn, detailsPending, columnDetails]);
 
   if (!dataset) {
     return (
@@ -45,9 +78,11 @@ const Preview = () => {
   // Get column summary from backend data
   const getColumnSummary = (columnName: string) => {
     if (!dataset.data_summary?.columns_summary) return undefined;
-    return dataset.data_summary.columns_summary.find(
+    const summary = dataset.data_summary.columns_summary.find(
       (col) => col.column === columnName
     );
+    if (!summary || !columnDetails[columnName]) return summary;
+    return { ...summary, ...columnDetails[columnName] };
   };
 
   return (
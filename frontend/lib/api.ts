@@ -5,6 +5,7 @@ import {
   RecommendTaskResponse,
   OutliersAnalysisParams,
   OutliersAnalysisResponse,
+  ImputationJobResponse,
   EncodeCategoricalResponse,
   PrepareDataResponse,
   TrainModelRequest,
@@ -102,9 +103,71 @@ export async function analyzeOutliers(params: OutliersAnalysisParams): Promise<O
         throw new Error(errorMessage);
     }
 
+    const result: OutliersAnalysisResponse = await response.json();
+
+    // Cleaning runs as a background job: wait until it finishes
+    if (result.cleaning_job) {
+        const job = await waitForImputationJob(result.cleaning_job.job_id);
+        if (job.status !== "complete") {
+            throw new Error(job.error || `Data cleaning ${job.status}`);
+        }
+        return { ...result, cleaning_applied: true, cleaning_results: job.result };
+    }
+
+    return result;
+}
+
+export async function getImputationJob(jobId: string): Promise<ImputationJobResponse> {
+    const apiUrl = getApiUrl();
+    const response = await fetch(`${apiUrl}/api/imputation-jobs/${jobId}`, {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        const errorMessage = errorData.detail || errorData.message || 'Failed to get imputation job';
+        throw new Error(errorMessage);
+    }
+
     return response.json();
 }
 
+export async function cancelImputationJob(jobId: string): Promise<ImputationJobResponse> {
+    const apiUrl = getApiUrl();
+    const response = await fetch(`${apiUrl}/api/imputation-jobs/${jobId}/cancel`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        const errorMessage = errorData.detail || errorData.message || 'Failed to cancel imputation job';
+        throw new Error(errorMessage);
+    }
+
+    return response.json();
+}
+
+export async function waitForImputationJob(
+    jobId: string,
+    onProgress?: (job: ImputationJobResponse) => void,
+    intervalMs: number = 1000
+): Promise<ImputationJobResponse> {
+    for (;;) {
+        const job = await getImputationJob(jobId);
+        onProgress?.(job);
+        if (job.status !== "pending" && job.status !== "running") {
+            return job;
+        }
+        await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+}
+
 export async function prepareData(): Promise<PrepareDataResponse> {
     const apiUrl = getApiUrl();
     const response = await fetch(`${apiUrl}/api/prepare-data`, {
@@ -53,9 +53,35 @@ export interface OutliersAnalysisResponse {
   // Add actual response type based on your backend
   success: boolean;
   message?: string;
+  cleaning_job?: {
+    job_id: string;
+    status: ImputationJobStatus;
+    method: string;
+    out_of_core?: boolean;
+    status_url: string;
+  };
   [key: string]: unknown;
 }
 
+// Background cleaning/imputation jobs
+export type ImputationJobStatus = "pending" | "running" | "complete" | "failed" | "cancelled";
+
+export interface ImputationJobResponse {
+  success: boolean;
+  job_id: string;
+  status: ImputationJobStatus;
+  method: string;
+  progress: {
+    iteration: number;
+    max_iter: number | null;
+    changes: number[];
+  };
+  result: Record<string, unknown> | null;
+  error: string | null;
+  created_at: string;
+  finished_at: string | null;
+}
+
 // Encode Categorical Types
 export interface EncodeCategoricalResponse {
   success: boolean;